@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Asset Pipeline
+Stores images used by generated pages once, under content-hashed file names
+in an assets/ directory next to the pages.
+
+Identical bytes always get the same name, so a logo or chart used by a whole
+batch of reports is written once and every page links to the same copy,
+which browsers then cache across pages. Asset files are written atomically
+and never change once written, so parallel workers can share the directory,
+and a ``_headers`` file can tell the server to let browsers cache them for
+good.
+"""
+
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+
+from atomic_file import write_file_atomic
+from html_minify import format_savings
+
+
+ASSET_DIR = "assets"
+# Hex digits of the SHA-256 kept in asset file names
+HASH_LENGTH = 16
+
+# Netlify / Cloudflare Pages style header rules, read from the site root
+HEADERS_FILE = "_headers"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class AssetStore:
+    """Content-addressed asset directory for the pages of one output directory.
+
+    ``references`` maps each asset href handed out by this store to its
+    size, and ``sources`` maps each source file added to its SHA-256. With
+    ``link`` source files are hard-linked instead of copied where possible;
+    they must then be replaced rather than edited in place, or the asset
+    would change under its name.
+    """
+
+    def __init__(self, output_dir: str, asset_dir: str = ASSET_DIR, link: bool = False):
+        self.output_dir = output_dir
+        self.asset_dir = asset_dir
+        self.link = link
+        self.references: Dict[str, int] = {}
+        self.sources: Dict[str, str] = {}
+        self.written = 0
+
+    def add_bytes(self, data: bytes, suffix: str) -> str:
+        """Store bytes once and return their href relative to the output directory."""
+        return self._add(hashlib.sha256(data).hexdigest(), suffix, len(data),
+                         lambda path: write_file_atomic(path, data))
+
+    def add_file(self, source_path: str) -> str:
+        """Store a file once, keeping its extension, and return its href."""
+        data = Path(source_path).read_bytes()
+        digest = hashlib.sha256(data).hexdigest()
+        if self.link:
+            write = lambda path: self._link_atomic(source_path, path, data)
+        else:
+            write = lambda path: write_file_atomic(path, data)
+        href = self._add(digest, Path(source_path).suffix.lower(), len(data), write)
+        self.sources[source_path] = digest
+        return href
+
+    def _add(self, digest: str, suffix: str, size: int, write) -> str:
+        name = f"{digest[:HASH_LENGTH]}{suffix}"
+        path = os.path.join(self.output_dir, self.asset_dir, name)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write(path)
+            self.written += 1
+        href = f"{self.asset_dir}/{name}"
+        self.references[href] = size
+        return href
+
+    def _link_atomic(self, source_path: str, path: str, data: bytes) -> None:
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.link(source_path, tmp_path)
+        except OSError:
+            # Other filesystem, or no hard links: copy instead
+            write_file_atomic(path, data)
+            return
+        os.replace(tmp_path, path)
+
+
+def write_headers_file(output_dir: str, asset_dir: str = ASSET_DIR) -> str:
+    """Add a rule marking every asset immutable to ``output_dir``'s _headers
+    file, keeping any other rules in it, and return the file's path."""
+    path = os.path.join(output_dir, HEADERS_FILE)
+    rule = f"/{asset_dir}/*\n  Cache-Control: {IMMUTABLE_CACHE_CONTROL}\n"
+    try:
+        existing = Path(path).read_text(encoding='utf-8')
+    except OSError:
+        existing = ""
+    if rule not in existing:
+        if existing:
+            existing = existing.rstrip("\n") + "\n\n"
+        write_file_atomic(path, (existing + rule).encode('utf-8'))
+    return path
+
+
+def dedup_totals(references: Iterable[Dict[str, int]]) -> Tuple[int, int, int, int]:
+    """Total the asset references of many pages.
+
+    Returns (references, unique assets, bytes the pages would carry with a
+    copy each, bytes actually stored).
+    """
+    count = 0
+    referenced = 0
+    unique = {}
+    for page in references:
+        count += len(page)
+        referenced += sum(page.values())
+        unique.update(page)
+    return count, len(unique), referenced, sum(unique.values())
+
+
+def format_dedup_report(references: Iterable[Dict[str, int]]) -> str:
+    """Describe deduplication, e.g. ``40 references to 3 asset(s): 1,048,000 -> 78,600 bytes (-92.5%)``."""
+    count, unique, referenced, stored = dedup_totals(references)
+    return f"{count} references to {unique} asset(s): {format_savings(referenced, stored)}"
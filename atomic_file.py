@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Atomic File
+Replaces files atomically: data is written to a temporary file in the same
+directory and renamed over the target, so readers and concurrent workers
+never see a partial file.
+
+Kept free of project imports so every module can use it, including the
+ones generate_report itself imports.
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+
+@contextmanager
+def atomic_write(path):
+    """Open a temporary binary file next to ``path`` and rename it over
+    ``path`` once the block completes, so readers never see a partial file."""
+    directory = os.path.dirname(str(path)) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            yield f
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, str(path))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def write_file_atomic(path, data):
+    """Atomically replace a file with some bytes."""
+    with atomic_write(path) as f:
+        f.write(data)
@@ -4,10 +4,73 @@ Beacon Monthly Report Generator
 Reads Input Values.json and generates the HTML report dynamically.
 """
 
+import argparse
+import hashlib
 import json
+import marshal
+import math
 import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+from asset_pipeline import AssetStore, format_dedup_report
+from atomic_file import atomic_write, write_file_atomic
+from html_minify import format_savings, minify_css, minify_html
+from metrics_history import HISTORY_DB, apply_metric_cards, load_metric_cards
+from precompress import (add_precompress_argument, format_compression_report,
+                         remove_precompressed, selected_formats, write_precompressed)
+from report_schema import ConfigValidationError, check_config, validate_config
+from report_template import TEMPLATE_DIR, FragmentCache, load_template, resolve_slot
+
+
+REPORT_TEMPLATE = "beacon_monthly_report.html"
+STYLESHEET_TEMPLATE = "report.css"
+SHARED_ASSET_DIR = "assets"
+MANIFEST_FILE = ".build_manifest.json"
+
+# Independently cached page sections and the top-level config keys each reads
+REPORT_SECTIONS = {
+    'styles': ('header_styling', 'styling'),
+    'header': ('report_metadata',),
+    'metrics': ('metrics',),
+    'division_chart': ('division_chart',),
+    'user_quote': ('user_quote',),
+    'highlights': ('highlights',),
+    'up_next': ('up_next',),
+    'footer': ('footer',),
+}
+# Templates a section reads besides its own, which are part of its cache key
+SECTION_TEMPLATES = {
+    'styles': (STYLESHEET_TEMPLATE,),
+}
+
+# Custom properties cannot be used in media query conditions, so these
+# stylesheet slots stay literal (and part of the content hash) in shared mode
+STYLESHEET_LITERAL_SLOTS = {('styling', 'responsive_breakpoint')}
+
+# Division pie chart geometry (pixels) and the smallest slice that gets a label
+PIE_CHART_SIZE = 200
+PIE_LABEL_MIN_PERCENTAGE = 4
+
+# Leading number of a metric's change_percentage, e.g. "-6.7" in "-6.7%"
+CHANGE_NUMBER_PATTERN = re.compile(r"\s*[-+]?(?:\d+\.?\d*|\.\d+)")
+
+# Modules whose source changes invalidate previously built reports
+RENDERER_SOURCES = tuple(
+    Path(__file__).resolve().parent / name
+    for name in ("generate_report.py", "report_template.py", "html_minify.py", "precompress.py",
+                 "asset_pipeline.py", "metrics_history.py")
+)
+
+# Per-process fragment cache shared by the batch jobs a worker renders
+_batch_fragment_cache = FragmentCache()
+
+# Shared stylesheets already rendered in this process
+_shared_stylesheets = {}
+
 
 def load_json_config(json_file_path):
     """Load the JSON configuration file."""
@@ -18,663 +81,870 @@ def load_json_config(json_file_path):
         raise Exception(f"Error loading JSON file: {e}")
 
 
-def generate_html_report(config):
-    """Generate the HTML report from the JSON configuration."""
-    
-    html_content = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{config['report_metadata']['title']} - {config['report_metadata']['month']}</title>
-    <script src="https://cdn.jsdelivr.net/npm/mermaid/dist/mermaid.min.js"></script>
-    <style>
-        * {{
-            box-sizing: border-box;
-            margin: 0;
-            padding: 0;
-        }}
-        
-        body {{
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
-            min-height: 100vh;
-            padding: 20px;
-        }}
-        
-        .container {{
-            max-width: {config['styling']['container_max_width']};
-            margin: 0 auto;
-            background: white;
-            border-radius: 20px;
-            box-shadow: 0 20px 40px rgba(0,0,0,0.1);
-            overflow: hidden;
-        }}
-        
-        /* Header */
-        .header {{
-            background: {config['header_styling']['background_color']};
-            color: {config['header_styling']['text_color']};
-            padding: 30px;
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-        }}
-        
-        .logo-section {{
-            display: flex;
-            align-items: center;
-            gap: 15px;
-        }}
-        
-        .logo {{
-            font-size: 24px;
-            font-weight: bold;
-            background: {config['header_styling']['logo_background']};
-            padding: 10px 15px;
-            border-radius: 8px;
-            border: 1px solid {config['header_styling']['logo_border']};
-        }}
-        
-        .report-title {{
-            font-size: 28px;
-            font-weight: 300;
-        }}
-        
-        .date-badge {{
-            background: {config['header_styling']['text_color']};
-            color: #333;
-            padding: 12px 24px;
-            border-radius: 25px;
-            font-weight: bold;
-            font-size: 18px;
-            box-shadow: 0 4px 15px rgba(255,215,0,0.3);
-        }}
-        
-        /* Main Content */
-        .main-content {{
-            display: grid;
-            grid-template-columns: 2fr 1fr;
-            gap: {config['styling']['main_content_gap']};
-            padding: {config['styling']['main_content_gap']};
-            align-items: start;
-        }}
-        
-        .left-column {{
-            display: flex;
-            flex-direction: column;
-            gap: 45px;
-            height: fit-content;
-            padding-top: 20px;
-        }}
-        
-        .right-column {{
-            display: flex;
-            flex-direction: column;
-            gap: 35px;
-            justify-content: flex-start;
-            height: fit-content;
-        }}
-        
-        /* Metric Cards */
-        .metrics-grid {{
-            display: grid;
-            grid-template-columns: repeat(3, 1fr);
-            gap: {config['styling']['metrics_grid_gap']};
-        }}
-        
-        .metric-card {{
-            background: white;
-            border-radius: 15px;
-            padding: 30px;
-            box-shadow: 0 8px 25px rgba(0,0,0,0.1);
-            border: 1px solid #e1e8ed;
-            transition: transform 0.3s ease, box-shadow 0.3s ease;
-        }}
-        
-        .metric-card:hover {{
-            transform: translateY(-5px);
-            box-shadow: 0 15px 35px rgba(0,0,0,0.15);
-        }}
-        
-        .metric-header {{
-            display: flex;
-            align-items: center;
-            gap: 12px;
-            margin-bottom: 15px;
-        }}
-        
-        .metric-icon {{
-            width: 40px;
-            height: 40px;
-            border-radius: 10px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            font-size: 20px;
-        }}
-        
-        .views-icon {{ background: #e3f2fd; color: #1976d2; }}
-        .users-icon {{ background: #f3e5f5; color: #7b1fa2; }}
-        .items-icon {{ background: #e8f5e8; color: #388e3c; }}
-        
-        .metric-title {{
-            font-size: 16px;
-            font-weight: 600;
-            color: #555;
-        }}
-        
-        .metric-value {{
-            font-size: 32px;
-            font-weight: bold;
-            color: #333;
-            margin-bottom: 10px;
-        }}
-        
-        .metric-change {{
-            display: flex;
-            align-items: center;
-            gap: 8px;
-            margin-bottom: 15px;
-        }}
-        
-        .change-arrow {{
-            width: 0;
-            height: 0;
-            border-left: 8px solid transparent;
-            border-right: 8px solid transparent;
-            border-bottom: 12px solid #4caf50;
-        }}
-        
-        .change-text {{
-            font-size: 16px;
-            color: #4caf50;
-            font-weight: 700;
-        }}
-        
-        .no-change {{
-            background: #f5f5f5;
-            color: #666;
-            padding: 4px 12px;
-            border-radius: 12px;
-            font-size: 12px;
-            font-weight: 600;
-        }}
-        
-        .metric-description {{
-            font-size: 13px;
-            color: #666;
-            line-height: 1.4;
-        }}
-        
-        /* Chart and User Quotes Container - Side by Side */
-        .quotes-chart-container {{
-            display: grid;
-            grid-template-columns: 1.5fr 1fr;
-            gap: {config['styling']['quotes_chart_gap']};
-        }}
-        
-        /* User Quotes Section */
-        .quotes-section {{
-            background: white;
-            border-radius: 15px;
-            padding: 25px;
-            border: 1px solid #e1e8ed;
-        }}
-        
-        .quotes-title {{
-            font-size: 18px;
-            font-weight: 600;
-            color: #333;
-            margin-bottom: 20px;
-            display: flex;
-            align-items: center;
-            gap: 10px;
-        }}
-        
-        .quote-content {{
-            font-style: italic;
-            font-size: 15px;
-            line-height: 1.6;
-            color: #333;
-            margin-bottom: 20px;
-            background: rgba(255,255,255,0.7);
-            padding: 20px;
-            border-radius: 10px;
-            border-left: 4px solid #ff9800;
-        }}
-        
-        .quote-attribution {{
-            display: flex;
-            align-items: center;
-            gap: 12px;
-        }}
-        
-        .profile-pic {{
-            width: 40px;
-            height: 40px;
-            border-radius: 50%;
-            background: #ff9800;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            color: white;
-            font-weight: bold;
-            font-size: 16px;
-        }}
-        
-        .attribution-text {{
-            font-size: 13px;
-            color: #666;
-            line-height: 1.4;
-        }}
-        
-        /* Chart Section */
-        .chart-section {{
-            background: white;
-            border-radius: 15px;
-            padding: 25px;
-            box-shadow: 0 8px 25px rgba(0,0,0,0.1);
-            border: 1px solid #e1e8ed;
-        }}
-        
-        .chart-title {{
-            font-size: 18px;
-            font-weight: 600;
-            color: #333;
-            margin-bottom: 20px;
-        }}
-        
-        .chart-container {{
-            display: flex;
-            align-items: center;
-            gap: 30px;
-        }}
-        
-        .pie-chart {{
-            width: 320px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            padding: 20px;
-        }}
-        
-        .pie-container {{
-            position: relative;
-            width: 200px;
-            height: 200px;
-            border-radius: 50%;
-            box-shadow: 0 8px 25px rgba(0,0,0,0.15);
-        }}
-        
-        .pie-slice {{
-            position: absolute;
-            top: 0;
-            left: 0;
-            width: 100%;
-            height: 100%;
-            border-radius: 50%;
-            clip-path: polygon(50% 50%, 50% 0%, 100% 0%, 100% 100%, 0% 100%, 0% 0%, 50% 0%);
-        }}
-        
-        .slice-label {{
-            position: absolute;
-            background: rgba(255, 255, 255, 0.95);
-            padding: 6px 10px;
-            border-radius: 6px;
-            font-size: 11px;
-            font-weight: bold;
-            text-align: center;
-            color: #333;
-            box-shadow: 0 2px 6px rgba(0,0,0,0.15);
-            white-space: nowrap;
-            z-index: 10;
-        }}
-        
-        .chart-legend {{
-            flex: 1;
-            display: flex;
-            flex-direction: column;
-            gap: 12px;
-            padding: 20px;
-            background: linear-gradient(135deg, #fafafa 0%, #f5f5f5 100%);
-            border-radius: 12px;
-            border: 1px solid #e0e0e0;
-        }}
-        
-        .legend-item {{
-            display: flex;
-            align-items: center;
-            gap: 12px;
-        }}
-        
-        .legend-color {{
-            width: 16px;
-            height: 16px;
-            border-radius: 3px;
-            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-        }}
-        
-        .legend-text {{
-            font-size: 13px;
-            font-weight: 600;
-            color: #2c3e50;
-        }}
-        
-        /* Right Column Sections */
-        .info-section {{
-            background: white;
-            border-radius: 15px;
-            padding: 30px;
-            box-shadow: 0 8px 25px rgba(0,0,0,0.1);
-            border: 1px solid #e1e8ed;
-            display: flex;
-            flex-direction: column;
-        }}
-        
-        .section-title {{
-            font-size: 18px;
-            font-weight: 600;
-            color: #333;
-            margin-bottom: 20px;
-            display: flex;
-            align-items: center;
-            gap: 10px;
-        }}
-        
-        .highlights-icon {{ color: #4caf50; }}
-        .upnext-icon {{ color: #2196f3; }}
-        
-        .bullet-list {{
-            list-style: none;
-        }}
-        
-        .bullet-list li {{
-            position: relative;
-            padding-left: 25px;
-            margin-bottom: 15px;
-            line-height: 1.5;
-            color: #555;
-        }}
-        
-        .bullet-list li:before {{
-            content: "•";
-            position: absolute;
-            left: 0;
-            color: #667eea;
-            font-size: 20px;
-            font-weight: bold;
-        }}
-        
-        /* Footer */
-        .footer {{
-            background: linear-gradient(135deg, #4caf50 0%, #45a049 100%);
-            color: white;
-            padding: 25px 30px;
-            text-align: center;
-            font-size: 16px;
-            line-height: 1.5;
-        }}
-        
-        /* Responsive Design */
-        @media (max-width: {config['styling']['responsive_breakpoint']}) {{
-            .main-content {{
-                grid-template-columns: 1fr;
-            }}
-            
-            .metrics-grid {{
-                grid-template-columns: repeat(2, 1fr);
-            }}
-        }}
-        
-        @media (max-width: 768px) {{
-            .header {{
-                flex-direction: column;
-                gap: 20px;
-                text-align: center;
-            }}
-            
-            .metrics-grid {{
-                grid-template-columns: 1fr;
-            }}
-            
-            .quotes-chart-container {{
-                grid-template-columns: 1fr;
-                gap: 20px;
-            }}
-            
-            .chart-container {{
-                flex-direction: column;
-                text-align: center;
-            }}
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <!-- Header -->
-        <div class="header">
-            <div class="logo-section">
-                <div class="logo">{config['report_metadata']['company_logo']}</div>
-                <div class="report-title">{config['report_metadata']['title']}</div>
-            </div>
-            <div class="date-badge">{config['report_metadata']['month']}</div>
-        </div>
-        
-        <!-- Main Content -->
-        <div class="main-content">
-            <!-- Left Column -->
-            <div class="left-column">
-                <!-- Metrics Grid -->
-                <div class="metrics-grid">
-                    <!-- Views Card -->
-                    <div class="metric-card">
-                        <div class="metric-header">
-                            <div class="metric-icon views-icon">👁️</div>
-                            <div class="metric-title">Views</div>
-                        </div>
-                        <div class="metric-value">{config['metrics']['views']['value']}</div>
-                        <div class="metric-change">
-                            <div class="change-arrow"></div>
-                            <div class="change-text">{config['metrics']['views']['change_percentage']}</div>
-                        </div>
-                        <div class="metric-description">
-                            {config['metrics']['views']['description']}
-                        </div>
-                    </div>
-                    
-                    <!-- Returning Users Card -->
-                    <div class="metric-card">
-                        <div class="metric-header">
-                            <div class="metric-icon users-icon">👥</div>
-                            <div class="metric-title">Returning Users</div>
-                        </div>
-                        <div class="metric-value">{config['metrics']['returning_users']['value']}</div>
-                        <div class="metric-change">
-                            <div class="change-arrow"></div>
-                            <div class="change-text">{config['metrics']['returning_users']['change_percentage']}</div>
-                        </div>
-                        <div class="metric-description">
-                            {config['metrics']['returning_users']['description']}
-                        </div>
-                    </div>
-                    
-                    <!-- Items in Catalog Card -->
-                    <div class="metric-card">
-                        <div class="metric-header">
-                            <div class="metric-icon items-icon">📋</div>
-                            <div class="metric-title">Items in Catalog</div>
-                        </div>
-                        <div class="metric-value">{config['metrics']['catalog_items']['value']}</div>
-                        <div class="metric-change">
-                            <div class="change-arrow"></div>
-                            <div class="change-text">{config['metrics']['catalog_items']['change_percentage']}</div>
-                        </div>
-                        <div class="metric-description">
-                            {config['metrics']['catalog_items']['description']}
-                        </div>
-                    </div>
-                </div>
-                
-                <!-- Chart and User Quotes Section - Side by Side -->
-                <div class="quotes-chart-container">
-                    <!-- Chart Section -->
-                    <div class="chart-section">
-                        <div class="chart-title">
-                            📊 {config['division_chart']['title']}
-                        </div>
-                        <div class="chart-container">
-                            <div class="pie-chart">
-                                <div class="pie-container">
-"""
+def svg_number(value):
+    """Format a coordinate compactly for SVG path data."""
+    text = f"{value:.2f}".rstrip('0').rstrip('.')
+    return "0" if text == "-0" else text
 
-    # Generate pie chart using conic-gradient
-    # Calculate the conic-gradient stops
-    current_angle = 0
-    conic_gradient_parts = []
-    
-    for division in config['division_chart']['divisions']:
-        # Convert percentage to degrees (360 * percentage / 100)
-        angle = (division['percentage'] * 360) / 100
-        end_angle = current_angle + angle
-        
-        conic_gradient_parts.append(f"{division['gradient_start']} {current_angle}deg {end_angle}deg")
-        current_angle = end_angle
-    
-    # Create the conic-gradient CSS
-    conic_gradient_css = ", ".join(conic_gradient_parts)
-    
-    html_content += f"""                                    <div class="pie-slice" style="background: conic-gradient({conic_gradient_css});">
-                                    </div>
-                                </div>
-                            </div>
-                            
-                            <!-- Legend -->
-                            <div class="chart-legend">
-"""
 
-    # Generate legend items
-    for division in config['division_chart']['divisions']:
-        html_content += f"""                                <div class="legend-item">
+def label_color(background):
+    """Pick dark or light label text for a slice color given as #rgb/#rrggbb."""
+    hex_digits = background.lstrip('#')
+    if len(hex_digits) == 3:
+        hex_digits = "".join(digit * 2 for digit in hex_digits)
+    try:
+        red, green, blue = (int(hex_digits[i:i + 2], 16) for i in (0, 2, 4))
+    except ValueError:
+        return "#ffffff"
+    luminance = 0.299 * red + 0.587 * green + 0.114 * blue
+    return "#333333" if luminance > 160 else "#ffffff"
+
+
+def iter_pie_chart_svg(division_chart):
+    """Yield an inline SVG pie chart for the divisions.
+
+    Slices start at 12 o'clock and run clockwise, each drawn as a wedge path
+    with its percentage label placed at the slice's mid-angle.
+    """
+    radius = PIE_CHART_SIZE / 2
+    center = radius
+    yield (f'                                    <svg class="pie-svg" viewBox="0 0 {PIE_CHART_SIZE} {PIE_CHART_SIZE}" '
+           f'width="{PIE_CHART_SIZE}" height="{PIE_CHART_SIZE}" role="img">'
+           f'<title>{division_chart["title"]}</title>').encode('utf-8')
+
+    labels = []
+    cumulative = 0
+    for division in division_chart['divisions']:
+        percentage = division['percentage']
+        if percentage <= 0:
+            continue
+        color = division['gradient_start']
+        tooltip = f"<title>{division['name']} ({percentage}%)</title>"
+
+        start_angle = cumulative / 100 * 2 * math.pi - math.pi / 2
+        cumulative += percentage
+        end_angle = cumulative / 100 * 2 * math.pi - math.pi / 2
+
+        if percentage >= 100:
+            yield (f'<circle cx="{svg_number(center)}" cy="{svg_number(center)}" '
+                   f'r="{svg_number(radius)}" fill="{color}">{tooltip}</circle>').encode('utf-8')
+        else:
+            large_arc = 1 if percentage > 50 else 0
+            path = (
+                f"M{svg_number(center)} {svg_number(center)}"
+                f"L{svg_number(center + radius * math.cos(start_angle))} "
+                f"{svg_number(center + radius * math.sin(start_angle))}"
+                f"A{svg_number(radius)} {svg_number(radius)} 0 {large_arc} 1 "
+                f"{svg_number(center + radius * math.cos(end_angle))} "
+                f"{svg_number(center + radius * math.sin(end_angle))}Z"
+            )
+            yield f'<path d="{path}" fill="{color}">{tooltip}</path>'.encode('utf-8')
+
+        if percentage >= PIE_LABEL_MIN_PERCENTAGE:
+            mid_angle = (start_angle + end_angle) / 2
+            label_radius = 0 if percentage >= 100 else radius * 0.65
+            labels.append((
+                center + label_radius * math.cos(mid_angle),
+                center + label_radius * math.sin(mid_angle),
+                label_color(color),
+                percentage,
+            ))
+
+    # Labels go after every slice so no wedge is painted over them
+    for x, y, fill, percentage in labels:
+        yield (f'<text x="{svg_number(x)}" y="{svg_number(y)}" fill="{fill}" '
+               f'font-size="11" font-weight="bold" text-anchor="middle" '
+               f'dominant-baseline="central">{percentage}%</text>').encode('utf-8')
+    yield b'</svg>\n'
+
+
+def iter_legend_items(divisions):
+    """Yield one legend entry per division."""
+    for division in divisions:
+        yield f"""                                <div class="legend-item">
                                     <div class="legend-color" style="background: {division['gradient_start']}; width: 16px; height: 16px; border-radius: 3px;"></div>
                                     <div class="legend-text">{division['name']} ({division['percentage']}%)</div>
                                 </div>
-"""
+""".encode('utf-8')
 
-    html_content += f"""                            </div>
-                        </div>
-                    </div>
-                    
-                    <!-- User Quotes Section -->
-                    <div class="quotes-section">
-                        <div class="quotes-title">
-                            💬 User Quotes
-                        </div>
-                        <div class="quote-content">
-                            "{config['user_quote']['content']}"
-                        </div>
-                        <div class="quote-attribution">
-                            <div class="profile-pic">{config['user_quote']['initials']}</div>
-                            <div class="attribution-text">
-                                <strong>{config['user_quote']['author']}</strong><br>
-                                {config['user_quote']['title']}
-                            </div>
-                        </div>
-                    </div>
-                </div>
-            </div>
-            
-            <!-- Right Column -->
-            <div class="right-column">
-                <!-- Highlights Section -->
-                <div class="info-section">
-                    <div class="section-title">
-                        <span class="highlights-icon">✨</span> {config['highlights']['title']}
-                    </div>
-                    <ul class="bullet-list">
-"""
 
-    # Generate highlights items
-    for item in config['highlights']['items']:
-        html_content += f"""                        <li>{item}</li>
-"""
+def iter_bullet_items(items):
+    """Yield one bullet list entry per item."""
+    for item in items:
+        yield f"""                        <li>{item}</li>
+""".encode('utf-8')
 
-    html_content += f"""                    </ul>
-                </div>
-                
-                <!-- Up Next Section -->
-                <div class="info-section">
-                    <div class="section-title">
-                        <span class="upnext-icon">🚀</span> {config['up_next']['title']}
-                    </div>
-                    <ul class="bullet-list">
-"""
 
-    # Generate up next items
-    for item in config['up_next']['items']:
-        html_content += f"""                        <li>{item}</li>
-"""
+def section_template_name(section, stylesheet_href=None):
+    """Return the template file for a report section."""
+    if section == 'styles' and stylesheet_href:
+        return "sections/styles_shared.html"
+    return f"sections/{section}.html"
 
-    html_content += f"""                    </ul>
-                </div>
-            </div>
-        </div>
-        
-        <!-- Footer -->
-        <div class="footer">
-            {config['footer']['text']}
-        </div>
-    </div>
-    
-    <script>
-        mermaid.initialize({{ 
-            startOnLoad: true,
-            theme: 'default',
-            pie: {{
-                useWidth: 800,
-                useHeight: 600
-            }}
-        }});
-    </script>
-</body>
-</html>"""
-
-    return html_content
-
-
-def main():
+
+def report_template_names():
+    """Return every template a report can be built from."""
+    return ([REPORT_TEMPLATE, STYLESHEET_TEMPLATE, "sections/styles_shared.html"]
+            + [section_template_name(section) for section in REPORT_SECTIONS])
+
+
+def css_variable_name(path):
+    """Map a stylesheet slot path to a CSS custom property name."""
+    return "--" + "-".join(part.replace('_', '-') for part in path)
+
+
+def build_css_variables(config):
+    """Return the per-report custom property declarations for the shared stylesheet."""
+    declarations = []
+    seen = set()
+    for path in load_template(STYLESHEET_TEMPLATE).slots:
+        if path in STYLESHEET_LITERAL_SLOTS or path in seen:
+            continue
+        seen.add(path)
+        declarations.append(f"{css_variable_name(path)}: {resolve_slot(config, path)};")
+    return " ".join(declarations)
+
+
+def build_shared_stylesheet(config, minify=False):
+    """Render the stylesheet shared by a fleet of reports.
+
+    Config values are replaced by ``var(--...)`` references, except for the
+    slots that CSS does not allow custom properties in. Returns
+    (content-hashed filename, CSS bytes).
+    """
+    template = load_template(STYLESHEET_TEMPLATE)
+    literals = tuple(resolve_slot(config, path) for path in sorted(STYLESHEET_LITERAL_SLOTS))
+    memo_key = (template.digest, literals, minify)
+    if memo_key not in _shared_stylesheets:
+        context = {}
+        for path in template.slots:
+            value = resolve_slot(config, path) if path in STYLESHEET_LITERAL_SLOTS \
+                else f"var({css_variable_name(path)})"
+            parent = context
+            for key in path[:-1]:
+                parent = parent.setdefault(key, {})
+            parent[path[-1]] = value
+        css = template.render(context)
+        if minify:
+            css = minify_css(css)
+        data = css.encode('utf-8')
+        _shared_stylesheets[memo_key] = (f"report-{hash_bytes(data)[:16]}.css", data)
+    return _shared_stylesheets[memo_key]
+
+
+def logo_markup(report_metadata):
+    """Return the header logo: the shared logo image if one was stored for
+    this report, otherwise the company name as text."""
+    if report_metadata.get('logo_src'):
+        return (f'<img class="logo-image" src="{report_metadata["logo_src"]}" '
+                f'alt="{report_metadata["company_logo"]}">')
+    return report_metadata['company_logo']
+
+
+def change_markup(change_percentage):
+    """Return a metric's change: a green up or red down arrow with the
+    percentage, or the no-change badge for 0% and values like "n/a"."""
+    match = CHANGE_NUMBER_PATTERN.match(change_percentage)
+    change = float(match.group(0)) if match else 0
+    if change == 0:
+        text = "NO CHANGE in %" if match else change_percentage
+        return f'<div class="no-change">{text}</div>'
+    direction = ' down' if change < 0 else ''
+    return (f'<div class="metric-change{direction}"><div class="change-arrow"></div>'
+            f'<div class="change-text">{change_percentage}</div></div>')
+
+
+def build_section_context(section, config, stylesheet_href=None):
+    """Build the template context for one report section."""
+    context = {key: config[key] for key in REPORT_SECTIONS[section]}
+    if section == 'styles':
+        if stylesheet_href:
+            context['stylesheet_href'] = stylesheet_href
+            context['css_variables'] = build_css_variables(config)
+        else:
+            context['stylesheet'] = load_template(STYLESHEET_TEMPLATE).iter_render(config)
+    elif section == 'header':
+        context['logo'] = logo_markup(config['report_metadata'])
+    elif section == 'metrics':
+        context['metric_changes'] = {name: change_markup(metric['change_percentage'])
+                                     for name, metric in config['metrics'].items()}
+    elif section == 'division_chart':
+        context['pie_chart_svg'] = iter_pie_chart_svg(config['division_chart'])
+        context['legend_items'] = iter_legend_items(config['division_chart']['divisions'])
+    elif section == 'highlights':
+        context['highlight_items'] = iter_bullet_items(config['highlights']['items'])
+    elif section == 'up_next':
+        context['up_next_items'] = iter_bullet_items(config['up_next']['items'])
+    return context
+
+
+def hash_section_inputs(section, config):
+    """Hash the parts of the config a section reads.
+
+    The hash is only used as an in-process cache key, so the fast marshal
+    encoding is used; dicts with the same content in a different key order
+    merely miss the cache.
+    """
+    inputs = [config[key] for key in REPORT_SECTIONS[section]]
+    return hashlib.blake2b(marshal.dumps(inputs), digest_size=16).digest()
+
+
+def render_section(section, config, cache=None, stylesheet_href=None):
+    """Render one report section.
+
+    Without a cache the section is streamed. With a ``FragmentCache`` the
+    rendered bytes are looked up by the digests of the templates the section
+    reads and its input hash, and only rendered on a miss.
+    """
+    template = load_template(section_template_name(section, stylesheet_href))
+    if cache is None:
+        return template.iter_render(build_section_context(section, config, stylesheet_href))
+
+    digests = (template.digest,) + tuple(load_template(name).digest
+                                         for name in SECTION_TEMPLATES.get(section, ()))
+    key = (section, digests, stylesheet_href, hash_section_inputs(section, config))
+    fragment = cache.get(key)
+    if fragment is None:
+        fragment = template.render_bytes(build_section_context(section, config, stylesheet_href))
+        cache.put(key, fragment)
+    return fragment
+
+
+def build_report_context(config, cache=None, stylesheet_href=None):
+    """Build the page template context: report metadata plus each section."""
+    return {
+        'report_metadata': config['report_metadata'],
+        'sections': {
+            section: render_section(section, config, cache, stylesheet_href)
+            for section in REPORT_SECTIONS
+        },
+    }
+
+
+def iter_html_report(config, cache=None, stylesheet_href=None):
+    """Generate the HTML report from the JSON configuration as UTF-8 chunks.
+
+    Chunks are yielded as they are produced, so the report can be written to
+    a file or socket without holding the whole document in memory. Passing a
+    ``FragmentCache`` reuses sections whose inputs have not changed. With a
+    ``stylesheet_href`` the page links to the shared stylesheet and only
+    inlines its own CSS custom properties.
+    """
+    context = build_report_context(config, cache, stylesheet_href)
+    return load_template(REPORT_TEMPLATE).iter_render(context)
+
+
+def write_html_report(config, stream, cache=None, stylesheet_href=None):
+    """Stream the HTML report into a binary file object or socket.
+
+    Returns the number of bytes written.
+    """
+    write = stream.sendall if hasattr(stream, 'sendall') else stream.write
+    total = 0
+    for chunk in iter_html_report(config, cache, stylesheet_href):
+        write(chunk)
+        total += len(chunk)
+    return total
+
+
+def generate_html_report(config, cache=None, stylesheet_href=None):
+    """Generate the HTML report from the JSON configuration."""
+    context = build_report_context(config, cache, stylesheet_href)
+    return load_template(REPORT_TEMPLATE).render(context)
+
+
+def hash_bytes(data):
+    """Return the SHA-256 hex digest of some bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path):
+    """Return the SHA-256 hex digest of a file, or None if it is missing."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 16), b""):
+                digest.update(block)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def renderer_fingerprint(options=None):
+    """Hash of the report templates, the rendering code and output options.
+
+    Changing a template, the rendering code or an output option such as
+    ``minify`` invalidates every manifest entry.
+    """
+    digests = [load_template(name).digest for name in report_template_names()]
+    digests.extend(f"{key}={value}" for key, value in sorted((options or {}).items()))
+    sources = b"".join(Path(path).read_bytes() for path in RENDERER_SOURCES)
+    return hash_bytes(" ".join(digests).encode('utf-8') + sources)
+
+
+def load_build_manifest(directory, filename=MANIFEST_FILE):
+    """Load the build manifest for an output directory."""
+    try:
+        with open(os.path.join(directory, filename), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_build_manifest(directory, manifest, filename=MANIFEST_FILE):
+    """Atomically write the build manifest for an output directory."""
+    write_file_atomic(
+        os.path.join(directory, filename),
+        json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8')
+    )
+
+
+def is_up_to_date(entry, config_hash, template_hash, output_path):
+    """Check a manifest entry against the current inputs and output files."""
+    if not entry:
+        return False
+    if entry.get('config') != config_hash or entry.get('template') != template_hash:
+        return False
+    output_dir = os.path.dirname(output_path) or "."
+    if not all(os.path.exists(os.path.join(output_dir, asset)) for asset in entry.get('assets', [])):
+        return False
+    # Shared images can change without the config changing
+    if any(hash_file(path) != digest for path, digest in entry.get('images', {}).items()):
+        return False
+    return hash_file(output_path) == entry.get('output')
+
+
+def manifest_entry(config_hash, template_hash, written):
+    """Build a manifest entry from render_report_file()'s result."""
+    entry = {'config': config_hash, 'template': template_hash, 'output': written['output_hash']}
+    if written['assets']:
+        entry['assets'] = written['assets']
+    if written.get('images'):
+        entry['images'] = written['images']
+    return entry
+
+
+def write_shared_stylesheet(config, output_dir, minify=False):
+    """Write the content-hashed shared stylesheet once and return its
+    path relative to ``output_dir``."""
+    filename, css = build_shared_stylesheet(config, minify)
+    relative_path = f"{SHARED_ASSET_DIR}/{filename}"
+    asset_path = os.path.join(output_dir, SHARED_ASSET_DIR, filename)
+    if not os.path.exists(asset_path):
+        os.makedirs(os.path.dirname(asset_path), exist_ok=True)
+        write_file_atomic(asset_path, css)
+    return relative_path
+
+
+def render_report_file(config, output_path, cache=None, minify=False, shared_css=False,
+                       precompress=()):
+    """Write the report into place atomically.
+
+    The report is streamed unless ``minify`` or ``precompress`` is set, which
+    need the whole document. With ``shared_css`` the stylesheet is written
+    once under assets/ and linked. ``precompress`` lists sibling formats
+    (gz, bz2, xz) to write before the report itself is replaced. A
+    ``report_metadata.logo_image`` file is stored once under assets/ by
+    content hash and shown in the header. Returns a dict with the output's
+    SHA-256, rendered and written byte counts, the sibling sizes, the assets
+    the report uses, and the shared images' sizes and source hashes.
+    """
+    output_dir = os.path.dirname(output_path) or "."
+    stylesheet_href = write_shared_stylesheet(config, output_dir, minify) if shared_css else None
+    result = {'assets': [stylesheet_href] if stylesheet_href else [], 'compressed': {},
+              'shared_images': {}, 'images': {}}
+    logo_image = config['report_metadata'].get('logo_image')
+    if logo_image:
+        store = AssetStore(output_dir)
+        logo_src = store.add_file(logo_image)
+        config = dict(config, report_metadata=dict(config['report_metadata'], logo_src=logo_src))
+        result['assets'].append(logo_src)
+        result.update(shared_images=store.references, images=store.sources)
+
+    if minify or precompress:
+        rendered = b"".join(iter_html_report(config, cache, stylesheet_href))
+        data = minify_html(rendered.decode('utf-8')).encode('utf-8') if minify else rendered
+        result['compressed'] = write_precompressed(output_path, data, precompress)
+        result['assets'].extend(f"{os.path.basename(output_path)}.{fmt}" for fmt in precompress)
+        write_file_atomic(output_path, data)
+        result.update(output_hash=hash_bytes(data), rendered_bytes=len(rendered),
+                      written_bytes=len(data))
+        return result
+
+    remove_precompressed(output_path)
+    digest = hashlib.sha256()
+    size = 0
+    with atomic_write(output_path) as f:
+        for chunk in iter_html_report(config, cache, stylesheet_href):
+            f.write(chunk)
+            digest.update(chunk)
+            size += len(chunk)
+    result.update(output_hash=digest.hexdigest(), rendered_bytes=size, written_bytes=size)
+    return result
+
+
+def stat_signature(path):
+    """Return (mtime_ns, size) for a file, or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def watch_report(json_file, output_file, interval=0.2, options=None):
+    """Re-render the report whenever the config or a template changes.
+
+    The process, compiled templates and section cache stay warm between
+    rebuilds, so a change only re-renders the sections whose inputs changed.
+    Each rebuild is written atomically and its turnaround time reported.
+    """
+    cache = FragmentCache()
+    template_paths = {
+        name: os.path.join(TEMPLATE_DIR, name) for name in report_template_names()
+    }
+    print(f"👀 Watching {json_file} and {len(template_paths)} templates, "
+          f"writing {output_file} (Ctrl+C to stop)...")
+
+    last_seen = None
+    try:
+        while True:
+            seen = {name: stat_signature(path) for name, path in template_paths.items()}
+            seen[json_file] = stat_signature(json_file)
+
+            if seen != last_seen:
+                start = time.perf_counter()
+                if last_seen is not None:
+                    for name in template_paths:
+                        if seen[name] != last_seen[name]:
+                            load_template(name, reload=True)
+                last_seen = seen
+
+                hits, misses = cache.hits, cache.misses
+                try:
+                    config = load_json_config(json_file)
+                    check_config(config)
+                    render_report_file(config, output_file, cache, **(options or {}))
+                except Exception as e:
+                    print(f"❌ Error: {e}")
+                else:
+                    elapsed_ms = (time.perf_counter() - start) * 1000
+                    print(f"🔁 Rebuilt {output_file} in {elapsed_ms:.1f} ms "
+                          f"({cache.misses - misses} sections rendered, "
+                          f"{cache.hits - hits} reused)")
+
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("\n👋 Stopped watching.")
+    return 0
+
+
+def iter_batch_jobs(source, output_dir):
+    """Yield (name, raw_json, output_path) jobs for a batch source.
+
+    The source is either a directory of ``*.json`` configs or a JSONL file
+    (``-`` for stdin) with one config per line.
+    """
+    if source != "-" and os.path.isdir(source):
+        for config_path in sorted(Path(source).glob("*.json")):
+            name = config_path.stem
+            raw_json = config_path.read_text(encoding='utf-8')
+            yield name, raw_json, os.path.join(output_dir, f"{name}.html")
+        return
+
+    stream = sys.stdin if source == "-" else open(source, 'r', encoding='utf-8')
+    stem = "stdin" if source == "-" else Path(source).stem
+    try:
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            name = f"{stem}-{line_number:05d}"
+            yield name, line, os.path.join(output_dir, f"{name}.html")
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def render_batch_job(job):
+    """Render a single batch job.
+
+    Returns a result dict with the output hash and sizes, or the error, and
+    this job's hits and misses on the worker's fragment cache.
+    """
+    name, raw_json, output_path, options = job
+    hits, misses = _batch_fragment_cache.hits, _batch_fragment_cache.misses
+    result = {'name': name, 'output_path': output_path, 'error': None}
+    try:
+        config = json.loads(raw_json)
+        check_config(config)
+        result.update(render_report_file(config, output_path, _batch_fragment_cache, **options))
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['cache_hits'] = _batch_fragment_cache.hits - hits
+    result['cache_misses'] = _batch_fragment_cache.misses - misses
+    return result
+
+
+def apply_history_to_json(raw_json, metric_cards, default_tenant):
+    """Fill a raw JSON config's metrics from history.
+
+    Returns (raw JSON, number of metric cards applied). Invalid JSON is
+    returned unchanged for the render job to report.
+    """
+    try:
+        config = json.loads(raw_json)
+    except ValueError:
+        return raw_json, 0
+    config, cards = apply_metric_cards(config, metric_cards, default_tenant)
+    if not cards:
+        return raw_json, 0
+    return json.dumps(config), len(cards)
+
+
+def run_batch(source, output_dir, workers=None, force=False, options=None, metric_cards=None):
+    """Render every changed config in a batch source over a process pool.
+
+    Configs whose inputs match the build manifest and whose output is intact
+    are skipped. ``options`` are passed to render_report_file(). With
+    ``metric_cards`` from load_metric_cards() each config's metrics are
+    taken from history, for the tenant named in the config or the job name.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    options = options or {}
+    manifest = {} if force else load_build_manifest(output_dir)
+    template_hash = renderer_fingerprint(options)
+
+    jobs = []
+    config_hashes = {}
+    skipped = 0
+    from_history = 0
+    for name, raw_json, output_path in iter_batch_jobs(source, output_dir):
+        if metric_cards is not None:
+            raw_json, applied = apply_history_to_json(raw_json, metric_cards, name)
+            from_history += applied
+        config_hash = hash_bytes(raw_json.encode('utf-8'))
+        key = os.path.basename(output_path)
+        if is_up_to_date(manifest.get(key), config_hash, template_hash, output_path):
+            skipped += 1
+            continue
+        config_hashes[key] = config_hash
+        jobs.append((name, raw_json, output_path, options))
+
+    print(f"📦 Rendering {len(jobs)} changed report(s) from {source} "
+          f"with {workers} worker(s), {skipped} up to date...")
+    start = time.perf_counter()
+
+    if workers == 1 or len(jobs) <= 1:
+        results = [render_batch_job(job) for job in jobs]
+    else:
+        chunksize = max(1, len(jobs) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(render_batch_job, jobs, chunksize=chunksize))
+
+    elapsed = time.perf_counter() - start
+    failures = []
+    for result in results:
+        key = os.path.basename(result['output_path'])
+        if result['error']:
+            failures.append((result['name'], result['error']))
+            manifest.pop(key, None)
+            continue
+        manifest[key] = manifest_entry(config_hashes[key], template_hash, result)
+    save_build_manifest(output_dir, manifest)
+    built_results = [result for result in results if not result['error']]
+
+    built = len(results) - len(failures)
+    rate = built / elapsed if elapsed > 0 else float(built)
+
+    print(f"✅ Built {built}, skipped {skipped}, failed {len(failures)} in {output_dir} "
+          f"({elapsed:.2f}s, {rate:.1f} reports/s)")
+    print(f"🧩 Section cache: {sum(result['cache_hits'] for result in results)} hits, "
+          f"{sum(result['cache_misses'] for result in results)} misses")
+    if metric_cards is not None:
+        print(f"📈 Metrics from history: {from_history} metric card(s) filled in")
+    if options.get('minify') and built_results:
+        print("🗜️  Minified: " + format_savings(
+            sum(result['rendered_bytes'] for result in built_results),
+            sum(result['written_bytes'] for result in built_results)))
+    if options.get('shared_css') and built_results:
+        stylesheets = sorted({asset for result in built_results for asset in result['assets']
+                              if asset.endswith(".css")})
+        print(f"🎨 Shared stylesheet(s): {', '.join(stylesheets)}")
+    if any(result['shared_images'] for result in built_results):
+        print("🔗 Shared images: " + format_dedup_report(
+            result['shared_images'] for result in built_results))
+    if options.get('precompress') and built_results:
+        compressed = {fmt: sum(result['compressed'][fmt] for result in built_results)
+                      for fmt in options['precompress']}
+        print(f"📦 Precompressed {len(built_results)} report(s):")
+        for line in format_compression_report(
+                sum(result['written_bytes'] for result in built_results), compressed):
+            print(f"   {line}")
+    if failures:
+        print(f"❌ {len(failures)} report(s) failed:")
+        for name, error in failures:
+            print(f"   - {name}: {error}")
+
+    return 1 if failures else 0
+
+
+def validate_batch_job(job):
+    """Validate a single batch job, returning (name, errors)."""
+    name, raw_json = job[:2]
+    try:
+        return name, validate_config(json.loads(raw_json))
+    except ValueError as e:
+        return name, [f"invalid JSON: {e}"]
+
+
+def run_validation(source, workers=None):
+    """Validate a config file, a directory of configs or a JSONL stream
+    without rendering anything."""
+    if source != "-" and os.path.isfile(source) and not source.endswith(".jsonl"):
+        jobs = [(Path(source).stem, Path(source).read_text(encoding='utf-8'), None)]
+    else:
+        jobs = list(iter_batch_jobs(source, ""))
+    workers = workers or os.cpu_count() or 1
+
+    print(f"🔎 Validating {len(jobs)} config(s) from {source}...")
+    start = time.perf_counter()
+    if workers == 1 or len(jobs) <= 1:
+        results = [validate_batch_job(job) for job in jobs]
+    else:
+        chunksize = max(1, len(jobs) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(validate_batch_job, jobs, chunksize=chunksize))
+    elapsed = time.perf_counter() - start
+
+    invalid = 0
+    for name, errors in results:
+        if errors:
+            invalid += 1
+            print(f"❌ {name}:")
+            for error in errors:
+                print(f"   - {error}")
+    rate = len(results) / elapsed if elapsed > 0 else float(len(results))
+
+    print(f"✅ {len(results) - invalid}/{len(results)} configs valid "
+          f"({elapsed:.2f}s, {rate:.0f} configs/s)")
+    return 1 if invalid else 0
+
+
+def output_options(args):
+    """Collect the output options that change what gets written."""
+    options = {}
+    if args.minify:
+        options['minify'] = True
+    if args.shared_css:
+        options['shared_css'] = True
+    if selected_formats(args.precompress):
+        options['precompress'] = tuple(selected_formats(args.precompress))
+    return options
+
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Generate Beacon monthly HTML reports from JSON configuration"
+    )
+    parser.add_argument(
+        "-c", "--config",
+        default="Input Values.json",
+        help="JSON configuration file (default: 'Input Values.json')"
+    )
+    parser.add_argument(
+        "-o", "--output",
+        default="beacon_monthly_report_generated.html",
+        help="Output HTML file (default: 'beacon_monthly_report_generated.html')"
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="SOURCE",
+        help="Render many reports from a directory of JSON configs or a JSONL file ('-' for stdin)"
+    )
+    parser.add_argument(
+        "--output-dir",
+        default="reports",
+        help="Output directory for batch mode (default: 'reports')"
+    )
+    parser.add_argument(
+        "-j", "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes for batch mode (default: CPU count)"
+    )
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="Strip whitespace, comments and unused CSS rules from the output"
+    )
+    parser.add_argument(
+        "--shared-css",
+        action="store_true",
+        help="Link a shared, content-hashed stylesheet under assets/ instead of inlining the CSS"
+    )
+    add_precompress_argument(parser)
+    parser.add_argument(
+        "--validate-only",
+        action="store_true",
+        help="Only validate the config (or every --batch config) and report all errors"
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and rebuild the report whenever the config or templates change"
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=0.2,
+        help="Polling interval in seconds for --watch (default: 0.2)"
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run a local HTTP render service instead of writing files"
+    )
+    parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="Host to bind for --serve (default: 127.0.0.1)"
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8000,
+        help="Port to bind for --serve (default: 8000)"
+    )
+    parser.add_argument(
+        "--config-dir",
+        help="Directory of JSON configs served as GET /reports/<name> in --serve mode"
+    )
+    parser.add_argument(
+        "--history",
+        nargs="?",
+        const=str(HISTORY_DB),
+        metavar="DB",
+        help=f"Compute the metric cards from a metrics history database (default: {HISTORY_DB.name})"
+    )
+    parser.add_argument(
+        "--tenant",
+        help="Tenant to look up in --history (default: report_metadata.tenant, "
+             "else the config's file name; batch reports use their job name)"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild reports even if the build manifest says they are up to date"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """Main function to generate the report."""
     
+    args = parse_args(argv)
+
+    if args.serve:
+        # Imported here because report_server builds on this module
+        from report_server import serve
+        return serve(args.host, args.port, args.config_dir)
+
+    if args.history and args.watch:
+        print("❌ Error: --history cannot be combined with --watch.")
+        return 1
+
+    if args.batch:
+        if args.batch != "-" and not os.path.exists(args.batch):
+            print(f"❌ Error: {args.batch} not found!")
+            return 1
+        if args.validate_only:
+            return run_validation(args.batch, args.workers)
+        try:
+            metric_cards = load_metric_cards(args.history) if args.history else None
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            return 1
+        return run_batch(args.batch, args.output_dir, args.workers, args.force,
+                         output_options(args), metric_cards)
+
     # File paths
-    json_file = "Input Values.json"
-    output_file = "beacon_monthly_report_generated.html"
+    json_file = args.config
+    output_file = args.output
     
     # Check if JSON file exists
     if not os.path.exists(json_file):
         print(f"❌ Error: {json_file} not found!")
         return 1
     
+    if args.validate_only:
+        return run_validation(json_file)
+    
+    if args.watch:
+        return watch_report(json_file, output_file, args.interval, output_options(args))
+    
     try:
+        # Skip the render if neither the config nor the template changed
+        output_dir = os.path.dirname(output_file) or "."
+        manifest = {} if args.force else load_build_manifest(output_dir)
+        manifest_key = os.path.basename(output_file)
+        config_hash = hash_file(json_file)
+        history_cards = None
+        if args.history:
+            # History can change without the config changing
+            config, history_cards = apply_metric_cards(
+                load_json_config(json_file), load_metric_cards(args.history),
+                args.tenant or Path(json_file).stem)
+            if history_cards:
+                config_hash = hash_bytes(
+                    (config_hash + json.dumps(history_cards, sort_keys=True)).encode('utf-8'))
+        template_hash = renderer_fingerprint(output_options(args))
+        if is_up_to_date(manifest.get(manifest_key), config_hash, template_hash, output_file):
+            print(f"⏭️  Up to date: {output_file} (use --force to rebuild)")
+            return 0
+        
         # Load configuration
         print(f"📖 Loading configuration from {json_file}...")
-        config = load_json_config(json_file)
+        if not args.history:
+            config = load_json_config(json_file)
+        check_config(config)
         
         # Generate HTML report
         print("🔨 Generating HTML report...")
-        html_content = generate_html_report(config)
-        
-        # Write HTML file
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+        written = render_report_file(config, output_file, **output_options(args))
+        manifest[manifest_key] = manifest_entry(config_hash, template_hash, written)
+        save_build_manifest(output_dir, manifest)
         
         print(f"✅ Successfully generated: {output_file}")
         print(f"📊 Report title: {config['report_metadata']['title']}")
         print(f"📅 Month: {config['report_metadata']['month']}")
         print(f"📈 Divisions: {len(config['division_chart']['divisions'])} divisions")
         print(f"💬 Quote author: {config['user_quote']['author']}")
+        if args.history:
+            if history_cards:
+                print(f"📈 Metrics from history: {', '.join(history_cards)}")
+            else:
+                print("⚠️  No metrics history for this tenant and month, using the config's metrics")
+        if args.minify:
+            print(f"🗜️  Minified: {format_savings(written['rendered_bytes'], written['written_bytes'])}")
+        if args.shared_css:
+            print(f"🎨 Shared stylesheet: {written['assets'][0]}")
+        if written['shared_images']:
+            print(f"🔗 Shared logo: {next(iter(written['shared_images']))}")
+        if written['compressed']:
+            print("📦 Precompressed:")
+            for line in format_compression_report(written['written_bytes'], written['compressed']):
+                print(f"   {line}")
         
         return 0
         
+    except ConfigValidationError as e:
+        print(f"❌ {json_file} has {len(e.errors)} error(s):")
+        for error in e.errors:
+            print(f"   - {error}")
+        return 1
+        
     except Exception as e:
         print(f"❌ Error: {e}")
         return 1
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+HTML Minifier
+Strips whitespace and comments from generated HTML and its inline CSS, and
+drops CSS rules whose selectors never match anything in the markup.
+
+This is deliberately conservative and tailored to the pages produced by
+generate_report.py and image_to_html.py:
+
+- Whitespace-only runs between tags that contain a line break (template
+  indentation) are removed next to block-level or non-rendered tags, and
+  collapse to one space between inline tags, where they separate words.
+  Other whitespace runs collapse to one space.
+- <pre>, <textarea> and <script> contents are left untouched.
+- A CSS selector is treated as used when every class, id and element name
+  it mentions appears somewhere in the markup; pseudo-classes and attribute
+  selectors are ignored, so rules are only dropped when they cannot match.
+"""
+
+import re
+from typing import List, Set, Tuple
+
+
+STRING_PATTERN = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'')
+CSS_COMMENT_PATTERN = re.compile(r"/\*.*?\*/", re.S)
+HTML_COMMENT_PATTERN = re.compile(r"<!--(?!\[if).*?-->", re.S)
+RAW_BLOCK_PATTERN = re.compile(r"(<(pre|textarea|script)\b.*?</\2\s*>)", re.S | re.I)
+STYLE_BLOCK_PATTERN = re.compile(r"(<style\b[^>]*>)(.*?)(</style\s*>)", re.S | re.I)
+
+CLASS_ATTRIBUTE_PATTERN = re.compile(r'\bclass\s*=\s*(?:"([^"]*)"|\'([^\']*)\')', re.I)
+ID_ATTRIBUTE_PATTERN = re.compile(r'\bid\s*=\s*(?:"([^"]*)"|\'([^\']*)\')', re.I)
+TAG_PATTERN = re.compile(r"<([A-Za-z][A-Za-z0-9-]*)")
+LINE_GAP_PATTERN = re.compile(r">\s*\n\s*<|^\s*\n\s*|\s*\n\s*$")
+TAG_NAME_PATTERN = re.compile(r"</?([A-Za-z][A-Za-z0-9-]*)")
+
+# Elements whose boundaries whitespace never renders at: block-level HTML,
+# elements that are not rendered, and SVG shapes outside <text>
+BLOCK_TAGS = frozenset((
+    "html", "head", "body", "title", "meta", "link", "style", "script", "noscript", "base",
+    "div", "p", "h1", "h2", "h3", "h4", "h5", "h6", "ul", "ol", "li", "dl", "dt", "dd",
+    "table", "caption", "colgroup", "col", "thead", "tbody", "tfoot", "tr", "td", "th",
+    "section", "header", "footer", "nav", "main", "article", "aside", "figure", "figcaption",
+    "blockquote", "pre", "hr", "br", "form", "fieldset", "legend", "details", "summary",
+    "address", "option", "optgroup", "template",
+    "svg", "g", "defs", "path", "circle", "ellipse", "rect", "line", "polyline", "polygon",
+    "lineargradient", "radialgradient", "stop", "clippath", "mask", "symbol", "use",
+))
+
+SELECTOR_NOISE_PATTERN = re.compile(r"\[[^\]]*\]|::?[A-Za-z-]+(?:\([^)]*\))?")
+SELECTOR_CLASS_PATTERN = re.compile(r"\.(-?[_A-Za-z][\w-]*)")
+SELECTOR_ID_PATTERN = re.compile(r"#(-?[_A-Za-z][\w-]*)")
+SELECTOR_TAG_PATTERN = re.compile(r"(?:^|[\s>+~(])([A-Za-z][A-Za-z0-9-]*)")
+
+# At-rules whose bodies contain ordinary style rules that can be pruned
+NESTED_AT_RULES = ("@media", "@supports", "@document", "@layer")
+
+
+class MarkupUsage:
+    """The classes, ids and element names that appear in some markup."""
+
+    def __init__(self, html: str):
+        markup = STYLE_BLOCK_PATTERN.sub("", html)
+        self.classes: Set[str] = set()
+        for match in CLASS_ATTRIBUTE_PATTERN.finditer(markup):
+            self.classes.update((match.group(1) or match.group(2) or "").split())
+        self.ids: Set[str] = {
+            (match.group(1) or match.group(2) or "").strip()
+            for match in ID_ATTRIBUTE_PATTERN.finditer(markup)
+        }
+        self.tags: Set[str] = {tag.lower() for tag in TAG_PATTERN.findall(markup)}
+
+    def matches(self, selector: str) -> bool:
+        """Return False only if the selector cannot match the markup."""
+        selector = SELECTOR_NOISE_PATTERN.sub("", selector)
+        if any(name not in self.classes for name in SELECTOR_CLASS_PATTERN.findall(selector)):
+            return False
+        if any(name not in self.ids for name in SELECTOR_ID_PATTERN.findall(selector)):
+            return False
+        selector = SELECTOR_ID_PATTERN.sub("", SELECTOR_CLASS_PATTERN.sub("", selector))
+        return all(tag.lower() in self.tags for tag in SELECTOR_TAG_PATTERN.findall(selector))
+
+
+def _outside_strings(text: str, transform) -> str:
+    """Apply a transform to everything except quoted string literals."""
+    pieces = []
+    position = 0
+    for match in STRING_PATTERN.finditer(text):
+        pieces.append(transform(text[position:match.start()]))
+        pieces.append(match.group(0))
+        position = match.end()
+    pieces.append(transform(text[position:]))
+    return "".join(pieces)
+
+
+def _squeeze_declarations(text: str) -> str:
+    def squeeze(chunk):
+        chunk = re.sub(r"\s+", " ", chunk)
+        return re.sub(r"\s*([:;,{}])\s*", r"\1", chunk)
+    return _outside_strings(text, squeeze).strip().rstrip(";")
+
+
+def _squeeze_selector(text: str) -> str:
+    def squeeze(chunk):
+        chunk = re.sub(r"\s+", " ", chunk)
+        return re.sub(r"\s*([,>+~])\s*", r"\1", chunk)
+    return _outside_strings(text, squeeze).strip()
+
+
+def _split_blocks(css: str) -> List[Tuple[str, str]]:
+    """Split CSS into (prelude, body) pairs; body is None for ``@import;``-style statements."""
+    blocks = []
+    position = 0
+    length = len(css)
+    while position < length:
+        brace = css.find("{", position)
+        semicolon = css.find(";", position)
+        if brace == -1:
+            tail = css[position:].strip()
+            if tail:
+                blocks.append((tail.rstrip(";"), None))
+            break
+        if css[position:].lstrip().startswith("@") and semicolon != -1 and semicolon < brace:
+            blocks.append((css[position:semicolon].strip(), None))
+            position = semicolon + 1
+            continue
+
+        depth = 0
+        index = brace
+        while index < length:
+            char = css[index]
+            if char in "\"'":
+                match = STRING_PATTERN.match(css, index)
+                index = match.end() if match else index + 1
+                continue
+            if char == "{":
+                depth += 1
+            elif char == "}":
+                depth -= 1
+                if depth == 0:
+                    break
+            index += 1
+        blocks.append((css[position:brace].strip(), css[brace + 1:index]))
+        position = index + 1
+    return blocks
+
+
+def minify_css(css: str, usage: MarkupUsage = None) -> str:
+    """Minify a stylesheet, dropping rules that cannot match ``usage``."""
+    css = CSS_COMMENT_PATTERN.sub("", css)
+    output = []
+    for prelude, body in _split_blocks(css):
+        if body is None:
+            output.append(_squeeze_declarations(prelude) + ";")
+            continue
+        if prelude.startswith("@"):
+            at_rule = _squeeze_declarations(prelude)
+            if prelude.lower().startswith(NESTED_AT_RULES):
+                inner = minify_css(body, usage)
+                if inner:
+                    output.append(f"{at_rule}{{{inner}}}")
+            else:
+                output.append(f"{at_rule}{{{minify_css(body)}}}" if "{" in body
+                              else f"{at_rule}{{{_squeeze_declarations(body)}}}")
+            continue
+
+        selectors = [_squeeze_selector(selector) for selector in prelude.split(",")]
+        if usage is not None:
+            selectors = [selector for selector in selectors if usage.matches(selector)]
+        declarations = _squeeze_declarations(body)
+        if selectors and declarations:
+            output.append(f"{','.join(selectors)}{{{declarations}}}")
+    return "".join(output)
+
+
+def _is_block_boundary(tag: str) -> bool:
+    """Whether whitespace next to a tag (or doctype) never renders."""
+    match = TAG_NAME_PATTERN.match(tag)
+    return match is None or match.group(1).lower() in BLOCK_TAGS
+
+
+def _collapse_markup(markup: str) -> str:
+    # Pieces are split around <style>/<script>/... blocks, so their edges
+    # always border on a tag and are treated like the gaps between tags.
+    markup = HTML_COMMENT_PATTERN.sub("", markup)
+
+    def collapse(match):
+        if not match.group(0).startswith(">"):
+            return ""
+        previous = markup[markup.rfind("<", 0, match.start()):match.start()]
+        if _is_block_boundary(previous) or _is_block_boundary(markup[match.end() - 1:]):
+            return "><"
+        return "> <"
+
+    markup = LINE_GAP_PATTERN.sub(collapse, markup)
+    return re.sub(r"\s+", " ", markup)
+
+
+def minify_html(html: str, remove_unused_css: bool = True) -> str:
+    """Minify an HTML document and its inline <style> blocks."""
+    usage = MarkupUsage(html) if remove_unused_css else None
+
+    def minify_style(match):
+        return f"{match.group(1)}{minify_css(match.group(2), usage)}{match.group(3)}"
+
+    pieces = []
+    for index, piece in enumerate(RAW_BLOCK_PATTERN.split(html)):
+        # split() returns [text, raw block, tag name, text, ...]
+        if index % 3 == 1:
+            pieces.append(piece)
+        elif index % 3 == 0:
+            styled = []
+            position = 0
+            for match in STYLE_BLOCK_PATTERN.finditer(piece):
+                styled.append(_collapse_markup(piece[position:match.start()]))
+                styled.append(minify_style(match))
+                position = match.end()
+            styled.append(_collapse_markup(piece[position:]))
+            pieces.append("".join(styled))
+    return re.sub(r"^\s+|\s+$", "", "".join(pieces))
+
+
+def format_savings(before: int, after: int) -> str:
+    """Describe a size change, e.g. ``20,018 -> 11,402 bytes (-43.0%)``."""
+    change = (after - before) / before * 100 if before else 0.0
+    return f"{before:,} -> {after:,} bytes ({change:+.1f}%)"
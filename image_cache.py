@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Image Cache
+Persistent, content-addressed cache of base64-encoded images.
+
+Entries are keyed by the SHA-256 of the image bytes and hold the image
+metadata on the first line followed by the base64 payload, so a hit streams
+the payload straight into the page without reading or encoding the image.
+A small stat index maps (path, size, mtime) to the content hash, so
+unchanged files are not even re-hashed.
+
+Every file is written to a temporary name and renamed into place, so
+concurrent workers can share a cache directory. Hits refresh an entry's
+mtime, and when the cache grows beyond its size limit the least recently
+used entries are evicted.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterator, Tuple
+
+from atomic_file import atomic_write, write_file_atomic
+from generate_report import hash_file
+from image_metadata import ImageMetadata, read_image_metadata
+
+
+CACHE_DIR = Path(__file__).resolve().parent / ".image_cache"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+READ_CHUNK_SIZE = 1024 * 1024
+ENTRY_SUFFIX = ".b64"
+
+
+class Base64Cache:
+    """Size-bounded, on-disk LRU cache of base64-encoded images."""
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._objects = self.cache_dir / "objects"
+        self._index = self.cache_dir / "index"
+        self._objects.mkdir(parents=True, exist_ok=True)
+        self._index.mkdir(parents=True, exist_ok=True)
+
+    def content_hash(self, image_path: str) -> str:
+        """Return the SHA-256 of an image, via the stat index when possible."""
+        stat = os.stat(image_path)
+        signature = [stat.st_size, stat.st_mtime_ns]
+        index_path = self._index / hashlib.sha256(
+            os.path.abspath(image_path).encode('utf-8')).hexdigest()
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                size, mtime_ns, digest = json.load(f)
+            if [size, mtime_ns] == signature:
+                return digest
+        except (OSError, ValueError, TypeError):
+            pass
+        digest = hash_file(image_path)
+        if digest is None:
+            raise Exception(f"Error reading image file: {image_path}")
+        self._write_atomic(index_path, json.dumps(signature + [digest]).encode('utf-8'))
+        return digest
+
+    def get(self, image_path: str, encode,
+            variant: str = "") -> Tuple[ImageMetadata, Iterator[bytes]]:
+        """Return (metadata, base64 chunks) for an image.
+
+        On a miss, ``encode(image_path)`` supplies the base64 chunks; they
+        are streamed to the caller and into a new cache entry at the same
+        time, which is only committed once the payload is complete.
+        ``variant`` keeps differently encoded payloads of the same image
+        apart, e.g. optimized ones.
+        """
+        key = self.content_hash(image_path) + (f"-{variant}" if variant else "")
+        entry_path = self._objects / f"{key}{ENTRY_SUFFIX}"
+        try:
+            entry = open(entry_path, 'rb')
+        except OSError:
+            entry = None
+        if entry is not None:
+            try:
+                metadata = ImageMetadata(*json.loads(entry.readline().decode('utf-8')))
+            except (ValueError, TypeError):
+                entry.close()
+            else:
+                self.hits += 1
+                try:
+                    os.utime(entry_path)
+                except OSError:
+                    pass
+                return metadata, self._iter_entry(entry)
+
+        self.misses += 1
+        metadata = read_image_metadata(image_path)
+        return metadata, self._iter_store(entry_path, metadata, encode(image_path))
+
+    def _iter_entry(self, entry) -> Iterator[bytes]:
+        with entry:
+            yield from iter(lambda: entry.read(READ_CHUNK_SIZE), b"")
+
+    def _iter_store(self, entry_path: Path, metadata: ImageMetadata,
+                    chunks: Iterator[bytes]) -> Iterator[bytes]:
+        with atomic_write(entry_path) as f:
+            f.write(json.dumps(list(metadata)).encode('utf-8') + b"\n")
+            for chunk in chunks:
+                f.write(chunk)
+                yield chunk
+        self.evict()
+
+    def evict(self) -> int:
+        """Remove least recently used entries until the cache fits its limit."""
+        entries = []
+        total = 0
+        for item in os.scandir(self._objects):
+            if not item.name.endswith(ENTRY_SUFFIX):
+                continue
+            try:
+                stat = item.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, item.path))
+            total += stat.st_size
+        if total <= self.max_bytes:
+            return 0
+
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+                evicted += 1
+            except FileNotFoundError:
+                # Another worker evicted it first
+                pass
+            total -= size
+        self.evictions += evicted
+        return evicted
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit, miss and eviction counts plus the cache's entries and size."""
+        entries = 0
+        size = 0
+        for item in os.scandir(self._objects):
+            if item.name.endswith(ENTRY_SUFFIX):
+                entries += 1
+                size += item.stat().st_size
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'entries': entries, 'bytes': size}
+
+    def _write_atomic(self, path: Path, data: bytes) -> None:
+        try:
+            write_file_atomic(path, data)
+        except OSError:
+            pass
+
+
+def format_cache_stats(stats: Dict[str, int]) -> str:
+    """Describe cache counters, e.g. ``12 hits, 3 misses, 0 evictions (15 entries, 7.2 MB)``."""
+    return (f"{stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions "
+            f"({stats['entries']} entries, {stats['bytes'] / 1e6:.1f} MB)")
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Image Metadata
+Reads the real type and pixel dimensions of PNG, JPEG, GIF, BMP, WebP and
+SVG images from their headers, without decoding any pixels.
+
+Most formats store their size in the first few dozen bytes. JPEG keeps it in
+the SOF segment, which can follow large EXIF or ICC segments, so JPEG
+segments are skipped by seeking over them instead of reading them. The EXIF
+orientation is honoured, as browsers display rotated JPEGs upright.
+"""
+
+import re
+import struct
+from typing import BinaryIO, Callable, NamedTuple, Optional
+
+
+HEADER_SIZE = 4096
+
+# JPEG start-of-frame markers, i.e. every SOFn except DHT (C4), JPG (C8) and DAC (CC)
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# Markers without a length field
+JPEG_STANDALONE_MARKERS = frozenset(range(0xD0, 0xDA)) | {0x01}
+# EXIF orientations that rotate the image by 90 or 270 degrees
+EXIF_TRANSPOSED_ORIENTATIONS = frozenset((5, 6, 7, 8))
+
+SVG_TAG_PATTERN = re.compile(rb"<svg\b[^>]*>", re.S | re.I)
+SVG_LENGTH_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(?:px)?\s*$")
+
+
+class ImageMetadata(NamedTuple):
+    """An image's MIME type and pixel size; unknown values are None."""
+    mime_type: Optional[str]
+    width: Optional[int]
+    height: Optional[int]
+
+
+def _png(header: bytes) -> ImageMetadata:
+    if header[12:16] != b"IHDR":
+        return ImageMetadata('image/png', None, None)
+    width, height = struct.unpack(">II", header[16:24])
+    return ImageMetadata('image/png', width, height)
+
+
+def _gif(header: bytes) -> ImageMetadata:
+    width, height = struct.unpack("<HH", header[6:10])
+    return ImageMetadata('image/gif', width, height)
+
+
+def _bmp(header: bytes) -> ImageMetadata:
+    dib_size = struct.unpack("<I", header[14:18])[0]
+    if dib_size == 12:
+        width, height = struct.unpack("<HH", header[18:22])
+    else:
+        width, height = struct.unpack("<ii", header[18:26])
+    # A negative height marks a top-down bitmap
+    return ImageMetadata('image/bmp', abs(width), abs(height))
+
+
+def _webp(header: bytes) -> ImageMetadata:
+    chunk = header[12:16]
+    if chunk == b"VP8 " and header[23:26] == b"\x9d\x01\x2a":
+        width, height = struct.unpack("<HH", header[26:30])
+        return ImageMetadata('image/webp', width & 0x3FFF, height & 0x3FFF)
+    if chunk == b"VP8L" and header[20:21] == b"\x2f":
+        bits = struct.unpack("<I", header[21:25])[0]
+        return ImageMetadata('image/webp', (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1)
+    # The VP8X chunk holds flags, reserved bytes and two 24-bit sizes
+    if chunk == b"VP8X" and len(header) >= 30 and struct.unpack("<I", header[16:20])[0] >= 10:
+        return ImageMetadata('image/webp', int.from_bytes(header[24:27], 'little') + 1,
+                             int.from_bytes(header[27:30], 'little') + 1)
+    return ImageMetadata('image/webp', None, None)
+
+
+def _exif_orientation(segment: bytes) -> Optional[int]:
+    """Return the orientation tag of an APP1 EXIF segment payload."""
+    if not segment.startswith(b"Exif\x00\x00"):
+        return None
+    tiff = segment[6:]
+    order = {b"II": "<", b"MM": ">"}.get(tiff[:2])
+    if order is None or len(tiff) < 8:
+        return None
+    ifd_offset = struct.unpack(order + "I", tiff[4:8])[0]
+    if ifd_offset + 2 > len(tiff):
+        return None
+    entries = struct.unpack(order + "H", tiff[ifd_offset:ifd_offset + 2])[0]
+    for index in range(entries):
+        entry = tiff[ifd_offset + 2 + index * 12:ifd_offset + 14 + index * 12]
+        if len(entry) < 12:
+            break
+        tag, _, _ = struct.unpack(order + "HHI", entry[:8])
+        if tag == 0x0112:
+            return struct.unpack(order + "H", entry[8:10])[0]
+    return None
+
+
+def _jpeg(read_at: Callable[[int, int], bytes]) -> ImageMetadata:
+    position = 2
+    orientation = None
+    while True:
+        marker = read_at(position, 4)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return ImageMetadata('image/jpeg', None, None)
+        code = marker[1]
+        if code == 0xFF:
+            # Fill byte before a marker
+            position += 1
+            continue
+        if code in JPEG_STANDALONE_MARKERS:
+            position += 2
+            continue
+        if code == 0xD9 or code == 0xDA or len(marker) < 4:
+            # End of image or start of scan without a frame header
+            return ImageMetadata('image/jpeg', None, None)
+        length = struct.unpack(">H", marker[2:4])[0]
+        if length < 2:
+            return ImageMetadata('image/jpeg', None, None)
+        if code in JPEG_SOF_MARKERS:
+            frame = read_at(position + 5, 4)
+            if len(frame) < 4:
+                return ImageMetadata('image/jpeg', None, None)
+            height, width = struct.unpack(">HH", frame)
+            if orientation in EXIF_TRANSPOSED_ORIENTATIONS:
+                width, height = height, width
+            return ImageMetadata('image/jpeg', width, height)
+        if code == 0xE1 and orientation is None:
+            orientation = _exif_orientation(read_at(position + 4, min(length - 2, 65533)))
+        position += 2 + length
+
+
+def _svg_length(value: Optional[bytes]) -> Optional[float]:
+    if value is None:
+        return None
+    match = SVG_LENGTH_PATTERN.match(value.decode('ascii', 'replace'))
+    return float(match.group(1)) if match else None
+
+
+def _svg(header: bytes) -> ImageMetadata:
+    tag = SVG_TAG_PATTERN.search(header)
+    if tag is None:
+        return ImageMetadata('image/svg+xml', None, None)
+    attributes = dict(
+        (name.lower(), value) for name, _, value in
+        re.findall(rb"""([\w:-]+)\s*=\s*(["'])(.*?)\2""", tag.group(0), re.S)
+    )
+    width = _svg_length(attributes.get(b"width"))
+    height = _svg_length(attributes.get(b"height"))
+    view_box = attributes.get(b"viewbox", b"").replace(b",", b" ").split()
+    if len(view_box) == 4:
+        try:
+            box_width, box_height = float(view_box[2]), float(view_box[3])
+        except ValueError:
+            box_width = box_height = 0
+        if box_width > 0 and box_height > 0:
+            # Scale a single absolute length by the viewBox aspect ratio
+            if width is None and height is not None:
+                width = height * box_width / box_height
+            elif height is None and width is not None:
+                height = width * box_height / box_width
+            elif width is None and height is None:
+                width, height = box_width, box_height
+    if width is None or height is None:
+        return ImageMetadata('image/svg+xml', None, None)
+    return ImageMetadata('image/svg+xml', round(width), round(height))
+
+
+def detect_mime_type(header: bytes) -> Optional[str]:
+    """Identify an image type from its first bytes, or None."""
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return 'image/png'
+    if header[:3] == b"\xff\xd8\xff":
+        return 'image/jpeg'
+    if header[:6] in (b"GIF87a", b"GIF89a"):
+        return 'image/gif'
+    if header[:2] == b"BM":
+        return 'image/bmp'
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return 'image/webp'
+    if b"<svg" in header[:HEADER_SIZE].lower():
+        return 'image/svg+xml'
+    return None
+
+
+HEADER_PARSERS = {
+    'image/png': _png,
+    'image/gif': _gif,
+    'image/bmp': _bmp,
+    'image/webp': _webp,
+    'image/svg+xml': lambda header: _svg(header[:HEADER_SIZE]),
+}
+
+
+def parse_image_header(header: bytes, stream: Optional[BinaryIO] = None) -> ImageMetadata:
+    """Identify an image and its size from its first bytes.
+
+    A seekable ``stream`` lets JPEG parsing look past the header for its
+    frame segment; without one only ``header`` is searched.
+    """
+    mime_type = detect_mime_type(header)
+    try:
+        if mime_type == 'image/jpeg':
+            def read_at(offset, size):
+                if stream is None or offset + size <= len(header):
+                    return header[offset:offset + size]
+                stream.seek(offset)
+                return stream.read(size)
+            return _jpeg(read_at)
+        if mime_type in HEADER_PARSERS:
+            return HEADER_PARSERS[mime_type](header)
+    except struct.error:
+        # Truncated header: the type is known, the size is not
+        pass
+    return ImageMetadata(mime_type, None, None)
+
+
+def read_image_metadata(image_path: str) -> ImageMetadata:
+    """Read an image file's type and size from its header."""
+    try:
+        with open(image_path, 'rb') as f:
+            return parse_image_header(f.read(HEADER_SIZE), f)
+    except Exception as e:
+        raise Exception(f"Error reading image metadata: {e}")
+
+
+def size_attributes(metadata: ImageMetadata) -> str:
+    """Format ``width``/``height`` attributes for an <img> tag, if known."""
+    if not metadata.width or not metadata.height:
+        return ""
+    return f' width="{metadata.width}" height="{metadata.height}"'
+
@@ -5,11 +5,85 @@ Converts images to HTML files with various embedding options.
 """
 
 import base64
+import glob
+import itertools
+import mmap
 import os
+import sys
+import time
+import zlib
 import argparse
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Sequence, Tuple
 
+from generate_report import hash_bytes, load_build_manifest, save_build_manifest
+from asset_pipeline import AssetStore, format_dedup_report, write_headers_file
+from atomic_file import atomic_write
+from html_minify import format_savings, minify_html
+from image_cache import CACHE_DIR, DEFAULT_MAX_BYTES, Base64Cache, format_cache_stats
+from image_metadata import (HEADER_SIZE, detect_mime_type, parse_image_header,
+                            read_image_metadata, size_attributes)
+from png_codec import decode_png, downscale_rgba, encode_rgba, optimize_png, to_rgba8
+from precompress import (add_precompress_argument, format_compression_report,
+                         remove_precompressed, selected_formats, write_precompressed)
+from report_template import load_template
+from svg_minify import SVG_MIME_TYPE, can_inline_svg, inline_svg, minify_svg, svg_data_uri
+
+
+# Multiple of 3, so each chunk base64-encodes independently without padding,
+# and of the page size, so mapped chunks can be released page by page
+BASE64_CHUNK_SIZE = 3 * 256 * 1024
+
+IMAGE_MIME_TYPES = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.bmp': 'image/bmp',
+    '.webp': 'image/webp',
+    '.svg': 'image/svg+xml'
+}
+
+IMAGE_MANIFEST_FILE = ".image_manifest.json"
+
+# Default srcset widths, and the display width of the responsive page's image:
+# the viewport on small screens, the 1200px container otherwise
+SRCSET_WIDTHS = (480, 960, 1440)
+SRCSET_SIZES = "(max-width: 1200px) 100vw, 1200px"
+# Width of the blurred placeholder inlined by hybrid mode
+PLACEHOLDER_WIDTH = 16
+
+# Base64 caches already opened by this worker process
+_batch_base64_caches = {}
+# Default cache of hybrid placeholders, opened on first use; False if unusable
+_placeholder_cache = None
+CONVERTER_SOURCES = tuple(
+    Path(__file__).resolve().parent / name
+    for name in ("image_to_html.py", "image_metadata.py", "png_codec.py", "report_template.py",
+                 "html_minify.py", "precompress.py", "svg_minify.py", "asset_pipeline.py")
+)
+
+IMAGE_TEMPLATES = {
+    'base64': "image_base64.html",
+    'reference': "image_reference.html",
+    'responsive': "image_responsive.html",
+    'hybrid': "image_hybrid.html",
+}
+# The note under a referenced image, without and with an AssetStore
+REFERENCE_NOTES = (
+    "This HTML file references the image file. Make sure the image file is in the same "
+    "directory as the HTML file for proper display.",
+    "The image is stored under a content-hashed name in the assets directory, so it can be "
+    "cached indefinitely. Keep that directory next to this HTML file.",
+)
+
+# The <img> of the embedding modes, with its alt text and class
+IMAGE_ELEMENT_TEMPLATE = "elements/img.html"
+IMAGE_ELEMENTS = {
+    'base64': ("Embedded Image", ""),
+    'responsive': ("Responsive Image", "responsive-image"),
+}
 
 def image_to_base64(image_path: str) -> str:
     """Convert image to base64 string."""
@@ -24,380 +98,605 @@ def image_to_base64(image_path: str) -> str:
 def get_image_mime_type(image_path: str) -> str:
     """Get MIME type based on file extension."""
     ext = Path(image_path).suffix.lower()
-    mime_types = {
-        '.jpg': 'image/jpeg',
-        '.jpeg': 'image/jpeg',
-        '.png': 'image/png',
-        '.gif': 'image/gif',
-        '.bmp': 'image/bmp',
-        '.webp': 'image/webp',
-        '.svg': 'image/svg+xml'
+    return IMAGE_MIME_TYPES.get(ext, 'image/jpeg')
+
+
+def iter_image_chunks(source, chunk_size: int = BASE64_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield the bytes of an image path or binary stream in chunks.
+
+    Regular files are memory-mapped, so only the chunk being encoded is
+    copied into memory, and its pages are released once it has been used.
+    """
+    if not isinstance(source, (str, os.PathLike)):
+        yield from iter(lambda: source.read(chunk_size), b"")
+        return
+
+    with open(source, 'rb') as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # Empty files and special files cannot be mapped
+            mapped = None
+        if mapped is None:
+            yield from iter(lambda: f.read(chunk_size), b"")
+            return
+        with mapped:
+            for offset in range(0, len(mapped), chunk_size):
+                yield mapped[offset:offset + chunk_size]
+                if hasattr(mapped, 'madvise'):
+                    mapped.madvise(mmap.MADV_DONTNEED, offset, min(chunk_size, len(mapped) - offset))
+
+
+def iter_base64(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Base64-encode a stream of byte chunks, yielding encoded chunks.
+
+    Chunks are re-aligned to multiples of 3 bytes, so the output is the same
+    as encoding the whole input at once, even for short pipe reads.
+    """
+    remainder = b""
+    for chunk in chunks:
+        if remainder:
+            chunk = remainder + chunk
+        aligned = len(chunk) - len(chunk) % 3
+        remainder = chunk[aligned:]
+        if aligned == len(chunk):
+            yield base64.b64encode(chunk)
+        elif aligned:
+            yield base64.b64encode(chunk[:aligned])
+    if remainder:
+        yield base64.b64encode(remainder)
+
+
+def optimized_base64(data: bytes, report: Optional[dict] = None) -> Iterator[bytes]:
+    """Base64-encode image bytes, losslessly re-optimizing PNGs first.
+
+    Other image types are encoded unchanged. When a PNG is optimized,
+    ``report`` receives its size before and after.
+    """
+    if detect_mime_type(data[:HEADER_SIZE]) != 'image/png':
+        return iter_base64([data])
+    optimized = optimize_png(data)
+    if report is not None:
+        report.update(before=len(data), after=len(optimized))
+    return iter_base64([optimized])
+
+
+def render_png_variant(job) -> bytes:
+    """Downscale RGBA pixels to one srcset width and encode them as a PNG."""
+    rgba, width, height, new_width, new_height = job
+    return encode_rgba(downscale_rgba(rgba, width, height, new_width, new_height),
+                       new_width, new_height)
+
+
+def build_png_variants(data: bytes, widths: Sequence[int],
+                       workers: int = 1) -> List[Tuple[int, bytes]]:
+    """Return (width, PNG bytes) for each width below the image's own.
+
+    The PNG is decoded once; the variants are resized and encoded over a
+    process pool. Images that cannot be decoded to 8-bit RGBA (JPEGs,
+    16-bit or interlaced PNGs) get no variants.
+    """
+    if detect_mime_type(data[:HEADER_SIZE]) != 'image/png':
+        return []
+    try:
+        image = decode_png(data)
+    except (ValueError, zlib.error):
+        return []
+    rgba = to_rgba8(image)
+    if rgba is None:
+        return []
+    widths = sorted(set(width for width in widths if 0 < width < image.width))
+    jobs = [(rgba, image.width, image.height, width, max(1, round(image.height * width / image.width)))
+            for width in widths]
+    if workers <= 1 or len(jobs) <= 1:
+        return list(zip(widths, map(render_png_variant, jobs)))
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+        return list(zip(widths, executor.map(render_png_variant, jobs)))
+
+
+def png_placeholder(data: bytes) -> bytes:
+    """Return a PLACEHOLDER_WIDTH-wide copy of a PNG, or b"" if there is none."""
+    variants = build_png_variants(data, [PLACEHOLDER_WIDTH])
+    return variants[0][1] if variants else b""
+
+
+def default_placeholder_cache() -> Optional[Base64Cache]:
+    """Return the cache hybrid placeholders use without ``--cache``, or None
+    if it cannot be created. Decoding a large PNG in pure Python takes
+    seconds, so placeholders are always cached, by content hash."""
+    global _placeholder_cache
+    if _placeholder_cache is None:
+        try:
+            _placeholder_cache = Base64Cache(CACHE_DIR)
+        except OSError:
+            _placeholder_cache = False
+    return _placeholder_cache or None
+
+
+def placeholder_attributes(placeholder: bytes) -> str:
+    """Format ``style`` and ``onload`` attributes showing a placeholder,
+    stretched and therefore blurred, behind an image until it loads; it is
+    then removed, so it does not show through transparent pixels."""
+    if not placeholder:
+        return ""
+    return (' style="background: url(data:image/png;base64,'
+            f'{placeholder.decode("ascii")}) center / cover no-repeat"'
+            ' onload="this.style.background=\'none\'"')
+
+
+def iter_srcset_attributes(candidates: List[Tuple[object, int]]) -> Iterator[bytes]:
+    """Yield ``srcset``/``sizes`` attributes for (URL, width) candidates.
+
+    A URL is a string or an iterable of byte chunks, such as a streamed
+    base64 data URI.
+    """
+    yield b' srcset="'
+    for index, (url, width) in enumerate(candidates):
+        if index:
+            yield b", "
+        if isinstance(url, str):
+            yield url.encode('utf-8')
+        else:
+            yield from url
+        yield f" {width}w".encode('ascii')
+    yield f'" sizes="{SRCSET_SIZES}"'.encode('ascii')
+
+
+def iter_image_html(image_path: str, mode: str = "responsive", title: str = "Image Display",
+                    stream: Optional[BinaryIO] = None, cache: Optional[Base64Cache] = None,
+                    optimize: bool = False, report: Optional[dict] = None,
+                    srcset: Sequence[int] = (), workers: int = 1,
+                    assets: Optional[AssetStore] = None) -> Iterator[bytes]:
+    """Yield the HTML page for an image as UTF-8 chunks.
+
+    The image is base64-encoded chunk by chunk as the page is written, so
+    memory use does not grow with the image size. The MIME type and the
+    ``width``/``height`` attributes come from the image header, falling back
+    to the file extension for unrecognised types. With ``stream`` the image
+    is read from that binary file object; ``image_path`` is then only used
+    as the displayed name. With a ``Base64Cache`` the encoded payload and
+    metadata of previously seen image content are reused.
+
+    With ``optimize`` PNGs are losslessly re-encoded before embedding (see
+    png_codec.py); this reads the whole image into memory, and ``report``
+    receives the PNG's size before and after unless it came from the cache.
+
+    In responsive mode with an ``AssetStore``, ``srcset`` widths add
+    downscaled PNG variants to the <img> tag, generated by ``workers``
+    processes. The smallest variant is the fallback ``src`` and the
+    full-size image is the widest candidate; ``report['variants']``
+    receives each variant's width and size. Without a store they are
+    skipped: embedded variants would make every browser download them all.
+
+    Hybrid mode references the image file like reference mode, loaded
+    lazily, and inlines a tiny placeholder of PNGs as the <img> background;
+    ``report['placeholder']`` receives its size. Placeholders are cached
+    like payloads, in the default cache directory without a ``Base64Cache``.
+
+    In the embedding modes SVGs are minified (see svg_minify.py) and then
+    inlined or embedded as a percent-encoded data URI, whichever is
+    smaller; ``report['svg']`` receives their size before and after.
+
+    With an ``AssetStore`` the image, its srcset variants and minified SVGs
+    are linked as shared, content-hashed files under assets/ instead of
+    being embedded, so pages showing the same image share one copy. In
+    reference and hybrid mode this replaces linking the image by its own
+    file name.
+    """
+    if optimize:
+        encode = lambda path: optimized_base64(Path(path).read_bytes(), report)
+    else:
+        encode = lambda path: iter_base64(iter_image_chunks(path))
+
+    base64_chunks = None
+    svg_data = None
+    shared_src = None
+    variants = []
+    if stream is not None:
+        chunks = iter_image_chunks(stream)
+        header = next(chunks, b"")
+        metadata = parse_image_header(header)
+        chunks = itertools.chain([header], chunks)
+        if metadata.mime_type == SVG_MIME_TYPE:
+            svg_data = b"".join(chunks)
+        else:
+            if srcset and mode == "responsive" and assets is not None:
+                data = b"".join(chunks)
+                variants = build_png_variants(data, srcset, workers)
+                chunks = [data]
+            if optimize:
+                base64_chunks = optimized_base64(b"".join(chunks), report)
+            else:
+                base64_chunks = iter_base64(chunks)
+    elif mode == "hybrid":
+        encode = lambda path: iter_base64([png_placeholder(Path(path).read_bytes())])
+        placeholder_cache = cache if cache is not None else default_placeholder_cache()
+        if placeholder_cache is not None:
+            metadata, placeholder_chunks = placeholder_cache.get(image_path, encode, "placeholder")
+        else:
+            metadata = read_image_metadata(image_path)
+            placeholder_chunks = encode(image_path)
+        placeholder = b"".join(placeholder_chunks)
+        shared_src = assets.add_file(image_path) if assets is not None else None
+    else:
+        metadata = read_image_metadata(image_path)
+        if mode == "reference":
+            shared_src = assets.add_file(image_path) if assets is not None else None
+        elif metadata.mime_type == SVG_MIME_TYPE:
+            svg_data = Path(image_path).read_bytes()
+        else:
+            if assets is not None and optimize and metadata.mime_type == 'image/png':
+                data = Path(image_path).read_bytes()
+                optimized = optimize_png(data)
+                if report is not None:
+                    report.update(before=len(data), after=len(optimized))
+                shared_src = assets.add_bytes(optimized, ".png")
+            elif assets is not None:
+                shared_src = assets.add_file(image_path)
+            elif cache is not None:
+                metadata, base64_chunks = cache.get(image_path, encode,
+                                                    "optimized" if optimize else "")
+            else:
+                base64_chunks = encode(image_path)
+            if srcset and mode == "responsive" and assets is not None:
+                variants = build_png_variants(Path(image_path).read_bytes(), srcset, workers)
+
+    context = {
+        'title': title,
+        'filename': os.path.basename(image_path),
+        'mime_type': metadata.mime_type or get_image_mime_type(image_path),
+        'size_attributes': size_attributes(metadata),
     }
-    return mime_types.get(ext, 'image/jpeg')
+    if mode in ("reference", "hybrid"):
+        context['image_src'] = shared_src or context['filename']
+        context['reference_note'] = REFERENCE_NOTES[shared_src is not None]
+    if mode == "hybrid":
+        context['placeholder_attributes'] = placeholder_attributes(placeholder)
+        if report is not None and placeholder:
+            report['placeholder'] = len(placeholder)
+    if mode in IMAGE_ELEMENTS:
+        alt, css_class = IMAGE_ELEMENTS[mode]
+        element = {
+            'alt': alt,
+            'attributes': (f' class="{css_class}"' if css_class else "") + context['size_attributes'],
+            'srcset_attributes': "",
+        }
+        if svg_data is not None:
+            try:
+                svg = minify_svg(svg_data.decode('utf-8'))
+            except UnicodeDecodeError:
+                # Other encodings, e.g. Latin-1, are embedded byte for byte like other images
+                if assets is not None:
+                    shared_src = assets.add_bytes(svg_data, ".svg")
+                else:
+                    base64_chunks = iter_base64([svg_data])
+                svg_data = None
+        if svg_data is not None:
+            uri = svg_data_uri(svg)
+            inline = assets is None and can_inline_svg(svg) and len(svg) <= len(uri)
+            if report is not None:
+                report['svg'] = [len(svg_data), len(svg) if assets or inline else len(uri)]
+            if assets is not None:
+                context['embedding'] = "Shared asset"
+                element['src'] = assets.add_bytes(svg.encode('utf-8'), ".svg")
+            elif inline:
+                context['embedding'] = "Inline SVG"
+                context['image'] = inline_svg(svg, alt, css_class)
+                return load_template(IMAGE_TEMPLATES[mode]).iter_render(context)
+            else:
+                context['embedding'] = "SVG data URI"
+                element['src'] = uri
+        elif shared_src is not None:
+            context['embedding'] = "Shared asset"
+            element['src'] = shared_src
+        else:
+            context['embedding'] = "Base64 encoded"
+            element['src'] = itertools.chain(
+                [f"data:{context['mime_type']};base64,".encode('ascii')], base64_chunks)
+        if variants:
+            urls = [assets.add_bytes(png, ".png") for _, png in variants]
+            candidates = list(zip(urls, [width for width, _ in variants]))
+            candidates.append((element['src'], metadata.width))
+            element['srcset_attributes'] = iter_srcset_attributes(candidates)
+            element['src'] = urls[0]
+            if report is not None:
+                report['variants'] = [(width, len(png)) for width, png in variants]
+        context['image'] = load_template(IMAGE_ELEMENT_TEMPLATE).iter_render(element)
+    return load_template(IMAGE_TEMPLATES[mode]).iter_render(context)
 
 
-def create_html_with_base64(image_path: str, title: str = "Image Display") -> str:
+def create_html_with_base64(image_path: str, title: str = "Image Display",
+                            cache: Optional[Base64Cache] = None) -> str:
     """Create HTML with base64 encoded image."""
     try:
-        base64_string = image_to_base64(image_path)
-        mime_type = get_image_mime_type(image_path)
-        
-        html_content = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title}</title>
-    <style>
-        body {{
-            font-family: Arial, sans-serif;
-            margin: 0;
-            padding: 20px;
-            background-color: #f5f5f5;
-        }}
-        .container {{
-            max-width: 800px;
-            margin: 0 auto;
-            background-color: white;
-            padding: 20px;
-            border-radius: 8px;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }}
-        h1 {{
-            color: #333;
-            text-align: center;
-            margin-bottom: 30px;
-        }}
-        .image-container {{
-            text-align: center;
-            margin: 20px 0;
-        }}
-        img {{
-            max-width: 100%;
-            height: auto;
-            border-radius: 4px;
-            box-shadow: 0 4px 8px rgba(0,0,0,0.1);
-        }}
-        .image-info {{
-            background-color: #f8f9fa;
-            padding: 15px;
-            border-radius: 4px;
-            margin-top: 20px;
-            font-size: 14px;
-            color: #666;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>{title}</h1>
-        <div class="image-container">
-            <img src="data:{mime_type};base64,{base64_string}" alt="Embedded Image">
-        </div>
-        <div class="image-info">
-            <p><strong>Source:</strong> {os.path.basename(image_path)}</p>
-            <p><strong>Type:</strong> {mime_type}</p>
-            <p><strong>Embedding:</strong> Base64 encoded (self-contained)</p>
-        </div>
-    </div>
-</body>
-</html>"""
-        
-        return html_content
+        return b"".join(iter_image_html(image_path, "base64", title, cache=cache)).decode('utf-8')
     except Exception as e:
         raise Exception(f"Error creating HTML with base64: {e}")
 
 
 def create_html_with_reference(image_path: str, title: str = "Image Display") -> str:
     """Create HTML that references the image file."""
-    image_filename = os.path.basename(image_path)
-    
-    html_content = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title}</title>
-    <style>
-        body {{
-            font-family: Arial, sans-serif;
-            margin: 0;
-            padding: 20px;
-            background-color: #f5f5f5;
-        }}
-        .container {{
-            max-width: 800px;
-            margin: 0 auto;
-            background-color: white;
-            padding: 20px;
-            border-radius: 8px;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }}
-        h1 {{
-            color: #333;
-            text-align: center;
-            margin-bottom: 30px;
-        }}
-        .image-container {{
-            text-align: center;
-            margin: 20px 0;
-        }}
-        img {{
-            max-width: 100%;
-            height: auto;
-            border-radius: 4px;
-            box-shadow: 0 4px 8px rgba(0,0,0,0.1);
-        }}
-        .image-info {{
-            background-color: #f8f9fa;
-            padding: 15px;
-            border-radius: 4px;
-            margin-top: 20px;
-            font-size: 14px;
-            color: #666;
-        }}
-        .warning {{
-            background-color: #fff3cd;
-            border: 1px solid #ffeaa7;
-            color: #856404;
-            padding: 15px;
-            border-radius: 4px;
-            margin-top: 20px;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>{title}</h1>
-        <div class="image-container">
-            <img src="{image_filename}" alt="Referenced Image">
-        </div>
-        <div class="image-info">
-            <p><strong>Source:</strong> {image_filename}</p>
-            <p><strong>Embedding:</strong> File reference</p>
-        </div>
-        <div class="warning">
-            <p><strong>Note:</strong> This HTML file references the image file. Make sure the image file is in the same directory as the HTML file for proper display.</p>
-        </div>
-    </div>
-</body>
-</html>"""
-    
-    return html_content
+    return b"".join(iter_image_html(image_path, "reference", title)).decode('utf-8')
 
 
 def create_responsive_html(image_path: str, title: str = "Responsive Image Display") -> str:
     """Create HTML with responsive design and multiple image sizes."""
     try:
-        base64_string = image_to_base64(image_path)
-        mime_type = get_image_mime_type(image_path)
-        
-        html_content = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title}</title>
-    <style>
-        * {{
-            box-sizing: border-box;
-        }}
-        
-        body {{
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            margin: 0;
-            padding: 0;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-        }}
-        
-        .container {{
-            max-width: 1200px;
-            margin: 0 auto;
-            padding: 20px;
-        }}
-        
-        .header {{
-            text-align: center;
-            color: white;
-            margin-bottom: 40px;
-        }}
-        
-        .header h1 {{
-            font-size: 2.5rem;
-            margin-bottom: 10px;
-            text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
-        }}
-        
-        .header p {{
-            font-size: 1.1rem;
-            opacity: 0.9;
-        }}
-        
-        .image-card {{
-            background: white;
-            border-radius: 15px;
-            padding: 30px;
-            box-shadow: 0 20px 40px rgba(0,0,0,0.1);
-            margin-bottom: 30px;
-        }}
-        
-        .image-container {{
-            text-align: center;
-            margin: 20px 0;
-        }}
-        
-        .responsive-image {{
-            max-width: 100%;
-            height: auto;
-            border-radius: 10px;
-            box-shadow: 0 10px 30px rgba(0,0,0,0.2);
-            transition: transform 0.3s ease, box-shadow 0.3s ease;
-        }}
-        
-        .responsive-image:hover {{
-            transform: scale(1.02);
-            box-shadow: 0 15px 40px rgba(0,0,0,0.3);
-        }}
-        
-        .image-info {{
-            background: linear-gradient(135deg, #f8f9fa 0%, #e9ecef 100%);
-            padding: 20px;
-            border-radius: 10px;
-            margin-top: 25px;
-        }}
-        
-        .info-grid {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-            gap: 15px;
-            margin-top: 15px;
-        }}
-        
-        .info-item {{
-            background: white;
-            padding: 15px;
-            border-radius: 8px;
-            border-left: 4px solid #667eea;
-        }}
-        
-        .info-item strong {{
-            color: #667eea;
-            display: block;
-            margin-bottom: 5px;
-        }}
-        
-        .responsive-features {{
-            background: linear-gradient(135deg, #e3f2fd 0%, #bbdefb 100%);
-            padding: 20px;
-            border-radius: 10px;
-            margin-top: 20px;
-        }}
-        
-        .features-list {{
-            list-style: none;
-            padding: 0;
-        }}
-        
-        .features-list li {{
-            padding: 8px 0;
-            position: relative;
-            padding-left: 25px;
-        }}
-        
-        .features-list li:before {{
-            content: "✓";
-            position: absolute;
-            left: 0;
-            color: #4caf50;
-            font-weight: bold;
-        }}
-        
-        @media (max-width: 768px) {{
-            .container {{
-                padding: 15px;
-            }}
-            
-            .header h1 {{
-                font-size: 2rem;
-            }}
-            
-            .image-card {{
-                padding: 20px;
-            }}
-            
-            .info-grid {{
-                grid-template-columns: 1fr;
-            }}
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>{title}</h1>
-            <p>Professional image display with responsive design</p>
-        </div>
-        
-        <div class="image-card">
-            <div class="image-container">
-                <img src="data:{mime_type};base64,{base64_string}" 
-                     alt="Responsive Image" 
-                     class="responsive-image">
-            </div>
-            
-            <div class="image-info">
-                <h3>Image Information</h3>
-                <div class="info-grid">
-                    <div class="info-item">
-                        <strong>Filename</strong>
-                        {os.path.basename(image_path)}
-                    </div>
-                    <div class="info-item">
-                        <strong>Type</strong>
-                        {mime_type}
-                    </div>
-                    <div class="info-item">
-                        <strong>Embedding</strong>
-                        Base64 encoded
-                    </div>
-                    <div class="info-item">
-                        <strong>Design</strong>
-                        Responsive
-                    </div>
-                </div>
-            </div>
-            
-            <div class="responsive-features">
-                <h3>Responsive Features</h3>
-                <ul class="features-list">
-                    <li>Automatically scales to fit screen size</li>
-                    <li>Mobile-friendly design</li>
-                    <li>Smooth hover animations</li>
-                    <li>Professional styling</li>
-                    <li>Cross-browser compatibility</li>
-                    <li>Self-contained (no external dependencies)</li>
-                </ul>
-            </div>
-        </div>
-    </div>
-</body>
-</html>"""
-        
-        return html_content
+        return b"".join(iter_image_html(image_path, "responsive", title)).decode('utf-8')
     except Exception as e:
         raise Exception(f"Error creating responsive HTML: {e}")
 
 
+def create_hybrid_html(image_path: str, title: str = "Image Display") -> str:
+    """Create HTML with an inline placeholder for a lazily loaded image file."""
+    return b"".join(iter_image_html(image_path, "hybrid", title)).decode('utf-8')
+
+
+def write_image_page(chunks: Iterable[bytes], output, minify: bool = False,
+                     precompress: Iterable[str] = ()):
+    """Write page chunks to an output path or binary stream.
+
+    Paths are replaced atomically, with any precompressed siblings written
+    first. The page is streamed unless it has to be minified or compressed.
+    Returns (rendered bytes, written bytes, sibling sizes).
+    """
+    precompress = list(precompress)
+    buffered = minify or precompress
+    if buffered:
+        data = b"".join(chunks)
+        rendered_size = len(data)
+        if minify:
+            data = minify_html(data.decode('utf-8')).encode('utf-8')
+        chunks = [data]
+
+    if not isinstance(output, str):
+        size = 0
+        for chunk in chunks:
+            output.write(chunk)
+            size += len(chunk)
+        output.flush()
+        return rendered_size if buffered else size, size, {}
+
+    compressed = {}
+    if precompress:
+        compressed = write_precompressed(output, data, precompress)
+    else:
+        remove_precompressed(output)
+    size = 0
+    with atomic_write(output) as f:
+        for chunk in chunks:
+            f.write(chunk)
+            size += len(chunk)
+    return rendered_size if buffered else size, size, compressed
+
+
+def expand_image_inputs(inputs: List[str]) -> List[str]:
+    """Expand directories and glob patterns into a sorted list of image files."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(os.path.join(item, name) for name in sorted(os.listdir(item))
+                         if Path(name).suffix.lower() in IMAGE_MIME_TYPES
+                         and os.path.isfile(os.path.join(item, name)))
+        elif glob.has_magic(item):
+            paths.extend(path for path in sorted(glob.glob(item, recursive=True))
+                         if os.path.isfile(path))
+        else:
+            paths.append(item)
+    # Keep the first occurrence of each file
+    return list(dict.fromkeys(paths))
+
+
+def converter_fingerprint(options: dict) -> str:
+    """Hash of the page and element templates, the converter code and the output options."""
+    parts = [load_template(name).digest for name in (IMAGE_TEMPLATES[options['mode']], IMAGE_ELEMENT_TEMPLATE)]
+    parts.extend(f"{key}={value}" for key, value in sorted(options.items()))
+    sources = b"".join(path.read_bytes() for path in CONVERTER_SOURCES)
+    return hash_bytes(" ".join(parts).encode('utf-8') + sources)
+
+
+def is_image_up_to_date(entry, image_path, output_path, fingerprint) -> bool:
+    """Check a manifest entry against the image, the options and the outputs."""
+    if not entry or entry.get('fingerprint') != fingerprint:
+        return False
+    try:
+        image_stat = os.stat(image_path)
+        output_stat = os.stat(output_path)
+    except OSError:
+        return False
+    if [image_stat.st_size, image_stat.st_mtime_ns] != entry.get('image'):
+        return False
+    if [output_stat.st_size, output_stat.st_mtime_ns] != entry.get('output'):
+        return False
+    output_dir = os.path.dirname(output_path) or "."
+    if not all(os.path.exists(os.path.join(output_dir, asset)) for asset in entry.get('assets', [])):
+        return False
+    return all(os.path.exists(f"{output_path}.{fmt}") for fmt in entry.get('precompress', []))
+
+
+def convert_image_job(job) -> dict:
+    """Convert one image in a batch, returning its sizes or the error, and
+    this job's hits, misses and evictions on the worker's base64 cache."""
+    image_path, output_path, options, cache_settings = job
+    result = {'image_path': image_path, 'output_path': output_path, 'error': None}
+    cache = None
+    if cache_settings is not None:
+        if cache_settings not in _batch_base64_caches:
+            _batch_base64_caches[cache_settings] = Base64Cache(*cache_settings)
+        cache = _batch_base64_caches[cache_settings]
+        counts = (cache.hits, cache.misses, cache.evictions)
+    assets = None
+    if options['shared_assets']:
+        assets = AssetStore(os.path.dirname(output_path) or ".", link=options['link_assets'])
+    try:
+        report = {}
+        # Images are already converted in parallel, so variants are not
+        chunks = iter_image_html(image_path, options['mode'], options['title'], cache=cache,
+                                 optimize=options['optimize_png'], report=report,
+                                 srcset=options['srcset'], assets=assets)
+        rendered, written, compressed = write_image_page(
+            chunks, output_path, options['minify'], options['precompress'])
+        image_stat = os.stat(image_path)
+        output_stat = os.stat(output_path)
+        result.update(
+            input_bytes=image_stat.st_size, rendered_bytes=rendered, written_bytes=written,
+            compressed=compressed,
+            image=[image_stat.st_size, image_stat.st_mtime_ns],
+            output=[output_stat.st_size, output_stat.st_mtime_ns],
+        )
+        if 'before' in report:
+            result['png'] = [report['before'], report['after']]
+        if 'variants' in report:
+            result['variants'] = report['variants']
+        if 'svg' in report:
+            result['svg'] = report['svg']
+        if assets is not None:
+            result['shared_assets'] = assets.references
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    if cache is not None:
+        result['cache'] = [cache.hits - counts[0], cache.misses - counts[1],
+                           cache.evictions - counts[2]]
+    return result
+
+
+def iter_bounded(executor, function, jobs, limit: int):
+    """Map jobs over an executor with at most ``limit`` in flight,
+    yielding results as they complete."""
+    pending = set()
+    for job in jobs:
+        if len(pending) >= limit:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+        pending.add(executor.submit(function, job))
+    for future in pending:
+        yield future.result()
+
+
+def run_batch(inputs: List[str], output_dir: str, options: dict, workers: Optional[int] = None,
+              force: bool = False, cache_settings: Optional[tuple] = None,
+              headers: bool = False) -> int:
+    """Convert every image matched by ``inputs`` into ``output_dir``.
+
+    Images whose page is up to date with the build manifest are skipped. The
+    rest are converted over a process pool with a bounded number of jobs in
+    flight, each streaming its image, so memory does not grow with the batch.
+    ``cache_settings`` is (cache_dir, max_bytes) for a shared Base64Cache.
+    With ``headers`` a _headers file marking the shared assets immutable is
+    written to ``output_dir``.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    manifest = {} if force else load_build_manifest(output_dir, IMAGE_MANIFEST_FILE)
+    fingerprint = converter_fingerprint(options)
+
+    jobs = []
+    outputs = {}
+    skipped = 0
+    for image_path in expand_image_inputs(inputs):
+        output_path = os.path.join(output_dir, f"{Path(image_path).stem}.html")
+        if output_path in outputs:
+            print(f"⚠️  Skipping {image_path}: {output_path} is already written from {outputs[output_path]}")
+            continue
+        outputs[output_path] = image_path
+        if is_image_up_to_date(manifest.get(os.path.basename(output_path)), image_path,
+                               output_path, fingerprint):
+            skipped += 1
+            continue
+        jobs.append((image_path, output_path, options, cache_settings))
+
+    print(f"📦 Converting {len(jobs)} image(s) with {workers} worker(s), {skipped} up to date...")
+    start = time.perf_counter()
+    if workers == 1 or len(jobs) <= 1:
+        results = [convert_image_job(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(iter_bounded(executor, convert_image_job, jobs, workers * 2))
+    elapsed = time.perf_counter() - start
+
+    failures = []
+    for result in results:
+        key = os.path.basename(result['output_path'])
+        if result['error']:
+            failures.append((result['image_path'], result['error']))
+            manifest.pop(key, None)
+            continue
+        manifest[key] = {
+            'fingerprint': fingerprint,
+            'image': result['image'],
+            'output': result['output'],
+            'precompress': list(options['precompress']),
+        }
+        if result.get('shared_assets'):
+            manifest[key]['assets'] = sorted(result['shared_assets'])
+    save_build_manifest(output_dir, manifest, IMAGE_MANIFEST_FILE)
+
+    converted = [result for result in results if not result['error']]
+    input_bytes = sum(result['input_bytes'] for result in converted)
+    written_bytes = sum(result['written_bytes'] for result in converted)
+    seconds = elapsed if elapsed > 0 else 1.0
+    print(f"✅ Converted {len(converted)}, skipped {skipped}, failed {len(failures)} in {output_dir} "
+          f"({elapsed:.2f}s, {len(converted) / seconds:.1f} files/s, "
+          f"{input_bytes / seconds / 1e6:.1f} MB/s in, {written_bytes / seconds / 1e6:.1f} MB/s out)")
+    if options['minify'] and converted:
+        print("🗜️  Minified: " + format_savings(
+            sum(result['rendered_bytes'] for result in converted), written_bytes))
+    if options['precompress'] and converted:
+        print(f"📦 Precompressed {len(converted)} page(s):")
+        compressed = {fmt: sum(result['compressed'][fmt] for result in converted)
+                      for fmt in options['precompress']}
+        for line in format_compression_report(written_bytes, compressed):
+            print(f"   {line}")
+    optimized = [result for result in converted if 'png' in result]
+    if optimized:
+        print(f"🖼️  Optimized {len(optimized)} PNG(s):")
+        for result in optimized:
+            print(f"   - {result['image_path']}: {format_savings(*result['png'])}")
+        print("   Total: " + format_savings(sum(result['png'][0] for result in optimized),
+                                          sum(result['png'][1] for result in optimized)))
+    minified_svgs = [result for result in converted if 'svg' in result]
+    if minified_svgs:
+        print(f"✏️  Minified {len(minified_svgs)} SVG(s):")
+        for result in minified_svgs:
+            print(f"   - {result['image_path']}: {format_savings(*result['svg'])}")
+        print("   Total: " + format_savings(sum(result['svg'][0] for result in minified_svgs),
+                                          sum(result['svg'][1] for result in minified_svgs)))
+    if options['shared_assets'] and converted:
+        print("🔗 Shared assets: " + format_dedup_report(
+            result.get('shared_assets', {}) for result in converted))
+    if headers:
+        print(f"🧾 Immutable cache rule for assets: {write_headers_file(output_dir)}")
+    with_variants = [result for result in converted if 'variants' in result]
+    if options['srcset'] and converted:
+        print(f"📐 srcset variants for {len(with_variants)} of {len(converted)} image(s)")
+    if cache_settings is not None:
+        stats = Base64Cache(*cache_settings).stats()
+        for result in results:
+            for key, count in zip(('hits', 'misses', 'evictions'), result.get('cache', ())):
+                stats[key] += count
+        print(f"🗃️  Base64 cache: {format_cache_stats(stats)}")
+    if failures:
+        print(f"❌ {len(failures)} image(s) failed:")
+        for image_path, error in failures:
+            print(f"   - {image_path}: {error}")
+    return 1 if failures else 0
+
+
 def main():
     """Main function to handle command line arguments and conversion."""
     parser = argparse.ArgumentParser(
         description="Convert images to HTML files with various embedding options"
     )
-    parser.add_argument("image_path", help="Path to the input image file")
+    parser.add_argument(
+        "image_paths",
+        nargs="+",
+        metavar="image_path",
+        help="Input image file, or - to read stdin; several files, directories or globs convert in batch"
+    )
     parser.add_argument(
         "-o", "--output", 
-        help="Output HTML file path (default: auto-generated)"
+        help="Output HTML file path, or - for stdout (default: auto-generated, stdout for stdin)"
     )
     parser.add_argument(
         "-t", "--title", 
@@ -406,46 +705,182 @@ def main():
     )
     parser.add_argument(
         "-m", "--mode",
-        choices=["base64", "reference", "responsive"],
+        choices=["base64", "reference", "responsive", "hybrid"],
         default="responsive",
-        help="HTML generation mode (default: responsive)"
+        help="HTML generation mode (default: responsive). Hybrid mode decodes PNGs in pure "
+             "Python for its placeholders, seconds for large ones, and keeps them in "
+             f"{CACHE_DIR.name}/ or the --cache directory"
+    )
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="Strip whitespace, comments and unused CSS rules from the output"
+    )
+    add_precompress_argument(parser)
+    parser.add_argument(
+        "--optimize-png",
+        action="store_true",
+        help="Losslessly re-encode PNGs smaller before embedding them"
+    )
+    parser.add_argument(
+        "--srcset",
+        nargs="*",
+        type=int,
+        metavar="WIDTH",
+        help="Responsive mode with --shared-assets: also link PNGs downscaled to these widths "
+             f"in a srcset (default: {' '.join(map(str, SRCSET_WIDTHS))})"
+    )
+    parser.add_argument(
+        "--shared-assets",
+        action="store_true",
+        help="Link images as content-hashed files under assets/ next to the pages, "
+             "stored once however many pages show them, instead of embedding them "
+             "(always on in reference and hybrid mode, except on stdout)"
+    )
+    parser.add_argument(
+        "--link-assets",
+        action="store_true",
+        help="Hard-link image files into assets/ instead of copying them"
+    )
+    parser.add_argument(
+        "--headers",
+        action="store_true",
+        help="Write a _headers file next to the pages that marks assets/ immutable for a year"
+    )
+    parser.add_argument(
+        "--cache",
+        nargs="?",
+        const=str(CACHE_DIR),
+        metavar="DIR",
+        help=f"Reuse base64 payloads of previously embedded images from an on-disk cache (default: {CACHE_DIR.name}/)"
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        metavar="MB",
+        help="Evict least recently used cache entries beyond this size (default: %(default)s MB)"
+    )
+    parser.add_argument(
+        "--output-dir",
+        help="Batch output directory (default: current directory)"
+    )
+    parser.add_argument(
+        "-j", "--workers",
+        type=int,
+        default=None,
+        help="Worker processes for batch conversion or srcset variants (default: CPU count)"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Convert every image in a batch even if its page is up to date"
     )
     
     args = parser.parse_args()
-    
-    # Check if input file exists
-    if not os.path.exists(args.image_path):
-        print(f"Error: Image file '{args.image_path}' not found.")
+    formats = selected_formats(args.precompress)
+    cache_settings = (args.cache, args.cache_size * 1024 * 1024) if args.cache else None
+    srcset = tuple(args.srcset or SRCSET_WIDTHS) if args.srcset is not None else ()
+    shared_assets = args.shared_assets or args.mode in ("reference", "hybrid")
+    if srcset and args.mode != "responsive":
+        print("Error: --srcset needs responsive mode.")
         return 1
+    if srcset and not args.shared_assets:
+        # Embedded variants would add to the page instead of replacing the full image
+        print("Error: --srcset needs --shared-assets, so the variants are separate files.")
+        return 1
+    
+    # Several inputs, a directory or a glob: convert in batch
+    if (len(args.image_paths) > 1 or args.output_dir or os.path.isdir(args.image_paths[0])
+            or glob.has_magic(args.image_paths[0])):
+        if "-" in args.image_paths or args.output:
+            print("Error: batch conversion takes --output-dir, not stdin or -o.")
+            return 1
+        options = {'mode': args.mode, 'title': args.title, 'minify': args.minify,
+                   'precompress': tuple(formats), 'optimize_png': args.optimize_png,
+                   'srcset': srcset, 'shared_assets': shared_assets,
+                   'link_assets': args.link_assets}
+        return run_batch(args.image_paths, args.output_dir or ".", options, args.workers, args.force,
+                         cache_settings, args.headers)
+    
+    args.image_path = args.image_paths[0]
+    from_stdin = args.image_path == "-"
     
     # Generate output filename if not specified
     if not args.output:
-        base_name = Path(args.image_path).stem
-        args.output = f"{base_name}.html"
+        args.output = "-" if from_stdin else f"{Path(args.image_path).stem}.html"
+    to_stdout = args.output == "-"
+    # Keep stdout clean for the page when piping
+    log = (lambda *values: print(*values, file=sys.stderr)) if to_stdout else print
+    
+    # Check if input file exists
+    if not from_stdin and not os.path.exists(args.image_path):
+        log(f"Error: Image file '{args.image_path}' not found.")
+        return 1
+    if from_stdin and args.mode in ("reference", "hybrid"):
+        log(f"Error: {args.mode} mode needs an image file, not stdin.")
+        return 1
+    if to_stdout and formats:
+        log("Error: --precompress needs an output file, not stdout.")
+        return 1
+    if args.shared_assets and (from_stdin or to_stdout):
+        log("Error: --shared-assets needs an image file and an output file.")
+        return 1
+    if args.headers and to_stdout:
+        log("Error: --headers needs an output file, not stdout.")
+        return 1
+    # A page on stdout has no directory to put assets next to
+    shared_assets = shared_assets and not to_stdout
     
     try:
-        # Generate HTML based on selected mode
-        if args.mode == "base64":
-            html_content = create_html_with_base64(args.image_path, args.title)
-        elif args.mode == "reference":
-            html_content = create_html_with_reference(args.image_path, args.title)
-        elif args.mode == "responsive":
-            html_content = create_responsive_html(args.image_path, args.title)
+        # Generate HTML based on selected mode, encoding the image as it is written
+        cache = Base64Cache(*cache_settings) if cache_settings and not from_stdin else None
+        report = {}
+        assets = None
+        if shared_assets:
+            assets = AssetStore(os.path.dirname(args.output) or ".", link=args.link_assets)
+        chunks = iter_image_html("stdin" if from_stdin else args.image_path, args.mode, args.title,
+                                 sys.stdin.buffer if from_stdin else None, cache,
+                                 args.optimize_png, report, srcset, args.workers or os.cpu_count() or 1,
+                                 assets)
         
         # Write HTML file
-        with open(args.output, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+        original_size, size, compressed = write_image_page(
+            chunks, sys.stdout.buffer if to_stdout else args.output, args.minify, formats)
         
-        print(f"✅ Successfully created HTML file: {args.output}")
-        print(f"📁 Input image: {args.image_path}")
-        print(f"🎨 Mode: {args.mode}")
-        print(f"📝 Title: {args.title}")
+        log(f"✅ Successfully created HTML file: {'<stdout>' if to_stdout else args.output}")
+        log(f"📁 Input image: {'<stdin>' if from_stdin else args.image_path}")
+        log(f"🎨 Mode: {args.mode}")
+        log(f"📝 Title: {args.title}")
+        if args.minify:
+            log(f"🗜️  Minified: {format_savings(original_size, size)}")
+        if formats:
+            log("📦 Precompressed:")
+            for line in format_compression_report(size, compressed):
+                log(f"   {line}")
+        if 'before' in report:
+            log(f"🖼️  PNG optimized: {format_savings(report['before'], report['after'])}")
+        if 'variants' in report:
+            log("📐 srcset variants: " + ", ".join(
+                f"{width}w ({size:,} bytes)" for width, size in report['variants']))
+        elif srcset:
+            log("⚠️  No srcset variants: they need an 8-bit, non-interlaced PNG wider than the smallest width.")
+        if 'svg' in report:
+            log(f"✏️  SVG minified: {format_savings(*report['svg'])}")
+        if 'placeholder' in report:
+            log(f"🌫️  Inline placeholder: {report['placeholder']:,} bytes")
+        if cache is not None:
+            log(f"🗃️  Base64 cache: {format_cache_stats(cache.stats())}")
+        if assets is not None and assets.references:
+            log(f"🔗 Shared assets ({assets.written} written): {', '.join(assets.references)}")
+        if args.headers:
+            log(f"🧾 Immutable cache rule for assets: {write_headers_file(os.path.dirname(args.output) or '.')}")
         
-        if args.mode == "reference":
-            print("\n⚠️  Note: Make sure the image file is in the same directory as the HTML file.")
+        if args.mode in ("reference", "hybrid") and assets is None:
+            log("\n⚠️  Note: Make sure the image file is in the same directory as the HTML file.")
         
     except Exception as e:
-        print(f"❌ Error: {e}")
+        log(f"❌ Error: {e}")
         return 1
     
     return 0
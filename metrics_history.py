@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Metrics History
+Keeps the raw monthly numbers behind the report's metric cards in a local
+SQLite database, one row per tenant, metric and month, and derives the
+cards from them instead of having their text typed into every config.
+
+derive_metric_cards() handles every tenant and month at once: a single
+query pairs each month's value with the month before it, and one pass
+formats the displayed value, change percentage and description from the
+same two numbers, so they can no longer contradict each other.
+"""
+
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+
+HISTORY_DB = Path(__file__).resolve().parent / "metrics_history.db"
+
+# Months are stored as year * 12 + month - 1, so the previous month is index - 1
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metrics (
+    tenant TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    month INTEGER NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (tenant, metric, month)
+) WITHOUT ROWID
+"""
+
+# Totals ingested from individual log files; a metric's monthly value is
+# the sum over its source files
+SOURCE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS source_totals (
+    source TEXT NOT NULL,
+    tenant TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    month INTEGER NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (source, metric, tenant, month)
+) WITHOUT ROWID
+"""
+
+MONTH_PAIRS_QUERY = """
+SELECT current.tenant, current.month, current.metric, current.value, previous.value
+FROM metrics AS current
+LEFT JOIN metrics AS previous
+    ON previous.tenant = current.tenant
+    AND previous.metric = current.metric
+    AND previous.month = current.month - 1
+"""
+
+# Per metric: value style, description, and description when there is no
+# previous month to compare with. Descriptions can use {trend}, {total}
+# and {added}.
+METRIC_FORMATS = {
+    'views': (
+        'compact',
+        "Beacon views have {trend} with a total of {total} views",
+        "Beacon views reached a total of {total} views",
+    ),
+    'returning_users': (
+        'number',
+        "Beacon's returning users have {trend} with a total of {total}",
+        "Beacon had {total} returning users",
+    ),
+    'catalog_items': (
+        'number',
+        "{added} new software entities were onboarded in the last month",
+        "The catalog holds {total} software entities",
+    ),
+}
+NO_CHANGE = "n/a"
+
+MONTH_FORMATS = ("%B %Y", "%b %Y", "%Y-%m")
+
+
+def parse_month(text: str) -> int:
+    """Parse "February 2026", "Feb 2026" or "2026-02" into a month index."""
+    for month_format in MONTH_FORMATS:
+        try:
+            parsed = datetime.strptime(text.strip(), month_format)
+        except ValueError:
+            continue
+        return parsed.year * 12 + parsed.month - 1
+    raise ValueError(f"unrecognised month {text!r}, expected e.g. 'February 2026' or '2026-02'")
+
+
+def format_month(index: int) -> str:
+    """Format a month index as ``YYYY-MM``."""
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def format_compact(value: float) -> str:
+    """Abbreviate a count, e.g. 899 -> ``899``, 1250 -> ``1.3K``, 56000 -> ``56K``."""
+    units = ((1e3, "K"), (1e6, "M"), (1e9, "B"))
+    if abs(value) < units[0][0]:
+        return format_count(value)
+    index = max(i for i, (divisor, _) in enumerate(units) if abs(value) >= divisor)
+    divisor, suffix = units[index]
+    scaled = value / divisor
+    text = f"{scaled:.1f}" if abs(scaled) < 10 else f"{scaled:.0f}"
+    if abs(float(text)) >= 1000 and index + 1 < len(units):
+        # Rounded up into the next unit, e.g. 999,950 -> 1M rather than 1000K
+        divisor, suffix = units[index + 1]
+        text = f"{value / divisor:.1f}"
+    return (text[:-2] if text.endswith(".0") else text) + suffix
+
+
+def format_count(value: float) -> str:
+    """Format a count with thousands separators, e.g. ``3,456``."""
+    return f"{value:,.0f}" if value == int(value) else f"{value:,.1f}"
+
+
+class MetricsHistory:
+    """SQLite store of raw metric values per tenant, metric and month."""
+
+    def __init__(self, path=HISTORY_DB):
+        self.path = Path(path)
+        self.connection = sqlite3.connect(str(self.path))
+        self.connection.execute(SCHEMA)
+        self.connection.execute(SOURCE_SCHEMA)
+
+    def record(self, rows: Iterable[Tuple[str, str, str, float]]) -> int:
+        """Insert or replace (tenant, month, metric, value) rows and return how many."""
+        values = [(tenant, metric, parse_month(month) if isinstance(month, str) else month, float(value))
+                  for tenant, month, metric, value in rows]
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO metrics (tenant, metric, month, value) VALUES (?, ?, ?, ?)",
+                values)
+        return len(values)
+
+    def replace_source(self, source: str, metric: str,
+                       totals: Dict[Tuple[str, int], float]) -> None:
+        """Replace a source file's {(tenant, month index): value} totals of
+        a metric, and set each affected month to the sum over its sources."""
+        with self.connection:
+            affected = set(self.connection.execute(
+                "SELECT tenant, month FROM source_totals WHERE source = ? AND metric = ?",
+                (source, metric)))
+            affected.update(totals)
+            self.connection.execute(
+                "DELETE FROM source_totals WHERE source = ? AND metric = ?", (source, metric))
+            self.connection.executemany(
+                "INSERT INTO source_totals (source, tenant, metric, month, value) VALUES (?, ?, ?, ?, ?)",
+                ((source, tenant, metric, month, float(value)) for (tenant, month), value in totals.items()))
+            for tenant, month in affected:
+                self.connection.execute(
+                    "DELETE FROM metrics WHERE tenant = ? AND metric = ? AND month = ?",
+                    (tenant, metric, month))
+                self.connection.execute(
+                    "INSERT INTO metrics (tenant, metric, month, value) "
+                    "SELECT tenant, metric, month, SUM(value) FROM source_totals "
+                    "WHERE tenant = ? AND metric = ? AND month = ? GROUP BY tenant, metric, month",
+                    (tenant, metric, month))
+
+    def iter_month_pairs(self) -> Iterator[Tuple[str, int, str, float, Optional[float]]]:
+        """Yield (tenant, month, metric, value, previous month's value or None) for every row."""
+        return iter(self.connection.execute(MONTH_PAIRS_QUERY))
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def derive_metric_cards(pairs: Iterable[Tuple[str, int, str, float, Optional[float]]]
+                        ) -> Dict[Tuple[str, int], Dict[str, Dict[str, str]]]:
+    """Format metric cards from (tenant, month, metric, value, previous) rows.
+
+    Returns {(tenant, month index): {metric: {'value', 'change_percentage',
+    'description'}}}. Metrics without a card format are skipped.
+    """
+    cards = {}
+    for tenant, month, metric, value, previous in pairs:
+        formats = METRIC_FORMATS.get(metric)
+        if formats is None:
+            continue
+        style, description, first_description = formats
+        total = format_count(value)
+        if previous:
+            change = (value - previous) / previous * 100
+            change_percentage = f"{change:.1f}%"
+            if change > 0:
+                trend = f"increased {abs(change):.1f}%"
+            elif change < 0:
+                trend = f"decreased {abs(change):.1f}%"
+            else:
+                trend = "not changed"
+            added = format_count(value - previous) if value > previous else "No"
+            text = description.format(trend=trend, total=total, added=added)
+        else:
+            change_percentage = NO_CHANGE
+            text = first_description.format(total=total)
+        cards.setdefault((tenant, month), {})[metric] = {
+            'value': format_compact(value) if style == 'compact' else total,
+            'change_percentage': change_percentage,
+            'description': text,
+        }
+    return cards
+
+
+def load_metric_cards(path=HISTORY_DB) -> Dict[Tuple[str, int], Dict[str, Dict[str, str]]]:
+    """Derive the metric cards of every tenant and month in a history database."""
+    if not Path(path).exists():
+        raise Exception(f"Error opening metrics history: {path} not found")
+    with MetricsHistory(path) as history:
+        return derive_metric_cards(history.iter_month_pairs())
+
+
+def apply_metric_cards(config, metric_cards, default_tenant: str):
+    """Return (config with its metrics replaced from history, cards applied).
+
+    The tenant is ``report_metadata.tenant``, falling back to
+    ``default_tenant``, and the month is ``report_metadata.month``. Metrics
+    without history keep their config values; the config is returned
+    unchanged (with None) when there is nothing to apply.
+    """
+    try:
+        metadata = config['report_metadata']
+        key = (metadata.get('tenant') or default_tenant, parse_month(metadata['month']))
+    except (KeyError, TypeError, AttributeError, ValueError):
+        # Left for the schema check to report
+        return config, None
+    cards = metric_cards.get(key)
+    if not cards:
+        return config, None
+    metrics = dict(config['metrics']) if isinstance(config.get('metrics'), dict) else {}
+    metrics.update(cards)
+    return dict(config, metrics=metrics), cards
+
+
+def iter_csv_rows(path: str) -> Iterator[Tuple[str, str, str, str]]:
+    """Read (tenant, month, metric, value) rows from a CSV file with that header."""
+    stream = sys.stdin if path == "-" else open(path, 'r', encoding='utf-8', newline='')
+    try:
+        for row in csv.DictReader(stream):
+            yield row['tenant'], row['month'], row['metric'], row['value']
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Record raw monthly report metrics and show the metric cards derived from them"
+    )
+    parser.add_argument(
+        "--db",
+        default=str(HISTORY_DB),
+        help="History database (default: metrics_history.db next to this script)"
+    )
+    commands = parser.add_subparsers(dest="command")
+    record = commands.add_parser("record", help="Record one tenant's metrics for a month")
+    record.add_argument("tenant", help="Tenant name (report_metadata.tenant or the config's name)")
+    record.add_argument("month", help="Month, e.g. 'February 2026' or 2026-02")
+    record.add_argument("values", nargs="+", metavar="METRIC=VALUE",
+                        help="Raw metric values, e.g. views=56000 returning_users=899")
+    load = commands.add_parser("import", help="Import a CSV file with tenant,month,metric,value columns")
+    load.add_argument("csv_file", help="CSV file ('-' for stdin)")
+    show = commands.add_parser("show", help="Print the derived metric cards as JSON")
+    show.add_argument("--tenant", help="Only show this tenant")
+    show.add_argument("--month", help="Only show this month")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Main function for the metrics history command line."""
+    args = parse_args(argv)
+    if args.command is None:
+        print("❌ Error: choose a command: record, import or show")
+        return 1
+
+    try:
+        if args.command == "show":
+            cards = load_metric_cards(args.db)
+            month = parse_month(args.month) if args.month else None
+            selected = {f"{tenant} {format_month(index)}": metrics
+                        for (tenant, index), metrics in sorted(cards.items())
+                        if (args.tenant is None or tenant == args.tenant)
+                        and (month is None or index == month)}
+            print(json.dumps(selected, indent=4))
+            return 0
+
+        if args.command == "record":
+            rows = []
+            for item in args.values:
+                metric, separator, value = item.partition("=")
+                if not separator:
+                    print(f"❌ Error: expected METRIC=VALUE, got {item!r}")
+                    return 1
+                rows.append((args.tenant, args.month, metric, value))
+        else:
+            rows = iter_csv_rows(args.csv_file)
+        with MetricsHistory(args.db) as history:
+            count = history.record(rows)
+        print(f"✅ Recorded {count} metric value(s) in {args.db}")
+        return 0
+
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    exit(main())
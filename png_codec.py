@@ -0,0 +1,502 @@
+#!/usr/bin/env python3
+"""
+PNG Codec
+Decodes PNG images and losslessly re-encodes them smaller, using only zlib.
+
+The optimizer:
+
+- drops ancillary chunks except tRNS, which changes pixels;
+- drops an all-opaque alpha channel, turns grey RGB into greyscale and
+  turns 8-bit images with at most 256 colours into a palette;
+- tries the None, Sub and Up filters and a per-row adaptive choice,
+  compresses each at level 9 and tries more zlib strategies on the best;
+- decodes every result and keeps the smallest that is pixel-identical to
+  the input, so the output is never larger than the input.
+
+Scanline filtering runs on whole rows at once: each row is packed into one
+integer and bytes are added or subtracted in parallel (SWAR), so only the
+Average and Paeth filters of the input need per-byte Python loops.
+Interlaced PNGs are not decoded; they are only recompressed.
+
+Images can also be downscaled with a box filter, for srcset variants. The
+filter works the same way: rows, and then columns sliced out of the pixel
+array, are widened to 16-bit lanes and blended as whole integers. Colours
+are premultiplied by alpha around the blend, so transparent pixels do not
+darken their neighbours; runs of equal alpha are converted with one
+bytes.translate() each.
+"""
+
+import re
+import struct
+from array import array
+import zlib
+from typing import List, Optional, Tuple
+
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+# Ancillary chunks that change the decoded pixels, and so are kept
+KEPT_ANCILLARY_CHUNKS = (b"tRNS",)
+FILTER_STRATEGIES = ('none', 'sub', 'up', 'adaptive')
+ZLIB_STRATEGIES = (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED, zlib.Z_RLE)
+# Filtered bytes mapped to their distance from zero, for the adaptive heuristic
+ABS_TABLE = bytes(min(value, 256 - value) for value in range(256))
+# Per alpha value: colour bytes multiplied by alpha, and divided by it again
+PREMULTIPLY_TABLES = [bytes((value * alpha + 127) // 255 for value in range(256)) for alpha in range(256)]
+UNPREMULTIPLY_TABLES = [bytes(256)] + [bytes(min(255, (value * 255 + alpha // 2) // alpha) for value in range(256))
+                                       for alpha in range(1, 256)]
+TRANSLUCENT_RUN_PATTERN = re.compile(rb"([^\xff])\1*", re.S)
+
+
+class PngImage:
+    """A decoded, non-interlaced PNG: header fields plus unfiltered scanlines."""
+
+    def __init__(self, width: int, height: int, bit_depth: int, color_type: int,
+                 rows: List[bytes], palette: bytes = b"", transparency: Optional[bytes] = None):
+        self.width = width
+        self.height = height
+        self.bit_depth = bit_depth
+        self.color_type = color_type
+        self.rows = rows
+        self.palette = palette
+        self.transparency = transparency
+
+    @property
+    def channels(self) -> int:
+        return CHANNELS[self.color_type]
+
+    @property
+    def bytes_per_pixel(self) -> int:
+        """Filter distance in bytes: at least 1, even for sub-byte pixels."""
+        return max(1, self.channels * self.bit_depth // 8)
+
+    @property
+    def row_bytes(self) -> int:
+        return (self.width * self.channels * self.bit_depth + 7) // 8
+
+
+class _ByteLanes:
+    """Bytewise modular arithmetic on whole scanlines packed into one int."""
+
+    def __init__(self, length: int):
+        self.length = length
+        self.mask = (1 << (8 * length)) - 1
+        self.high = int.from_bytes(b"\x80" * length, 'little')
+        self.low = self.mask ^ self.high
+
+    def pack(self, row: bytes) -> int:
+        return int.from_bytes(row, 'little')
+
+    def unpack(self, value: int) -> bytes:
+        return value.to_bytes(self.length, 'little')
+
+    def add(self, a: int, b: int) -> int:
+        return ((a & self.low) + (b & self.low)) ^ ((a ^ b) & self.high)
+
+    def sub(self, a: int, b: int) -> int:
+        return ((a | self.high) - (b & self.low)) ^ ((a ^ b ^ self.mask) & self.high)
+
+    def shift(self, value: int, count: int) -> int:
+        """Move every byte ``count`` places towards the end of the row."""
+        return (value << (8 * count)) & self.mask
+
+
+def read_chunks(data: bytes) -> List[Tuple[bytes, bytes]]:
+    """Split a PNG into (type, payload) chunks, checking every CRC."""
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("not a PNG file")
+    chunks = []
+    position = len(PNG_SIGNATURE)
+    while position + 12 <= len(data):
+        length, chunk_type = struct.unpack(">I4s", data[position:position + 8])
+        payload = data[position + 8:position + 8 + length]
+        crc = data[position + 8 + length:position + 12 + length]
+        if len(payload) != length or len(crc) != 4:
+            raise ValueError(f"truncated {chunk_type.decode('latin-1')} chunk")
+        if struct.unpack(">I", crc)[0] != zlib.crc32(chunk_type + payload) & 0xFFFFFFFF:
+            raise ValueError(f"bad CRC in {chunk_type.decode('latin-1')} chunk")
+        chunks.append((chunk_type, payload))
+        position += 12 + length
+        if chunk_type == b"IEND":
+            return chunks
+    raise ValueError("missing IEND chunk")
+
+
+# Average and Paeth predict from the reconstructed byte one pixel back, so
+# each byte position within a pixel forms an independent sequence. Running
+# along one sequence at a time keeps the previous values in locals.
+
+def _unfilter_average(line: bytes, prior: bytes, bpp: int) -> bytes:
+    recon = bytearray(len(line))
+    for channel in range(bpp):
+        out = bytearray(len(line[channel::bpp]))
+        a = 0
+        for index, (x, b) in enumerate(zip(line[channel::bpp], prior[channel::bpp])):
+            a = (x + ((a + b) >> 1)) & 0xFF
+            out[index] = a
+        recon[channel::bpp] = out
+    return bytes(recon)
+
+
+def _unfilter_paeth(line: bytes, prior: bytes, bpp: int) -> bytes:
+    recon = bytearray(len(line))
+    for channel in range(bpp):
+        out = bytearray(len(line[channel::bpp]))
+        a = c = 0
+        for index, (x, b) in enumerate(zip(line[channel::bpp], prior[channel::bpp])):
+            pa = b - c
+            pb = a - c
+            pc = pa + pb
+            if pa < 0:
+                pa = -pa
+            if pb < 0:
+                pb = -pb
+            if pc < 0:
+                pc = -pc
+            if pa <= pb and pa <= pc:
+                a = (x + a) & 0xFF
+            elif pb <= pc:
+                a = (x + b) & 0xFF
+            else:
+                a = (x + c) & 0xFF
+            out[index] = a
+            c = b
+        recon[channel::bpp] = out
+    return bytes(recon)
+
+
+def unfilter_scanlines(raw: bytes, row_bytes: int, height: int, bpp: int) -> List[bytes]:
+    """Reverse the per-row PNG filters of decompressed image data."""
+    stride = row_bytes + 1
+    if len(raw) < stride * height:
+        raise ValueError("truncated image data")
+    lanes = _ByteLanes(row_bytes)
+    rows = []
+    prior = bytes(row_bytes)
+    for y in range(height):
+        filter_type = raw[y * stride]
+        line = raw[y * stride + 1:(y + 1) * stride]
+        if filter_type == 0:
+            recon = line
+        elif filter_type == 1:
+            # Sub is a running sum at distance bpp: a parallel prefix sum
+            value = lanes.pack(line)
+            distance = bpp
+            while distance < row_bytes:
+                value = lanes.add(value, lanes.shift(value, distance))
+                distance *= 2
+            recon = lanes.unpack(value)
+        elif filter_type == 2:
+            recon = lanes.unpack(lanes.add(lanes.pack(line), lanes.pack(prior)))
+        elif filter_type == 3:
+            recon = _unfilter_average(line, prior, bpp)
+        elif filter_type == 4:
+            recon = _unfilter_paeth(line, prior, bpp)
+        else:
+            raise ValueError(f"invalid filter type {filter_type}")
+        rows.append(recon)
+        prior = recon
+    return rows
+
+
+def decode_png(data: bytes) -> PngImage:
+    """Decode a non-interlaced PNG into unfiltered scanlines."""
+    chunks = read_chunks(data)
+    if chunks[0][0] != b"IHDR":
+        raise ValueError("missing IHDR chunk")
+    try:
+        width, height, bit_depth, color_type, compression, filter_method, interlace = \
+            struct.unpack(">IIBBBBB", chunks[0][1])
+    except struct.error:
+        raise ValueError("truncated IHDR chunk")
+    if (color_type not in CHANNELS or bit_depth not in (1, 2, 4, 8, 16)
+            or compression != 0 or filter_method != 0):
+        raise ValueError("unsupported PNG header")
+    if interlace:
+        raise ValueError("interlaced PNGs are not supported")
+
+    palette = b"".join(payload for chunk_type, payload in chunks if chunk_type == b"PLTE")
+    transparency = next((payload for chunk_type, payload in chunks if chunk_type == b"tRNS"), None)
+    try:
+        raw = zlib.decompress(b"".join(payload for chunk_type, payload in chunks if chunk_type == b"IDAT"))
+    except zlib.error as e:
+        raise ValueError(f"corrupt image data: {e}")
+    image = PngImage(width, height, bit_depth, color_type, [], palette, transparency)
+    image.rows = unfilter_scanlines(raw, image.row_bytes, height, image.bytes_per_pixel)
+    return image
+
+
+def filter_scanlines(image: PngImage, strategy: str) -> bytes:
+    """Filter an image's scanlines, prefixing each with its filter type."""
+    lanes = _ByteLanes(image.row_bytes)
+    bpp = image.bytes_per_pixel
+    pieces = []
+    prior = 0
+    for row in image.rows:
+        value = lanes.pack(row)
+        if strategy == 'none':
+            pieces.append(b"\x00" + row)
+        elif strategy == 'sub':
+            pieces.append(b"\x01" + lanes.unpack(lanes.sub(value, lanes.shift(value, bpp))))
+        elif strategy == 'up':
+            pieces.append(b"\x02" + lanes.unpack(lanes.sub(value, prior)))
+        else:
+            # Adaptive: the filter whose output is closest to zero overall
+            candidates = (
+                b"\x00" + row,
+                b"\x01" + lanes.unpack(lanes.sub(value, lanes.shift(value, bpp))),
+                b"\x02" + lanes.unpack(lanes.sub(value, prior)),
+            )
+            pieces.append(min(candidates, key=lambda line: sum(line[1:].translate(ABS_TABLE))))
+        prior = value
+    return b"".join(pieces)
+
+
+def _chunk(chunk_type: bytes, payload: bytes) -> bytes:
+    return (struct.pack(">I", len(payload)) + chunk_type + payload
+            + struct.pack(">I", zlib.crc32(chunk_type + payload) & 0xFFFFFFFF))
+
+
+def build_png(header: bytes, compressed: bytes, palette: bytes = b"",
+              transparency: Optional[bytes] = None) -> bytes:
+    """Assemble a PNG from an IHDR payload and compressed image data."""
+    pieces = [PNG_SIGNATURE, _chunk(b"IHDR", header)]
+    if palette:
+        pieces.append(_chunk(b"PLTE", palette))
+    if transparency is not None:
+        pieces.append(_chunk(b"tRNS", transparency))
+    pieces.append(_chunk(b"IDAT", compressed))
+    pieces.append(_chunk(b"IEND", b""))
+    return b"".join(pieces)
+
+
+def _compress(data: bytes, strategy: int = zlib.Z_DEFAULT_STRATEGY) -> bytes:
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9, strategy)
+    return compressor.compress(data) + compressor.flush()
+
+
+def encode_png(image: PngImage, filter_strategy: str = 'adaptive',
+               zlib_strategy: int = zlib.Z_DEFAULT_STRATEGY) -> bytes:
+    """Encode an image with one filter and zlib strategy."""
+    header = struct.pack(">IIBBBBB", image.width, image.height, image.bit_depth,
+                         image.color_type, 0, 0, 0)
+    compressed = _compress(filter_scanlines(image, filter_strategy), zlib_strategy)
+    return build_png(header, compressed, image.palette, image.transparency)
+
+
+def to_rgba8(image: PngImage) -> Optional[bytes]:
+    """Expand an 8-bit image without colour-key transparency to RGBA bytes."""
+    if image.bit_depth != 8 or (image.transparency is not None and image.color_type != 3):
+        return None
+    pixels = b"".join(image.rows)
+    count = image.width * image.height
+    if image.color_type == 6:
+        return pixels
+    rgba = bytearray(b"\xff" * (count * 4))
+    if image.color_type == 2:
+        for channel in range(3):
+            rgba[channel::4] = pixels[channel::3]
+    elif image.color_type == 0:
+        for channel in range(3):
+            rgba[channel::4] = pixels
+    elif image.color_type == 4:
+        for channel in range(3):
+            rgba[channel::4] = pixels[0::2]
+        rgba[3::4] = pixels[1::2]
+    else:
+        palette = image.palette.ljust(768, b"\x00")
+        alpha = (image.transparency or b"").ljust(256, b"\xff")[:256]
+        for channel in range(3):
+            rgba[channel::4] = pixels.translate(palette[channel::3])
+        rgba[3::4] = pixels.translate(alpha)
+    return bytes(rgba)
+
+
+def _with_pixels(image: PngImage, color_type: int, pixels: bytes, palette: bytes = b"",
+                 transparency: Optional[bytes] = None) -> PngImage:
+    reduced = PngImage(image.width, image.height, 8, color_type, [], palette, transparency)
+    row_bytes = reduced.row_bytes
+    reduced.rows = [pixels[offset:offset + row_bytes] for offset in range(0, len(pixels), row_bytes)]
+    return reduced
+
+
+def _to_palette(image: PngImage, pixels: bytes) -> Optional[PngImage]:
+    channels = image.channels
+    colors = set()
+    for row in image.rows:
+        colors.update(row[offset:offset + channels] for offset in range(0, len(row), channels))
+        if len(colors) > 256:
+            return None
+    # Translucent entries first, so tRNS can stop after the last of them
+    ordered = sorted(colors, key=lambda color: (channels == 4 and color[3] == 255, color))
+    index = {color: position for position, color in enumerate(ordered)}
+    palette = b"".join(color[:3] for color in ordered)
+    transparency = None
+    if channels == 4:
+        alphas = bytes(color[3] for color in ordered).rstrip(b"\xff")
+        transparency = alphas or None
+    indices = bytes(index[pixels[offset:offset + channels]]
+                    for offset in range(0, len(pixels), channels))
+    return _with_pixels(image, 3, indices, palette, transparency)
+
+
+def reduce_image(image: PngImage) -> Optional[PngImage]:
+    """Return the smallest lossless colour type for an 8-bit RGB(A) image, or None."""
+    if image.bit_depth != 8 or image.color_type not in (2, 6) or image.transparency is not None:
+        return None
+    pixels = b"".join(image.rows)
+    count = image.width * image.height
+    reduced = image
+
+    if image.color_type == 6 and pixels[3::4].count(255) == count:
+        # Fully opaque: drop the alpha channel
+        rgb = bytearray(count * 3)
+        for channel in range(3):
+            rgb[channel::3] = pixels[channel::4]
+        pixels = bytes(rgb)
+        reduced = _with_pixels(image, 2, pixels)
+
+    channels = reduced.channels
+    if pixels[0::channels] == pixels[1::channels] == pixels[2::channels]:
+        if channels == 3:
+            return _with_pixels(image, 0, pixels[0::3])
+        grey_alpha = bytearray(count * 2)
+        grey_alpha[0::2] = pixels[0::4]
+        grey_alpha[1::2] = pixels[3::4]
+        return _with_pixels(image, 4, bytes(grey_alpha))
+
+    return _to_palette(reduced, pixels) or (reduced if reduced is not image else None)
+
+
+def _same_pixels(original: PngImage, data: bytes) -> bool:
+    candidate = decode_png(data)
+    if (candidate.width, candidate.height) != (original.width, original.height):
+        return False
+    if (candidate.color_type, candidate.bit_depth, candidate.palette, candidate.transparency) == \
+            (original.color_type, original.bit_depth, original.palette, original.transparency):
+        return candidate.rows == original.rows
+    expected = to_rgba8(original)
+    return expected is not None and to_rgba8(candidate) == expected
+
+
+def _recompressed(data: bytes) -> Optional[bytes]:
+    """Rebuild a PNG with only critical chunks and tRNS, recompressing its
+    filtered data as is; for PNGs that are not decoded."""
+    chunks = read_chunks(data)
+    kept = {chunk_type: payload for chunk_type, payload in chunks
+            if chunk_type in (b"IHDR", b"PLTE") + KEPT_ANCILLARY_CHUNKS}
+    filtered = zlib.decompress(b"".join(payload for chunk_type, payload in chunks
+                                        if chunk_type == b"IDAT"))
+    best = min((_compress(filtered, strategy) for strategy in ZLIB_STRATEGIES), key=len)
+    result = build_png(kept[b"IHDR"], best, kept.get(b"PLTE", b""), kept.get(b"tRNS"))
+    check = read_chunks(result)
+    if zlib.decompress(b"".join(payload for chunk_type, payload in check
+                                if chunk_type == b"IDAT")) != filtered:
+        return None
+    return result
+
+
+def _box_taps(source: int, target: int) -> List[List[Tuple[int, int]]]:
+    """For each target pixel, the source pixels it covers and their weights,
+    which sum to 65536."""
+    taps = []
+    for index in range(target):
+        # Positions in units of 1/target of a source pixel
+        start, end = index * source, (index + 1) * source
+        covered = []
+        for position in range(start // target, min(source, -(-end // target))):
+            overlap = min(end, (position + 1) * target) - max(start, position * target)
+            covered.append([position, (overlap << 16) // source])
+        heaviest = max(covered, key=lambda tap: tap[1])
+        heaviest[1] += 65536 - sum(weight for _, weight in covered)
+        taps.append([(position, weight) for position, weight in covered if weight])
+    return taps
+
+
+def _widen(data: bytes) -> int:
+    """Pack bytes into 32-bit lanes of one int, so weighted sums cannot overflow."""
+    lanes = bytearray(4 * len(data))
+    lanes[0::4] = data
+    return int.from_bytes(lanes, 'little')
+
+
+def _blend(values: List[int], taps: List[Tuple[int, int]], length: int, rounding: int) -> bytes:
+    """Weighted sum of widened lines, divided by 65536 and narrowed to ``length`` bytes."""
+    total = rounding
+    for position, weight in taps:
+        total += values[position] * weight
+    return total.to_bytes(4 * length, 'little')[2::4]
+
+
+def _convert_alpha(rgba: bytes, tables: List[bytes]) -> bytes:
+    """Translate the colour bytes of every translucent pixel with the table
+    for its alpha value; opaque pixels are unchanged."""
+    pixels = bytearray(rgba)
+    for run in TRANSLUCENT_RUN_PATTERN.finditer(rgba[3::4]):
+        start, end = run.start() * 4, run.end() * 4
+        alpha = run.group(1)
+        pixels[start:end] = rgba[start:end].translate(tables[alpha[0]])
+        pixels[start + 3:end:4] = alpha * (run.end() - run.start())
+    return bytes(pixels)
+
+
+def downscale_rgba(rgba: bytes, width: int, height: int,
+                   new_width: int, new_height: int) -> bytes:
+    """Shrink RGBA pixels with a box filter, averaging the area each output
+    pixel covers, with colours weighted by alpha."""
+    translucent = rgba[3::4].count(255) != width * height
+    if translucent:
+        rgba = _convert_alpha(rgba, PREMULTIPLY_TABLES)
+    stride = width * 4
+    rounding = int.from_bytes(b"\x00\x80\x00\x00" * stride, 'little')
+    rows = [_widen(rgba[offset:offset + stride]) for offset in range(0, height * stride, stride)]
+    resized = b"".join(_blend(rows, taps, stride, rounding) for taps in _box_taps(height, new_height))
+    del rows
+
+    # One array item per pixel, so a column is a strided slice
+    pixels = array('I', resized)
+    rounding = int.from_bytes(b"\x00\x80\x00\x00" * (new_height * 4), 'little')
+    columns = [_widen(pixels[x::width].tobytes()) for x in range(width)]
+    result = array('I', bytes(new_width * new_height * 4))
+    for x, taps in enumerate(_box_taps(width, new_width)):
+        result[x::new_width] = array('I', _blend(columns, taps, new_height * 4, rounding))
+    if translucent:
+        return _convert_alpha(result.tobytes(), UNPREMULTIPLY_TABLES)
+    return result.tobytes()
+
+
+def encode_rgba(rgba: bytes, width: int, height: int) -> bytes:
+    """Encode RGBA pixels as a PNG in the smallest lossless colour type."""
+    image = _with_pixels(PngImage(width, height, 8, 6, []), 6, rgba)
+    return encode_png(reduce_image(image) or image)
+
+
+def optimize_png(data: bytes) -> bytes:
+    """Losslessly re-encode a PNG, returning the smallest verified result.
+
+    The input itself is always a candidate, so the result is never larger.
+    """
+    try:
+        image = decode_png(data)
+    except (ValueError, struct.error, zlib.error):
+        try:
+            result = _recompressed(data)
+        except (ValueError, KeyError, struct.error, zlib.error):
+            return data
+        return result if result is not None and len(result) < len(data) else data
+
+    candidates = []
+    for form in (image, reduce_image(image)):
+        if form is None:
+            continue
+        by_filter = [encode_png(form, strategy) for strategy in FILTER_STRATEGIES]
+        best_filter = FILTER_STRATEGIES[min(range(len(by_filter)), key=lambda i: len(by_filter[i]))]
+        candidates.extend(by_filter)
+        candidates.extend(encode_png(form, best_filter, strategy) for strategy in ZLIB_STRATEGIES[1:])
+
+    for candidate in sorted(candidates, key=len):
+        if len(candidate) >= len(data):
+            break
+        if _same_pixels(image, candidate):
+            return candidate
+    return data
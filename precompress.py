@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Precompression
+Writes ``.gz``, ``.bz2`` and ``.xz`` siblings next to generated files so a
+static file server can send them precompressed.
+
+Only stdlib codecs are used. The gzip header carries no timestamp or file
+name, so unchanged input always produces identical siblings. The codecs
+release the GIL while compressing, so the formats for one file are
+compressed in parallel threads.
+"""
+
+import bz2
+import gzip
+import io
+import lzma
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from atomic_file import write_file_atomic
+from html_minify import format_savings
+
+
+COMPRESSION_FORMATS = ('gz', 'bz2', 'xz')
+
+
+def compress_bytes(data: bytes, fmt: str) -> bytes:
+    """Compress data with the highest-ratio settings that stay fast."""
+    if fmt == 'gz':
+        buffer = io.BytesIO()
+        with gzip.GzipFile(filename="", mode='wb', compresslevel=9, fileobj=buffer, mtime=0) as f:
+            f.write(data)
+        return buffer.getvalue()
+    if fmt == 'bz2':
+        return bz2.compress(data, 9)
+    if fmt == 'xz':
+        return lzma.compress(data, preset=6)
+    raise ValueError(f"Unsupported compression format: {fmt}")
+
+
+def selected_formats(value: Optional[List[str]]) -> List[str]:
+    """Turn the --precompress argument into a list of formats.
+
+    ``None`` (flag not given) means none; an empty list (flag given without
+    values) means every format.
+    """
+    if value is None:
+        return []
+    return [fmt for fmt in COMPRESSION_FORMATS if fmt in value] if value else list(COMPRESSION_FORMATS)
+
+
+def add_precompress_argument(parser) -> None:
+    """Add the shared --precompress option to an argparse parser."""
+    parser.add_argument(
+        "--precompress",
+        nargs="*",
+        choices=COMPRESSION_FORMATS,
+        metavar="FORMAT",
+        help="Also write precompressed siblings; FORMAT is gz, bz2 or xz (default: all three)"
+    )
+
+
+def remove_precompressed(path: str, keep: Iterable[str] = ()) -> None:
+    """Remove siblings of ``path`` except the formats in ``keep``."""
+    for fmt in COMPRESSION_FORMATS:
+        if fmt not in keep and os.path.exists(f"{path}.{fmt}"):
+            os.unlink(f"{path}.{fmt}")
+
+
+def write_precompressed(path: str, data: bytes, formats: Iterable[str]) -> Dict[str, int]:
+    """Write ``path.<fmt>`` for each format and return their sizes.
+
+    Siblings for formats that are not selected are removed, so a server
+    never sends a compressed copy of an older version of the file.
+    """
+    formats = list(formats)
+    remove_precompressed(path, keep=formats)
+    if not formats:
+        return {}
+
+    def write_sibling(fmt):
+        compressed = compress_bytes(data, fmt)
+        write_file_atomic(f"{path}.{fmt}", compressed)
+        return len(compressed)
+
+    if len(formats) == 1:
+        return {formats[0]: write_sibling(formats[0])}
+    with ThreadPoolExecutor(max_workers=len(formats)) as executor:
+        return dict(zip(formats, executor.map(write_sibling, formats)))
+
+
+def format_compression_report(original_size: int, sizes: Dict[str, int]) -> List[str]:
+    """Describe each sibling's size and ratio, one line per format."""
+    return [f"{fmt:>3}: {format_savings(original_size, size)}, ratio {original_size / size:.2f}x"
+            for fmt, size in sizes.items() if size]
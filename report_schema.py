@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Report Schema
+Validates report configurations before anything is rendered.
+
+The schema mirrors the structure of Input Values.json and is compiled once
+into nested checker functions. Validation walks a config a single time and
+reports every problem with its full path, e.g.
+``metrics.catalog_items.description: missing required key``.
+"""
+
+import re
+from typing import Callable, List, Optional, Tuple
+
+
+# CSS lengths accepted in the "styling" section, e.g. "40px", "1.5rem", "0"
+CSS_LENGTH_PATTERN = re.compile(
+    r"^(?:0|-?(?:\d+\.?\d*|\.\d+)(?:px|em|rem|%|vh|vw|vmin|vmax|pt|pc|ch|ex|cm|mm|in|q))$"
+)
+PERCENTAGE_TOLERANCE = 0.01
+
+# Marker types used in the schema below
+NUMBER = "number"
+CSS_LENGTH = "css-length"
+
+METRIC_SCHEMA = {'value': str, 'change_percentage': str, 'description': str}
+
+REPORT_SCHEMA = {
+    'report_metadata': {'title': str, 'month': str, 'company_logo': str},
+    'header_styling': {
+        'background_color': str,
+        'text_color': str,
+        'logo_background': str,
+        'logo_border': str,
+    },
+    'metrics': {
+        'views': METRIC_SCHEMA,
+        'returning_users': METRIC_SCHEMA,
+        'catalog_items': METRIC_SCHEMA,
+    },
+    'user_quote': {'content': str, 'author': str, 'title': str, 'initials': str},
+    'division_chart': {
+        'title': str,
+        'divisions': [{'name': str, 'percentage': NUMBER, 'gradient_start': str}],
+    },
+    'highlights': {'title': str, 'items': [str]},
+    'up_next': {'title': str, 'items': [str]},
+    'footer': {'text': str},
+    'styling': {
+        'container_max_width': CSS_LENGTH,
+        'main_content_gap': CSS_LENGTH,
+        'metrics_grid_gap': CSS_LENGTH,
+        'quotes_chart_gap': CSS_LENGTH,
+        'responsive_breakpoint': CSS_LENGTH,
+    },
+}
+
+# A checker returns None when the value is valid, or a list of
+# (relative path, message) problems.
+Problems = Optional[List[Tuple[tuple, str]]]
+Checker = Callable[[object], Problems]
+
+
+class ConfigValidationError(Exception):
+    """Raised when a config does not match the report schema."""
+
+    def __init__(self, errors: List[str]):
+        self.errors = errors
+        super().__init__(f"{len(errors)} config error(s): " + "; ".join(errors))
+
+
+def type_name(value) -> str:
+    """Describe a JSON value's type for error messages."""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, (int, float)):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, list):
+        return "array"
+    if isinstance(value, dict):
+        return "object"
+    return type(value).__name__
+
+
+def _compile(spec) -> Checker:
+    if isinstance(spec, dict):
+        children = [(key, _compile(child)) for key, child in spec.items()]
+
+        def check_object(value):
+            if value.__class__ is not dict:
+                return [((), f"expected object, got {type_name(value)}")]
+            problems = None
+            for key, check in children:
+                if key not in value:
+                    problems = problems or []
+                    problems.append(((key,), "missing required key"))
+                    continue
+                child_problems = check(value[key])
+                if child_problems:
+                    problems = problems or []
+                    problems.extend(((key,) + path, message) for path, message in child_problems)
+            return problems
+        return check_object
+
+    if isinstance(spec, list):
+        check_item = _compile(spec[0])
+
+        def check_array(value):
+            if value.__class__ is not list:
+                return [((), f"expected array, got {type_name(value)}")]
+            problems = None
+            for index, item in enumerate(value):
+                item_problems = check_item(item)
+                if item_problems:
+                    problems = problems or []
+                    problems.extend(((index,) + path, message) for path, message in item_problems)
+            return problems
+        return check_array
+
+    if spec is str:
+        def check_string(value):
+            if value.__class__ is not str:
+                return [((), f"expected string, got {type_name(value)}")]
+            return None
+        return check_string
+
+    if spec == NUMBER:
+        def check_number(value):
+            if value.__class__ is not int and value.__class__ is not float:
+                return [((), f"expected number, got {type_name(value)}")]
+            return None
+        return check_number
+
+    if spec == CSS_LENGTH:
+        match = CSS_LENGTH_PATTERN.match
+
+        def check_css_length(value):
+            if value.__class__ is not str:
+                return [((), f"expected CSS length string, got {type_name(value)}")]
+            if not match(value.strip()):
+                return [((), f"invalid CSS length {value!r}")]
+            return None
+        return check_css_length
+
+    raise ValueError(f"Unsupported schema entry: {spec!r}")
+
+
+def format_path(path: tuple) -> str:
+    """Format a path tuple as ``a.b[0].c``."""
+    text = ""
+    for part in path:
+        if isinstance(part, int):
+            text += f"[{part}]"
+        else:
+            text += f".{part}" if text else part
+    return text or "<config>"
+
+
+_check_report = _compile(REPORT_SCHEMA)
+
+
+def validate_config(config) -> List[str]:
+    """Return every schema problem in a report config (empty if valid)."""
+    problems = _check_report(config) or []
+    errors = [f"{format_path(path)}: {message}" for path, message in problems]
+
+    try:
+        percentages = [division['percentage'] for division in config['division_chart']['divisions']]
+        total = sum(percentages)
+    except (KeyError, TypeError):
+        # Structural problems with the divisions are already reported above
+        percentages = None
+    if percentages == []:
+        # The pie chart would be empty and the percentages cannot sum to 100
+        errors.append("division_chart.divisions: expected at least one division")
+    elif percentages and abs(total - 100) > PERCENTAGE_TOLERANCE:
+        errors.append(f"division_chart.divisions: percentages sum to {total:g}, expected 100")
+
+    # Optional: an image file shown in the header instead of company_logo,
+    # and the tenant whose metrics history fills in the metric cards
+    metadata = config.get('report_metadata') if isinstance(config, dict) else None
+    for key in ('logo_image', 'tenant'):
+        if isinstance(metadata, dict) and key in metadata and metadata[key].__class__ is not str:
+            errors.append(f"report_metadata.{key}: expected string, got {type_name(metadata[key])}")
+
+    return errors
+
+
+def check_config(config) -> None:
+    """Raise ConfigValidationError if a report config is invalid."""
+    errors = validate_config(config)
+    if errors:
+        raise ConfigValidationError(errors)
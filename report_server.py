@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Report Server
+Serves rendered Beacon reports over HTTP using only the standard library.
+
+Endpoints:
+    POST /render          Render the JSON config in the request body.
+    GET  /reports/<name>  Render <name>.json from the configured config directory.
+    GET  /stats           Report and section cache counters as JSON.
+
+Rendered reports are kept in a bounded LRU keyed by a canonical hash of the
+config, which doubles as the ETag so clients can revalidate with
+If-None-Match and receive 304 Not Modified.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+from generate_report import iter_html_report, load_json_config, renderer_fingerprint
+from report_schema import validate_config
+from report_template import FragmentCache
+
+
+MAX_BODY_BYTES = 10 * 1024 * 1024
+REPORT_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-][A-Za-z0-9_.-]*$")
+
+
+def canonical_config_hash(config, fingerprint=""):
+    """Hash a config independently of key order and whitespace."""
+    canonical = json.dumps(config, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256((fingerprint + canonical).encode('utf-8')).hexdigest()
+
+
+class RenderCache:
+    """Bounded LRU of rendered reports with single-flight rendering.
+
+    Concurrent requests for the same key wait for the one render in flight
+    instead of rendering the config again.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.fragments = FragmentCache()
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key, config):
+        """Return the rendered HTML bytes for a config, rendering at most once."""
+        while True:
+            with self._lock:
+                html = self._entries.get(key)
+                if html is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return html
+                pending = self._in_flight.get(key)
+                if pending is None:
+                    pending = self._in_flight[key] = threading.Event()
+                    self.misses += 1
+                    break
+            # Another thread is rendering this config; wait and look again.
+            pending.wait()
+
+        try:
+            html = b"".join(iter_html_report(config, self.fragments))
+            with self._lock:
+                self._entries[key] = html
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return html
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            pending.set()
+
+    def stats(self):
+        """Return report-level and section-level cache counts."""
+        with self._lock:
+            stats = {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+        stats['sections'] = self.fragments.stats()
+        return stats
+
+
+class ReportRequestHandler(BaseHTTPRequestHandler):
+    """Handle render requests for a ReportServer."""
+
+    server_version = "ReportingAsCode/1.0"
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self.send_body(200, json.dumps(self.server.render_cache.stats()).encode('utf-8'),
+                           "application/json")
+            return
+
+        if not self.path.startswith("/reports/") or not self.server.config_dir:
+            self.send_error(404, "Not Found")
+            return
+
+        name = self.path[len("/reports/"):].split("?", 1)[0]
+        if name.endswith(".html"):
+            name = name[:-len(".html")]
+        config_path = os.path.join(self.server.config_dir, f"{name}.json")
+        if not REPORT_NAME_PATTERN.match(name) or not os.path.isfile(config_path):
+            self.send_error(404, f"Unknown report: {name}")
+            return
+
+        try:
+            config = load_json_config(config_path)
+        except Exception as e:
+            self.send_error(500, str(e))
+            return
+        self.send_report(config)
+
+    def do_POST(self):
+        if self.path.split("?", 1)[0] != "/render":
+            self.send_error(404, "Not Found")
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", ""))
+        except ValueError:
+            self.send_error(411, "Content-Length required")
+            return
+        if length < 0:
+            # rfile.read(-1) would block until the client closes the connection
+            self.send_error(400, "Invalid Content-Length")
+            return
+        if length > MAX_BODY_BYTES:
+            self.send_error(413, "Config too large")
+            return
+
+        try:
+            config = json.loads(self.rfile.read(length).decode('utf-8'))
+        except ValueError as e:
+            self.send_error(400, f"Invalid JSON: {e}")
+            return
+        self.send_report(config)
+
+    def send_report(self, config):
+        """Send a rendered report, or 304 if the client's copy is current."""
+        errors = validate_config(config)
+        if errors:
+            self.send_error(422, "Invalid config: " + "; ".join(errors))
+            return
+
+        key = canonical_config_hash(config, self.server.fingerprint)
+        etag = f'"{key[:32]}"'
+
+        if etag in self.headers.get("If-None-Match", ""):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        try:
+            html = self.server.render_cache.get_or_render(key, config)
+        except Exception as e:
+            self.send_error(422, f"Cannot render config: {type(e).__name__}: {e}")
+            return
+        self.send_body(200, html, "text/html; charset=utf-8", etag)
+
+    def send_body(self, status, body, content_type, etag=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ReportServer(ThreadingMixIn, HTTPServer):
+    """Threaded HTTP server holding the shared render cache."""
+
+    daemon_threads = True
+
+    def __init__(self, address, config_dir=None, max_entries=256):
+        super().__init__(address, ReportRequestHandler)
+        self.config_dir = config_dir
+        self.render_cache = RenderCache(max_entries)
+        self.fingerprint = renderer_fingerprint()
+
+
+def serve(host="127.0.0.1", port=8000, config_dir=None, max_entries=256):
+    """Run the report server until interrupted."""
+    server = ReportServer((host, port), config_dir, max_entries)
+    print(f"🌐 Serving reports on http://{host}:{server.server_address[1]}/ "
+          f"(POST /render{', GET /reports/<name>' if config_dir else ''})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Server stopped.")
+    finally:
+        server.server_close()
+    return 0
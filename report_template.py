@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Report Template
+Compiles HTML templates into static UTF-8 byte segments plus slots.
+
+A template is plain HTML with ``{{ dotted.path }}`` slots. Compiling splits it
+once into the static segments between slots, so rendering only has to look up
+the slot values and join the pieces. Compiled templates are cached on disk,
+keyed by a hash of the template source.
+
+Rendered fragments can additionally be kept in a ``FragmentCache`` so pages
+built from several section templates only re-render the sections whose
+inputs changed.
+"""
+
+import hashlib
+import marshal
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Hashable, Iterator, List, Optional, Tuple
+
+from atomic_file import atomic_write
+
+
+TEMPLATE_DIR = Path(__file__).resolve().parent / "templates"
+CACHE_DIR = Path(__file__).resolve().parent / ".template_cache"
+CACHE_FORMAT_VERSION = 2
+
+SLOT_PATTERN = re.compile(r"\{\{\s*([A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z0-9_]+)*)\s*\}\}")
+
+_loaded_templates: Dict[Tuple[str, str], Tuple[int, int, "CompiledTemplate"]] = {}
+
+
+class CompiledTemplate:
+    """A template split into static byte segments and slot paths.
+
+    ``segments`` always has exactly one more entry than ``slots``: the output
+    is ``segments[0] + slot[0] + segments[1] + ... + segments[-1]``.
+    """
+
+    def __init__(self, name: str, digest: str, segments: Tuple[bytes, ...],
+                 slots: Tuple[Tuple[str, ...], ...]):
+        self.name = name
+        self.digest = digest
+        self.segments = segments
+        self.slots = slots
+
+    def iter_render(self, context: dict) -> Iterator[bytes]:
+        """Yield the rendered template as UTF-8 chunks.
+
+        Slot values may be strings, numbers, bytes, or iterables of UTF-8
+        byte chunks (such as another template's ``iter_render``). Iterables
+        are streamed chunk by chunk, so large repeated sections never have to
+        be joined in memory.
+        """
+        segments = self.segments
+        for index, path in enumerate(self.slots):
+            yield segments[index]
+            value = resolve_slot(context, path)
+            if isinstance(value, bytes):
+                yield value
+            elif isinstance(value, str):
+                yield value.encode('utf-8')
+            elif hasattr(value, '__iter__') and not isinstance(value, dict):
+                yield from value
+            else:
+                yield str(value).encode('utf-8')
+        yield segments[-1]
+
+    def render_bytes(self, context: dict) -> bytes:
+        """Render the template to UTF-8 bytes in one pass."""
+        pieces = []
+        append = pieces.append
+        segments = self.segments
+        index = 0
+        for path in self.slots:
+            append(segments[index])
+            index += 1
+            value = resolve_slot(context, path)
+            if isinstance(value, str):
+                append(value.encode('utf-8'))
+            elif isinstance(value, bytes):
+                append(value)
+            elif hasattr(value, '__iter__') and not isinstance(value, dict):
+                pieces.extend(value)
+            else:
+                append(str(value).encode('utf-8'))
+        append(segments[index])
+        return b"".join(pieces)
+
+    def render(self, context: dict) -> str:
+        """Render the template to a string."""
+        return self.render_bytes(context).decode('utf-8')
+
+    def slot_names(self) -> List[str]:
+        """Return the dotted names of every slot, in template order."""
+        return [".".join(path) for path in self.slots]
+
+
+class FragmentCache:
+    """Bounded LRU cache of rendered template fragments.
+
+    Keys are chosen by the caller, typically a section name, the section
+    template digest and a hash of the inputs the section reads. The cache is
+    safe to share between threads.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        """Return a cached fragment, counting the hit or miss."""
+        with self._lock:
+            fragment = self._entries.get(key)
+            if fragment is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return fragment
+
+    def put(self, key: Hashable, fragment: bytes) -> None:
+        """Store a fragment, evicting the least recently used entries."""
+        with self._lock:
+            self._entries[key] = fragment
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit, miss and entry counts."""
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+
+def resolve_slot(context: dict, path: Tuple[str, ...]):
+    """Look up a dotted slot path in nested dicts."""
+    try:
+        if len(path) == 2:
+            return context[path[0]][path[1]]
+        value = context
+        for key in path:
+            value = value[key]
+    except (KeyError, TypeError):
+        raise KeyError(".".join(path))
+    return value
+
+
+def compile_template(source: str, name: str = "<string>") -> CompiledTemplate:
+    """Split template source into static byte segments and slot paths."""
+    segments = []
+    slots = []
+    position = 0
+    for match in SLOT_PATTERN.finditer(source):
+        segments.append(source[position:match.start()].encode('utf-8'))
+        slots.append(tuple(match.group(1).split(".")))
+        position = match.end()
+    segments.append(source[position:].encode('utf-8'))
+
+    digest = hashlib.sha256(source.encode('utf-8')).hexdigest()
+    return CompiledTemplate(name, digest, tuple(segments), tuple(slots))
+
+
+def _read_cached(cache_path: Path):
+    try:
+        with open(cache_path, 'rb') as f:
+            version, segments, slots = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if version != CACHE_FORMAT_VERSION:
+        return None
+    return segments, slots
+
+
+def _write_cached(cache_path: Path, template: CompiledTemplate) -> None:
+    # Write to a temporary file and rename, so concurrent workers never see
+    # a half-written cache entry.
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write(cache_path) as f:
+            marshal.dump((CACHE_FORMAT_VERSION, template.segments, template.slots), f)
+    except OSError:
+        pass
+
+
+def load_template(name: str, template_dir: Path = TEMPLATE_DIR,
+                  cache_dir: Path = CACHE_DIR, reload: bool = False) -> CompiledTemplate:
+    """Load a compiled template by file name.
+
+    Templates are memoised in-process, and on disk by the SHA-256 of their
+    source, so each template is parsed at most once. With ``reload=True`` the
+    file is re-checked and recompiled if its mtime or size changed.
+    """
+    memo_key = (template_dir, name)
+    memoised = _loaded_templates.get(memo_key)
+    if memoised is not None and not reload:
+        return memoised[2]
+
+    template_path = os.path.join(template_dir, name)
+    try:
+        stat = os.stat(template_path)
+    except OSError as e:
+        raise Exception(f"Error loading template: {e}")
+
+    if memoised is not None and memoised[:2] == (stat.st_mtime_ns, stat.st_size):
+        return memoised[2]
+
+    with open(template_path, 'r', encoding='utf-8') as f:
+        source = f.read()
+    # Like Jinja, drop a single trailing newline so template files can end
+    # with one without it leaking into the output.
+    if source.endswith("\n"):
+        source = source[:-1]
+    digest = hashlib.sha256(source.encode('utf-8')).hexdigest()
+    cache_path = Path(cache_dir) / f"{digest}.marshal"
+
+    cached = _read_cached(cache_path)
+    if cached is not None:
+        template = CompiledTemplate(name, digest, *cached)
+    else:
+        template = compile_template(source, name)
+        _write_cached(cache_path, template)
+
+    _loaded_templates[memo_key] = (stat.st_mtime_ns, stat.st_size, template)
+    return template
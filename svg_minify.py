@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+SVG Minifier
+Shrinks SVG images for embedding in HTML, either inline or as a
+percent-encoded data URI, instead of base64-encoding them.
+
+Like html_minify.py this is conservative:
+
+- The XML declaration, doctype, comments, <metadata> and editor-only
+  (Inkscape, Sodipodi, Adobe, Sketch) elements and attributes are removed.
+  Entities declared in the doctype (Illustrator's ``&ns_svg;``) are
+  expanded first; a doctype declaring anything else is kept.
+- Whitespace-only runs between tags that contain a line break are removed;
+  other whitespace runs collapse to one space, so text content keeps its
+  word breaks. <style> contents are minified with html_minify.minify_css;
+  <script> and CDATA contents are left untouched.
+- Numbers in geometry attributes are rounded to ``precision`` decimals and
+  written in their shortest form. Transforms and the viewBox scale every
+  coordinate, so their numbers are kept as they are.
+"""
+
+import re
+from urllib.parse import quote
+
+from html_minify import STYLE_BLOCK_PATTERN, minify_css
+
+
+DEFAULT_PRECISION = 3
+SVG_MIME_TYPE = 'image/svg+xml'
+
+EDITOR_PREFIXES = ("inkscape", "sodipodi", "sketch", "i", "x", "graph", "a", "rdf", "cc", "dc")
+PROLOGUE_PATTERN = re.compile(r"<\?xml.*?\?>|<!DOCTYPE[^>\[]*>", re.S | re.I)
+DOCTYPE_SUBSET_PATTERN = re.compile(r"<!DOCTYPE[^>\[]*\[(.*?)\]\s*>", re.S | re.I)
+ENTITY_PATTERN = re.compile(r"""<!ENTITY\s+([A-Za-z_][\w.-]*)\s+(?:"([^"]*)"|'([^']*)')\s*>""")
+COMMENT_PATTERN = re.compile(r"<!--.*?-->", re.S)
+RAW_BLOCK_PATTERN = re.compile(r"(<(style|script)\b.*?</\2\s*>|<!\[CDATA\[.*?\]\]>)", re.S | re.I)
+METADATA_PATTERN = re.compile(r"<metadata\b.*?</metadata\s*>|<metadata\b[^>]*/>", re.S | re.I)
+EDITOR_ELEMENT_PATTERN = re.compile(
+    r"<(({0}):[\w.-]+)\b[^>]*?(?:/>|>.*?</\1\s*>)".format("|".join(EDITOR_PREFIXES)), re.S)
+EDITOR_ATTRIBUTE_PATTERN = re.compile(
+    r"""\s+(?:xmlns:(?:{0})|(?:{0}):[\w.-]+)\s*=\s*(?:"[^"]*"|'[^']*')""".format("|".join(EDITOR_PREFIXES)))
+TAG_PATTERN = re.compile(r"<[A-Za-z][^>]*>")
+ATTRIBUTE_PATTERN = re.compile(r"""([\w:.-]+)(\s*=\s*)("[^"]*"|'[^']*')""")
+NUMBER_PATTERN = re.compile(r"-?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+# Content that is inert in an <img>, but would run or restyle the page if inlined
+UNSAFE_INLINE_PATTERN = re.compile(
+    r"<(?:script|foreignObject|style|!DOCTYPE)\b|\son[a-z]+\s*=|javascript:", re.I)
+
+# Attributes holding coordinates and lengths whose precision can be trimmed
+NUMERIC_ATTRIBUTES = frozenset((
+    "d", "points", "x", "y", "x1", "y1", "x2", "y2", "cx", "cy", "r", "rx", "ry", "fx", "fy",
+    "width", "height", "stroke-width", "stroke-dashoffset", "stroke-dasharray",
+))
+# Attributes whose numbers only need separating where they would run together
+PATH_ATTRIBUTES = frozenset(("d", "points"))
+
+
+def format_number(text: str, precision: int = DEFAULT_PRECISION) -> str:
+    """Round a number and write it without redundant zeros, e.g. ``-0.500`` -> ``-.5``."""
+    value = round(float(text), precision)
+    number = f"{value:.{precision}f}".rstrip("0").rstrip(".") if precision > 0 else f"{value:.0f}"
+    if number in ("-0", ""):
+        return "0"
+    if number.startswith("0."):
+        return number[1:]
+    if number.startswith("-0."):
+        return "-" + number[2:]
+    return number
+
+
+def _compact_path(data: str) -> str:
+    """Drop separators the path grammar does not need."""
+    data = re.sub(r"[\s,]+", " ", data).strip()
+    data = re.sub(r" ?([A-DF-Za-df-z]) ?", r"\1", data)
+    data = re.sub(r" (?=-)", "", data)
+    # ".5 .5" -> ".5.5": a second point cannot belong to a number with a point
+    return re.sub(r"(\.\d+) (?=\.)", r"\1", data)
+
+
+def _minify_tag(tag: str, precision: int) -> str:
+    def attribute(match):
+        name, value = match.group(1), match.group(3)
+        quote_char, value = value[0], value[1:-1]
+        if name in NUMERIC_ATTRIBUTES:
+            value = NUMBER_PATTERN.sub(lambda number: format_number(number.group(0), precision), value)
+            value = _compact_path(value) if name in PATH_ATTRIBUTES else re.sub(r"\s+", " ", value).strip()
+        return f"{name}={quote_char}{value}{quote_char}"
+
+    tag = EDITOR_ATTRIBUTE_PATTERN.sub("", tag)
+    tag = ATTRIBUTE_PATTERN.sub(attribute, tag)
+    tag = re.sub(r"\s+", " ", tag)
+    return re.sub(r"\s*(/?>)$", r"\1", tag)
+
+
+def _minify_markup(markup: str, precision: int) -> str:
+    markup = COMMENT_PATTERN.sub("", PROLOGUE_PATTERN.sub("", markup))
+    markup = METADATA_PATTERN.sub("", markup)
+    markup = EDITOR_ELEMENT_PATTERN.sub("", markup)
+    markup = TAG_PATTERN.sub(lambda match: _minify_tag(match.group(0), precision), markup)
+    markup = re.sub(r">\s*\n\s*<|^\s*\n\s*|\s*\n\s*$",
+                    lambda match: "><" if match.group(0).startswith(">") else "", markup)
+    return re.sub(r"\s+", " ", markup)
+
+
+def expand_entities(svg: str) -> str:
+    """Expand the entities declared in a doctype's internal subset and drop
+    the doctype, or return the SVG unchanged if the subset declares
+    anything else, such as external or parameter entities."""
+    match = DOCTYPE_SUBSET_PATTERN.search(svg)
+    if match is None:
+        return svg
+    subset = COMMENT_PATTERN.sub("", match.group(1))
+    if ENTITY_PATTERN.sub("", subset).strip():
+        return svg
+    entities = {name: double if double is not None else single
+                for name, double, single in ENTITY_PATTERN.findall(subset)}
+    # Entity values may refer to entities declared before them
+    for _ in range(len(entities)):
+        entities = {name: re.sub(r"&([\w.-]+);", lambda ref: entities.get(ref.group(1), ref.group(0)), value)
+                    for name, value in entities.items()}
+
+    def expand(ref):
+        if ref.group(1) is None:
+            return ref.group(0)
+        return entities.get(ref.group(1), ref.group(0))
+
+    body = svg[:match.start()] + svg[match.end():]
+    return re.sub(r"<!\[CDATA\[.*?\]\]>|&([\w.-]+);", expand, body, flags=re.S)
+
+
+def minify_svg(svg: str, precision: int = DEFAULT_PRECISION) -> str:
+    """Minify an SVG document, trimming geometry numbers to ``precision`` decimals."""
+    svg = expand_entities(svg)
+    pieces = []
+    for index, piece in enumerate(RAW_BLOCK_PATTERN.split(svg)):
+        # split() returns [text, raw block, tag name, text, ...]
+        if index % 3 == 1:
+            pieces.append(STYLE_BLOCK_PATTERN.sub(
+                lambda match: match.group(1) + minify_css(match.group(2)) + match.group(3), piece))
+        elif index % 3 == 0:
+            pieces.append(_minify_markup(piece, precision))
+    return "".join(pieces).strip()
+
+
+def svg_data_uri(svg: str) -> str:
+    """Percent-encode an SVG as a UTF-8 data URI for a double-quoted attribute.
+
+    Double quotes become single quotes where the SVG has none, and only
+    characters that are unsafe in a URL or an HTML attribute are escaped.
+    """
+    if "'" not in svg:
+        svg = svg.replace('"', "'")
+    return f"data:{SVG_MIME_TYPE}," + quote(svg, safe=" !$'()*+,-./:;=?@[]_~")
+
+
+def can_inline_svg(svg: str) -> bool:
+    """Check that an SVG has no scripts, event handlers, foreign HTML or
+    stylesheets, which would act on the whole page once inlined, and no
+    doctype, whose entities HTML does not expand."""
+    return UNSAFE_INLINE_PATTERN.search(svg) is None
+
+
+def inline_svg(svg: str, alt: str, css_class: str = "") -> str:
+    """Prepare a minified SVG for inlining into HTML as an accessible image.
+
+    Only for SVGs that pass can_inline_svg(); others belong in an <img>.
+    """
+    attributes = f' role="img" aria-label="{alt}"'
+    if css_class:
+        attributes += f' class="{css_class}"'
+    return re.sub(r"<svg\b", lambda match: match.group(0) + attributes, svg, count=1)
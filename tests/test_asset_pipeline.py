@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Tests for the content-addressed asset store."""
+
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from asset_pipeline import (HEADERS_FILE, IMMUTABLE_CACHE_CONTROL, AssetStore,  # noqa: E402
+                            dedup_totals, format_dedup_report, write_headers_file)
+
+
+class AssetStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def source(self, name, data):
+        path = os.path.join(self.directory, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_identical_bytes_are_stored_once(self):
+        store = AssetStore(self.directory)
+        first = store.add_bytes(b"chart", ".png")
+        second = AssetStore(self.directory).add_bytes(b"chart", ".png")
+        self.assertEqual(first, second)
+        self.assertEqual(first, f"assets/{hashlib.sha256(b'chart').hexdigest()[:16]}.png")
+        self.assertEqual(store.written, 1)
+        self.assertEqual(os.listdir(os.path.join(self.directory, "assets")), [os.path.basename(first)])
+        self.assertNotEqual(store.add_bytes(b"other", ".png"), first)
+
+    def test_files_keep_their_extension_and_record_their_hash(self):
+        path = self.source("Logo.SVG", b"<svg/>")
+        store = AssetStore(os.path.join(self.directory, "out"))
+        href = store.add_file(path)
+        self.assertTrue(href.endswith(".svg"))
+        self.assertEqual(store.sources, {path: hashlib.sha256(b"<svg/>").hexdigest()})
+        self.assertEqual(store.references, {href: 6})
+        with open(os.path.join(self.directory, "out", href), 'rb') as f:
+            self.assertEqual(f.read(), b"<svg/>")
+        self.assertEqual(oct(os.stat(os.path.join(self.directory, "out", href)).st_mode & 0o777), "0o644")
+
+    def test_link_mode_hard_links_the_source(self):
+        path = self.source("chart.png", b"pixels")
+        href = AssetStore(self.directory, link=True).add_file(path)
+        self.assertTrue(os.path.samefile(path, os.path.join(self.directory, href)))
+
+
+class HeadersFileTest(unittest.TestCase):
+
+    def test_rule_is_added_once_and_other_rules_are_kept(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, HEADERS_FILE)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("/*\n  X-Frame-Options: DENY\n")
+        write_headers_file(directory)
+        write_headers_file(directory)
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        self.assertTrue(text.startswith("/*\n  X-Frame-Options: DENY\n\n/assets/*\n"))
+        self.assertEqual(text.count(IMMUTABLE_CACHE_CONTROL), 1)
+
+
+class DedupReportTest(unittest.TestCase):
+
+    def test_totals(self):
+        pages = [{"assets/a.png": 1000, "assets/b.png": 200}, {"assets/a.png": 1000}]
+        self.assertEqual(dedup_totals(pages), (3, 2, 2200, 1200))
+        self.assertEqual(format_dedup_report(pages),
+                         "3 references to 2 asset(s): 2,200 -> 1,200 bytes (-45.5%)")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Tests for section rendering with a shared fragment cache."""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import generate_report  # noqa: E402
+from report_template import FragmentCache, load_template  # noqa: E402
+
+
+def load_config():
+    with open(os.path.join(ROOT, "Input Values.json"), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class FragmentCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.template_dir = Path(self.directory) / "templates"
+        shutil.copytree(str(generate_report.TEMPLATE_DIR), str(self.template_dir))
+        cache_dir = Path(self.directory) / "cache"
+        # Like --watch: every load re-checks the template file
+        patcher = mock.patch.object(
+            generate_report, 'load_template',
+            lambda name: load_template(name, self.template_dir, cache_dir, reload=True))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.config = load_config()
+
+    def render(self, cache, stylesheet_href=None):
+        return b"".join(generate_report.iter_html_report(self.config, cache, stylesheet_href))
+
+    def test_cached_render_matches_uncached(self):
+        cache = FragmentCache()
+        first = self.render(cache)
+        self.assertEqual(self.render(cache), first)
+        self.assertEqual(self.render(None), first)
+        self.assertGreater(cache.stats()['hits'], 0)
+
+    def test_stylesheet_edit_invalidates_styles_fragment(self):
+        cache = FragmentCache()
+        self.assertNotIn(b"#edited-rule", self.render(cache))
+        stylesheet = self.template_dir / generate_report.STYLESHEET_TEMPLATE
+        stylesheet.write_text(stylesheet.read_text(encoding='utf-8') + "\n#edited-rule {color: red;}\n",
+                              encoding='utf-8')
+        cached = self.render(cache)
+        self.assertIn(b"#edited-rule", cached)
+        self.assertEqual(cached, self.render(None))
+
+    def test_section_template_edit_invalidates_its_fragment(self):
+        cache = FragmentCache()
+        self.render(cache)
+        footer = self.template_dir / generate_report.section_template_name('footer')
+        footer.write_text(footer.read_text(encoding='utf-8') + "<!-- edited footer -->", encoding='utf-8')
+        self.assertIn(b"<!-- edited footer -->", self.render(cache))
+
+    def test_config_change_misses_only_its_section(self):
+        cache = FragmentCache()
+        self.render(cache)
+        hits = cache.stats()['hits']
+        self.config['footer'] = dict(self.config['footer'])
+        self.config['footer']['text'] = "Changed footer text"
+        html = self.render(cache)
+        self.assertIn(b"Changed footer text", html)
+        self.assertEqual(cache.stats()['hits'] - hits, len(generate_report.REPORT_SECTIONS) - 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Tests for the HTML and CSS minifier."""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from html_minify import MarkupUsage, format_savings, minify_css, minify_html  # noqa: E402
+
+
+class MinifyHtmlTest(unittest.TestCase):
+
+    def test_inline_elements_keep_a_word_break(self):
+        self.assertEqual(minify_html("<p><b>a</b>\n<i>b</i></p>"), "<p><b>a</b> <i>b</i></p>")
+        self.assertEqual(minify_html("<p>\n  <a href='#'>x</a>\n  <span>y</span>\n</p>"),
+                         "<p><a href='#'>x</a> <span>y</span></p>")
+
+    def test_indentation_between_block_tags_is_removed(self):
+        html = "<!DOCTYPE html>\n<html>\n  <body>\n    <div>\n      <p>Text</p>\n    </div>\n  </body>\n</html>\n"
+        self.assertEqual(minify_html(html), "<!DOCTYPE html><html><body><div><p>Text</p></div></body></html>")
+
+    def test_whitespace_without_line_break_collapses_to_one_space(self):
+        self.assertEqual(minify_html("<p>one   two\t three</p>"), "<p>one two three</p>")
+        self.assertEqual(minify_html("<b>a</b>   <i>b</i>"), "<b>a</b> <i>b</i>")
+
+    def test_raw_blocks_are_untouched(self):
+        html = "<div>\n<pre>  keep\n   this</pre>\n<script>var a  =  1;\n</script>\n</div>"
+        self.assertEqual(minify_html(html),
+                         "<div><pre>  keep\n   this</pre><script>var a  =  1;\n</script></div>")
+
+    def test_comments_are_removed_except_conditional_ones(self):
+        self.assertEqual(minify_html("<div><!-- note --><!--[if IE]>x<![endif]--></div>"),
+                         "<div><!--[if IE]>x<![endif]--></div>")
+
+    def test_unused_css_rules_are_dropped(self):
+        html = ("<style>\n.used { color: red; }\n.unused { color: blue; }\n"
+                "@media (max-width: 10px) { .unused { margin: 0 } p { margin: 1px } }\n</style>"
+                "<p class=\"used\">x</p>")
+        self.assertEqual(minify_html(html),
+                         "<style>.used{color:red}@media (max-width:10px){p{margin:1px}}</style>"
+                         "<p class=\"used\">x</p>")
+        self.assertIn(".unused", minify_html(html, remove_unused_css=False))
+
+
+class MinifyCssTest(unittest.TestCase):
+
+    def test_strings_and_comments(self):
+        css = '/* c */ a::before { content: "  a ;  b  " ; }'
+        self.assertEqual(minify_css(css), 'a::before{content:"  a ;  b  "}')
+
+    def test_at_statements_and_pseudo_selectors(self):
+        usage = MarkupUsage('<a class="x" href="#">y</a>')
+        css = '@import url("a.css");\na.x:hover, b > i { color: red }\n[hidden] { display: none }'
+        self.assertEqual(minify_css(css, usage), '@import url("a.css");a.x:hover{color:red}[hidden]{display:none}')
+
+
+class FormatSavingsTest(unittest.TestCase):
+
+    def test_signed_change(self):
+        self.assertEqual(format_savings(1000, 750), "1,000 -> 750 bytes (-25.0%)")
+        self.assertEqual(format_savings(1000, 1250), "1,000 -> 1,250 bytes (+25.0%)")
+        self.assertEqual(format_savings(0, 0), "0 -> 0 bytes (+0.0%)")
+
+
+if __name__ == "__main__":
+    unittest.main()
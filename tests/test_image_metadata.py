@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Tests for reading image types and sizes from headers."""
+
+import io
+import os
+import struct
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_metadata import ImageMetadata, parse_image_header, size_attributes  # noqa: E402
+
+
+def webp(chunk_type, payload):
+    chunk = chunk_type + struct.pack("<I", len(payload)) + payload
+    return b"RIFF" + struct.pack("<I", 4 + len(chunk)) + b"WEBP" + chunk
+
+
+VP8X = webp(b"VP8X", b"\x10\x00\x00\x00" + (799).to_bytes(3, 'little') + (599).to_bytes(3, 'little'))
+VP8L = webp(b"VP8L", b"\x2f" + struct.pack("<I", 319 | (239 << 14)) + b"\x00" * 8)
+VP8 = webp(b"VP8 ", b"\x00" * 3 + b"\x9d\x01\x2a" + struct.pack("<HH", 640, 480) + b"\x00" * 8)
+
+
+class WebpTest(unittest.TestCase):
+
+    def test_sizes(self):
+        self.assertEqual(parse_image_header(VP8X), ImageMetadata('image/webp', 800, 600))
+        self.assertEqual(parse_image_header(VP8L), ImageMetadata('image/webp', 320, 240))
+        self.assertEqual(parse_image_header(VP8), ImageMetadata('image/webp', 640, 480))
+
+    def test_truncated_headers_have_no_size(self):
+        for data, size_end in ((VP8X, 30), (VP8L, 25), (VP8, 30)):
+            for length in range(16, size_end):
+                self.assertEqual(parse_image_header(data[:length]), ImageMetadata('image/webp', None, None),
+                                 (data[12:16], length))
+                self.assertEqual(size_attributes(parse_image_header(data[:length])), "")
+
+    def test_short_vp8x_chunk_has_no_size(self):
+        data = webp(b"VP8X", b"\x00" * 6) + b"\xff" * 8
+        self.assertEqual(parse_image_header(data), ImageMetadata('image/webp', None, None))
+
+
+class OtherFormatsTest(unittest.TestCase):
+
+    def test_png_gif_bmp(self):
+        png = b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", 64, 32) + b"\x08\x06\x00\x00\x00"
+        self.assertEqual(parse_image_header(png), ImageMetadata('image/png', 64, 32))
+        self.assertEqual(parse_image_header(png[:20]), ImageMetadata('image/png', None, None))
+        self.assertEqual(parse_image_header(b"GIF89a" + struct.pack("<HH", 7, 9)),
+                         ImageMetadata('image/gif', 7, 9))
+        bmp = b"BM" + b"\x00" * 12 + struct.pack("<Iii", 40, 5, -6)
+        self.assertEqual(parse_image_header(bmp), ImageMetadata('image/bmp', 5, 6))
+
+    def test_jpeg_frame_after_a_large_segment(self):
+        segment = b"\xff\xe2" + struct.pack(">H", 6002) + b"\x00" * 6000
+        frame = b"\xff\xc0" + struct.pack(">HBHH", 17, 8, 480, 640) + b"\x00" * 10
+        data = b"\xff\xd8" + segment + frame
+        self.assertEqual(parse_image_header(data[:4096], io.BytesIO(data)),
+                         ImageMetadata('image/jpeg', 640, 480))
+        self.assertEqual(parse_image_header(data[:4096]), ImageMetadata('image/jpeg', None, None))
+
+    def test_svg(self):
+        self.assertEqual(parse_image_header(b'<svg width="100" viewBox="0 0 50 25">'),
+                         ImageMetadata('image/svg+xml', 100, 50))
+        self.assertEqual(parse_image_header(b'<svg width="100%" height="10">'),
+                         ImageMetadata('image/svg+xml', None, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
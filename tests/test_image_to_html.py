@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Tests for hybrid image pages."""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from asset_pipeline import AssetStore  # noqa: E402
+from image_cache import Base64Cache  # noqa: E402
+from image_to_html import REFERENCE_NOTES, iter_image_html, placeholder_attributes  # noqa: E402
+from png_codec import encode_rgba  # noqa: E402
+
+
+class HybridModeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.image_path = os.path.join(self.directory, "chart.png")
+        with open(self.image_path, 'wb') as f:
+            f.write(encode_rgba(bytes([200, 40, 40, 255, 0, 0, 0, 0]) * 32 * 16, 64, 16))
+        self.cache = Base64Cache(os.path.join(self.directory, "cache"))
+
+    def render(self, assets=None):
+        report = {}
+        html = b"".join(iter_image_html(self.image_path, "hybrid", cache=self.cache,
+                                        report=report, assets=assets)).decode('utf-8')
+        return html, report
+
+    def test_placeholder_is_removed_on_load(self):
+        html, report = self.render()
+        self.assertIn("background: url(data:image/png;base64,", html)
+        self.assertIn(""" onload="this.style.background='none'\"""", html)
+        self.assertGreater(report['placeholder'], 0)
+        self.assertEqual(placeholder_attributes(b""), "")
+
+    def test_note_matches_the_image_src(self):
+        html, _ = self.render()
+        self.assertIn('src="chart.png"', html)
+        self.assertIn(REFERENCE_NOTES[0], html)
+        html, _ = self.render(AssetStore(os.path.join(self.directory, "out")))
+        self.assertRegex(html, r'src="assets/[0-9a-f]+\.png"')
+        self.assertIn(REFERENCE_NOTES[1], html)
+        self.assertNotIn(REFERENCE_NOTES[0], html)
+
+    def test_placeholder_is_cached(self):
+        self.render()
+        self.render()
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
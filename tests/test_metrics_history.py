@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Tests for the metrics history and the cards derived from it."""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics_history import (NO_CHANGE, MetricsHistory, derive_metric_cards,  # noqa: E402
+                             format_compact, format_month, parse_month)
+
+
+class FormatTest(unittest.TestCase):
+
+    def test_format_compact(self):
+        cases = {0: "0", 899: "899", 1000: "1K", 1250: "1.2K", 9999: "10K", 56000: "56K",
+                 999499: "999K", 999950: "1M", 1234567: "1.2M", 999950000: "1B", -999950: "-1M"}
+        for value, text in cases.items():
+            self.assertEqual(format_compact(value), text, value)
+
+    def test_months(self):
+        index = parse_month("February 2026")
+        self.assertEqual(index, parse_month("Feb 2026"))
+        self.assertEqual(index, parse_month("2026-02"))
+        self.assertEqual(format_month(index - 2), "2025-12")
+        with self.assertRaises(ValueError):
+            parse_month("Febtember 2026")
+
+
+class HistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.history = MetricsHistory(os.path.join(directory, "history.db"))
+        self.addCleanup(self.history.close)
+        self.month = parse_month("2026-02")
+
+    def cards(self):
+        return derive_metric_cards(self.history.iter_month_pairs())
+
+    def test_change_is_derived_from_the_previous_month(self):
+        self.history.record([("acme", "2026-01", "views", 1000), ("acme", "2026-02", "views", 750)])
+        card = self.cards()["acme", self.month]['views']
+        self.assertEqual(card['value'], "750")
+        self.assertEqual(card['change_percentage'], "-25.0%")
+        self.assertIn("decreased 25.0%", card['description'])
+        self.assertEqual(self.cards()["acme", self.month - 1]['views']['change_percentage'], NO_CHANGE)
+
+    def test_sources_are_summed_and_replaced(self):
+        self.history.replace_source("jan.log", "views", {("acme", self.month - 1): 1200})
+        self.history.replace_source("feb1.log", "views", {("acme", self.month): 1000})
+        self.history.replace_source("feb2.log", "views", {("acme", self.month): 500})
+        self.history.replace_source("feb2.log", "views", {("acme", self.month): 500})
+        card = self.cards()["acme", self.month]['views']
+        self.assertEqual((card['value'], card['change_percentage']), ("1.5K", "25.0%"))
+        self.history.replace_source("feb1.log", "views", {})
+        self.assertEqual(self.cards()["acme", self.month]['views']['value'], "500")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""Tests for the pure-Python PNG codec."""
+
+import os
+import random
+import struct
+import sys
+import unittest
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from png_codec import (PngImage, build_png, decode_png, downscale_rgba, encode_png,  # noqa: E402
+                       encode_rgba, optimize_png, read_chunks, to_rgba8)
+
+
+def make_rgba(width, height, seed=0, colours=None):
+    """Random RGBA pixels, optionally drawn from a few colours."""
+    rng = random.Random(seed)
+    if colours is None:
+        return bytes(rng.randrange(256) for _ in range(width * height * 4))
+    palette = [bytes(rng.randrange(256) for _ in range(4)) for _ in range(colours)]
+    return b"".join(rng.choice(palette) for _ in range(width * height))
+
+
+def header(width, height, bit_depth=8, color_type=6):
+    return struct.pack(">IIBBBBB", width, height, bit_depth, color_type, 0, 0, 0)
+
+
+def reference_downscale(rgba, width, height, new_width, new_height):
+    """Area-weighted box filter in exact arithmetic, with colours weighted by alpha."""
+    result = bytearray()
+    for y in range(new_height):
+        y0, y1 = y * height / new_height, (y + 1) * height / new_height
+        for x in range(new_width):
+            x0, x1 = x * width / new_width, (x + 1) * width / new_width
+            sums, area, coverage = [0.0] * 4, 0.0, 0.0
+            for sy in range(int(y0), min(height, int(-(-y1 // 1)))):
+                wy = min(y1, sy + 1) - max(y0, sy)
+                for sx in range(int(x0), min(width, int(-(-x1 // 1)))):
+                    weight = wy * (min(x1, sx + 1) - max(x0, sx))
+                    offset = (sy * width + sx) * 4
+                    alpha = rgba[offset + 3]
+                    for channel in range(3):
+                        sums[channel] += rgba[offset + channel] * alpha * weight
+                    coverage += alpha * weight
+                    area += weight
+            colour = [value / coverage if coverage else 0.0 for value in sums[:3]]
+            result.extend(int(value + 0.5) for value in colour + [coverage / area])
+    return bytes(result)
+
+
+class RoundTripTest(unittest.TestCase):
+
+    def test_encode_decode_round_trip(self):
+        for colours in (None, 3, 200):
+            rgba = make_rgba(13, 7, seed=colours or 1, colours=colours)
+            self.assertEqual(to_rgba8(decode_png(encode_rgba(rgba, 13, 7))), rgba)
+
+    def test_every_filter_strategy_round_trips(self):
+        rgba = make_rgba(9, 5)
+        image = PngImage(9, 5, 8, 6, [rgba[row * 36:(row + 1) * 36] for row in range(5)])
+        for strategy in ('none', 'sub', 'up', 'adaptive'):
+            self.assertEqual(decode_png(encode_png(image, strategy)).rows, image.rows)
+
+    def test_optimize_keeps_pixels_and_never_grows(self):
+        rgba = make_rgba(16, 16, colours=4)
+        image = PngImage(16, 16, 8, 6, [rgba[row * 64:(row + 1) * 64] for row in range(16)])
+        data = encode_png(image, 'none')
+        optimized = optimize_png(data)
+        self.assertLessEqual(len(optimized), len(data))
+        self.assertEqual(to_rgba8(decode_png(optimized)), rgba)
+
+
+class CorruptInputTest(unittest.TestCase):
+
+    def test_corrupt_image_data_with_valid_crc(self):
+        data = build_png(header(4, 4), b"this is not zlib data")
+        with self.assertRaises(ValueError):
+            decode_png(data)
+        self.assertEqual(optimize_png(data), data)
+
+    def test_short_ihdr(self):
+        data = build_png(header(4, 4)[:5], b"this is not zlib data")
+        with self.assertRaises(ValueError):
+            decode_png(data)
+        self.assertEqual(optimize_png(data), data)
+
+    def test_unsupported_bit_depth(self):
+        data = build_png(header(4, 4, bit_depth=3, color_type=0), zlib.compress(b"\x00" * 3 * 4))
+        with self.assertRaises(ValueError):
+            decode_png(data)
+
+    def test_truncated_image_data(self):
+        data = build_png(header(4, 4), zlib.compress(b"\x00" * 17, 1))
+        with self.assertRaises(ValueError):
+            decode_png(data)
+        # Undecodable PNGs are only recompressed, keeping their filtered data
+        chunks = dict(read_chunks(optimize_png(data)))
+        self.assertEqual(chunks[b"IHDR"], header(4, 4))
+        self.assertEqual(zlib.decompress(chunks[b"IDAT"]), b"\x00" * 17)
+
+    def test_bad_crc_and_signature(self):
+        data = bytearray(encode_rgba(make_rgba(2, 2), 2, 2))
+        self.assertEqual(optimize_png(b"not a png"), b"not a png")
+        data[-5] ^= 0xFF
+        with self.assertRaises(ValueError):
+            read_chunks(bytes(data))
+        self.assertEqual(optimize_png(bytes(data)), bytes(data))
+
+
+class DownscaleTest(unittest.TestCase):
+
+    def assert_close(self, result, expected, size):
+        """Alpha within 1; colours within 1 plus the error of 8-bit
+        premultiplied colours, which grows as alpha shrinks."""
+        self.assertEqual(len(result), len(expected))
+        for offset in range(0, len(result), 4):
+            alpha = expected[offset + 3]
+            self.assertLessEqual(abs(result[offset + 3] - alpha), 1, size)
+            tolerance = 1 if alpha == 255 else 1 + 2 * 255 / max(alpha, 1)
+            for channel in range(3):
+                self.assertLessEqual(abs(result[offset + channel] - expected[offset + channel]),
+                                     tolerance, (size, offset))
+
+    def test_matches_box_filter_reference(self):
+        for size in ((8, 6, 4, 3), (10, 7, 3, 4), (5, 5, 5, 5), (7, 3, 1, 1)):
+            rgba = make_rgba(size[0], size[1], seed=sum(size))
+            self.assert_close(downscale_rgba(rgba, *size), reference_downscale(rgba, *size), size)
+
+    def test_opaque_matches_reference_exactly(self):
+        for size in ((8, 6, 4, 3), (10, 7, 3, 4)):
+            rgba = bytearray(make_rgba(size[0], size[1], seed=sum(size)))
+            rgba[3::4] = b"\xff" * (size[0] * size[1])
+            result = downscale_rgba(bytes(rgba), *size)
+            expected = reference_downscale(bytes(rgba), *size)
+            self.assertLessEqual(max(abs(a - b) for a, b in zip(result, expected)), 1, size)
+
+    def test_transparent_pixels_do_not_darken_edges(self):
+        self.assertEqual(downscale_rgba(bytes([255, 0, 0, 255, 0, 0, 0, 0]), 2, 1, 1, 1),
+                         bytes([255, 0, 0, 128]))
+        # An opaque square on a transparent background, halved
+        rgba = bytearray(bytes(4) * 36)
+        for y in range(1, 5):
+            for x in range(1, 5):
+                rgba[(y * 6 + x) * 4:(y * 6 + x) * 4 + 4] = bytes([40, 160, 240, 255])
+        result = downscale_rgba(bytes(rgba), 6, 6, 3, 3)
+        for offset in range(0, len(result), 4):
+            if result[offset + 3]:
+                colour = result[offset:offset + 3]
+                self.assertLessEqual(max(abs(a - b) for a, b in zip(colour, (40, 160, 240))), 1)
+        self.assertEqual(result[3::4], bytes([64, 128, 64, 128, 255, 128, 64, 128, 64]))
+
+    def test_fully_transparent_stays_transparent(self):
+        self.assertEqual(downscale_rgba(bytes([9, 9, 9, 0]) * 4, 2, 2, 1, 1), bytes(4))
+
+    def test_uniform_colour_is_exact(self):
+        rgba = bytes((10, 200, 30, 255)) * (9 * 7)
+        self.assertEqual(downscale_rgba(rgba, 9, 7, 4, 3), bytes((10, 200, 30, 255)) * 12)
+
+
+if __name__ == "__main__":
+    unittest.main()
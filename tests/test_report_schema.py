@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Tests for report config validation."""
+
+import copy
+import json
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from report_schema import ConfigValidationError, check_config, format_path, validate_config  # noqa: E402
+
+
+def load_config():
+    with open(os.path.join(ROOT, "Input Values.json"), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class ValidateConfigTest(unittest.TestCase):
+
+    def setUp(self):
+        self.config = load_config()
+
+    def test_example_config_is_valid(self):
+        self.assertEqual(validate_config(self.config), [])
+        check_config(self.config)
+
+    def test_every_problem_is_reported_with_its_path(self):
+        del self.config['metrics']['catalog_items']['description']
+        self.config['division_chart']['divisions'][1]['percentage'] = "25"
+        self.config['styling']['metrics_grid_gap'] = "wide"
+        self.config['highlights']['items'].append(3)
+        self.assertEqual(validate_config(self.config), [
+            "metrics.catalog_items.description: missing required key",
+            "division_chart.divisions[1].percentage: expected number, got string",
+            f"highlights.items[{len(self.config['highlights']['items']) - 1}]: expected string, got number",
+            "styling.metrics_grid_gap: invalid CSS length 'wide'",
+        ])
+
+    def test_empty_division_list_is_an_error(self):
+        self.config['division_chart']['divisions'] = []
+        self.assertEqual(validate_config(self.config),
+                         ["division_chart.divisions: expected at least one division"])
+
+    def test_percentages_must_sum_to_100(self):
+        divisions = self.config['division_chart']['divisions']
+        divisions[0]['percentage'] += 5
+        total = sum(division['percentage'] for division in divisions)
+        self.assertEqual(validate_config(self.config),
+                         [f"division_chart.divisions: percentages sum to {total:g}, expected 100"])
+        divisions[0]['percentage'] -= 5.005
+        self.assertEqual(validate_config(self.config), [])
+
+    def test_optional_metadata_types(self):
+        self.config['report_metadata']['tenant'] = 7
+        self.assertEqual(validate_config(self.config), ["report_metadata.tenant: expected string, got number"])
+
+    def test_wrong_top_level_types(self):
+        self.assertEqual(validate_config([]), ["<config>: expected object, got array"])
+        config = copy.deepcopy(self.config)
+        config['division_chart'] = None
+        self.assertEqual(validate_config(config), ["division_chart: expected object, got null"])
+
+    def test_check_config_raises_with_every_error(self):
+        del self.config['footer']
+        del self.config['up_next']
+        with self.assertRaises(ConfigValidationError) as raised:
+            check_config(self.config)
+        self.assertEqual(len(raised.exception.errors), 2)
+
+    def test_format_path(self):
+        self.assertEqual(format_path(('a', 'b', 0, 'c')), "a.b[0].c")
+        self.assertEqual(format_path(()), "<config>")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Tests for the report render service."""
+
+import http.client
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from report_server import ReportServer, canonical_config_hash  # noqa: E402
+
+
+def load_config():
+    with open(os.path.join(ROOT, "Input Values.json"), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class ReportServerTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.config_dir = tempfile.mkdtemp()
+        with open(os.path.join(cls.config_dir, "beacon.json"), 'w', encoding='utf-8') as f:
+            json.dump(load_config(), f)
+        cls.server = ReportServer(("127.0.0.1", 0), cls.config_dir, max_entries=2)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        shutil.rmtree(cls.config_dir)
+
+    def request(self, method, path, body=None, headers=None):
+        connection = http.client.HTTPConnection("127.0.0.1", self.server.server_address[1], timeout=10)
+        try:
+            connection.request(method, path, body, headers or {})
+            response = connection.getresponse()
+            return response.status, dict(response.getheaders()), response.read()
+        finally:
+            connection.close()
+
+    def test_render_and_revalidate(self):
+        body = json.dumps(load_config()).encode('utf-8')
+        status, headers, html = self.request("POST", "/render", body)
+        self.assertEqual(status, 200)
+        self.assertIn(b"<html", html)
+        status, _, _ = self.request("POST", "/render", body, {"If-None-Match": headers['ETag']})
+        self.assertEqual(status, 304)
+
+    def test_named_report(self):
+        status, _, html = self.request("GET", "/reports/beacon.html")
+        self.assertEqual(status, 200)
+        self.assertEqual(self.request("GET", "/reports/../secret")[0], 404)
+        self.assertEqual(self.request("GET", "/reports/missing")[0], 404)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.request("POST", "/render", b"{", {"Content-Length": "1"})[0], 400)
+        self.assertEqual(self.request("POST", "/render", b"", {"Content-Length": "-1"})[0], 400)
+        self.assertEqual(self.request("POST", "/render", b"[]")[0], 422)
+        self.assertEqual(self.request("POST", "/other", b"{}")[0], 404)
+        config = load_config()
+        config['division_chart']['divisions'] = []
+        status, _, _ = self.request("POST", "/render", json.dumps(config).encode('utf-8'))
+        self.assertEqual(status, 422)
+
+    def test_stats_count_cache_hits(self):
+        before = json.loads(self.request("GET", "/stats")[2])
+        body = json.dumps(load_config()).encode('utf-8')
+        self.request("POST", "/render", body)
+        self.request("POST", "/render", body)
+        after = json.loads(self.request("GET", "/stats")[2])
+        self.assertGreaterEqual(after['hits'] - before['hits'], 1)
+        self.assertLessEqual(after['entries'], 2)
+
+
+class CanonicalHashTest(unittest.TestCase):
+
+    def test_key_order_does_not_matter(self):
+        self.assertEqual(canonical_config_hash({"a": 1, "b": [1, 2]}), canonical_config_hash({"b": [1, 2], "a": 1}))
+        self.assertNotEqual(canonical_config_hash({"a": 1}), canonical_config_hash({"a": 1}, "other"))
+
+
+if __name__ == "__main__":
+    unittest.main()
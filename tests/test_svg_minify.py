@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Tests for SVG minification and embedding."""
+
+import base64
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from xml.dom import minidom
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_to_html import iter_image_html  # noqa: E402
+from svg_minify import can_inline_svg, expand_entities, format_number, minify_svg, svg_data_uri  # noqa: E402
+
+ILLUSTRATOR_SVG = """<?xml version="1.0" encoding="utf-8"?>
+<!-- Generator: Adobe Illustrator 24.0.0 -->
+<!DOCTYPE svg PUBLIC "-//W3C//DTD SVG 1.1//EN" "http://www.w3.org/Graphics/SVG/1.1/DTD/svg11.dtd" [
+    <!ENTITY ns_svg "http://www.w3.org/2000/svg">
+    <!ENTITY ns_xlink "http://www.w3.org/1999/xlink">
+    <!ENTITY st0 "fill:#FF0000;">
+]>
+<svg xmlns="&ns_svg;" xmlns:xlink="&ns_xlink;" viewBox="0 0 10 10">
+    <rect style="&st0;" width="10.00001" height="10"/>
+    <text>&amp; &#169;</text>
+</svg>
+"""
+
+
+class MinifySvgTest(unittest.TestCase):
+
+    def test_expands_doctype_entities(self):
+        svg = minify_svg(ILLUSTRATOR_SVG)
+        self.assertNotIn("DOCTYPE", svg)
+        self.assertNotIn("&ns_svg;", svg)
+        document = minidom.parseString(svg)
+        self.assertEqual(document.documentElement.getAttribute("xmlns"), "http://www.w3.org/2000/svg")
+        self.assertEqual(document.getElementsByTagName("rect")[0].getAttribute("style"), "fill:#FF0000;")
+        self.assertIn("&amp; &#169;", svg)
+        self.assertTrue(can_inline_svg(svg))
+
+    def test_entities_can_refer_to_earlier_entities(self):
+        svg = ('<!DOCTYPE svg [<!ENTITY base "http://example.com/">'
+               '<!ENTITY logo "&base;logo.png">]><svg><image href="&logo;"/><![CDATA[&base;]]></svg>')
+        self.assertEqual(expand_entities(svg),
+                         '<svg><image href="http://example.com/logo.png"/><![CDATA[&base;]]></svg>')
+
+    def test_keeps_doctype_with_other_declarations(self):
+        svg = ('<!DOCTYPE svg [<!ENTITY % local SYSTEM "local.dtd"><!ENTITY ns "x">]>'
+               '<svg xmlns="&ns;"/>')
+        minified = minify_svg(svg)
+        self.assertIn("<!DOCTYPE svg [", minified)
+        self.assertIn("&ns;", minified)
+        self.assertFalse(can_inline_svg(minified))
+
+    def test_drops_plain_doctype_and_editor_markup(self):
+        svg = ('<!DOCTYPE svg PUBLIC "-//W3C//DTD SVG 1.1//EN" "svg11.dtd">\n'
+               '<svg xmlns:inkscape="http://www.inkscape.org" inkscape:version="1.0">\n'
+               '  <metadata><rdf:RDF/></metadata>\n  <inkscape:grid/>\n</svg>')
+        self.assertEqual(minify_svg(svg), "<svg></svg>")
+
+    def test_keeps_transform_and_viewbox_numbers(self):
+        svg = ('<svg viewBox="0 0 0.0004 0.0002"><g transform="scale(0.0004) translate(1.23456 2)">'
+               '<path d="M 0.12345 1.00000 L -0.50000 2"/></g></svg>')
+        minified = minify_svg(svg)
+        self.assertIn('viewBox="0 0 0.0004 0.0002"', minified)
+        self.assertIn('transform="scale(0.0004) translate(1.23456 2)"', minified)
+        self.assertIn('d="M.123 1L-.5 2"', minified)
+
+    def test_format_number(self):
+        self.assertEqual(format_number("-0.500"), "-.5")
+        self.assertEqual(format_number("0.0001"), "0")
+        self.assertEqual(format_number("12.0"), "12")
+
+    def test_text_keeps_word_breaks(self):
+        self.assertEqual(minify_svg("<svg>\n  <text>a\n  b</text>\n</svg>"), "<svg><text>a b</text></svg>")
+
+    def test_unsafe_content_is_not_inlined(self):
+        for svg in ('<svg><script>alert(1)</script></svg>', '<svg onload="alert(1)"/>',
+                    '<svg><style>body{display:none}</style></svg>',
+                    '<svg><foreignObject><p>x</p></foreignObject></svg>',
+                    '<svg><a href="javascript:alert(1)"/></svg>'):
+            self.assertFalse(can_inline_svg(svg), svg)
+        self.assertTrue(can_inline_svg('<svg><rect width="1"/></svg>'))
+
+    def test_data_uri_escapes_unsafe_characters(self):
+        uri = svg_data_uri('<svg fill="#fff"/>')
+        self.assertEqual(uri, "data:image/svg+xml,%3Csvg fill='%23fff'/%3E")
+
+
+class SvgEmbeddingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def render(self, name, data, mode="base64"):
+        path = os.path.join(self.directory, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        report = {}
+        html = b"".join(iter_image_html(path, mode, report=report)).decode('utf-8')
+        return html, report
+
+    def test_latin1_svg_is_embedded_as_base64(self):
+        data = '<?xml version="1.0" encoding="ISO-8859-1"?><svg><text>café</text></svg>'.encode('latin-1')
+        for mode in ("base64", "responsive"):
+            html, report = self.render("latin1.svg", data, mode)
+            self.assertIn("data:image/svg+xml;base64," + base64.b64encode(data).decode('ascii'), html)
+            self.assertNotIn('svg', report)
+
+    def test_safe_svg_is_inlined_and_unsafe_svg_is_not(self):
+        html, report = self.render("safe.svg", b'<svg viewBox="0 0 1 1"><rect width="1"/></svg>')
+        self.assertIn('<svg role="img" aria-label="Embedded Image" viewBox="0 0 1 1">', html)
+        html, _ = self.render("unsafe.svg", b'<svg onload="alert(1)"><rect width="1"/></svg>')
+        self.assertNotIn("<svg onload", html)
+        self.assertIn("data:image/svg+xml,", html)
+
+
+if __name__ == "__main__":
+    unittest.main()
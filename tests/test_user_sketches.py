@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Tests for the HyperLogLog user sketches."""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from user_sketches import (HyperLogLog, SketchStore, estimate_overlap, merge_sketches,  # noqa: E402
+                           returning_users)
+
+
+def sketch(items, precision=12):
+    result = HyperLogLog(precision)
+    result.update(items)
+    return result
+
+
+def users(start, stop):
+    return (f"user-{index}" for index in range(start, stop))
+
+
+class HyperLogLogTest(unittest.TestCase):
+
+    def test_empty_and_small_counts(self):
+        self.assertEqual(HyperLogLog().count(), 0.0)
+        self.assertAlmostEqual(sketch(users(0, 10)).count(), 10, delta=0.5)
+        self.assertAlmostEqual(sketch(["a"] * 100).count(), 1, delta=0.1)
+
+    def test_estimates_stay_within_a_few_standard_errors(self):
+        for count in (1000, 10000, 50000):
+            estimate = sketch(users(0, count)).count()
+            self.assertLess(abs(estimate - count) / count, 4 * HyperLogLog().relative_error, count)
+
+    def test_merge_is_idempotent_and_order_independent(self):
+        a, b = sketch(users(0, 3000)), sketch(users(2000, 5000))
+        merged = a.copy().merge(b)
+        self.assertEqual(merged.registers, b.copy().merge(a).registers)
+        self.assertEqual(merged.copy().merge(b).registers, merged.registers)
+        self.assertEqual(merged.registers, sketch(users(0, 5000)).registers)
+
+    def test_serialization_round_trip(self):
+        original = sketch(users(0, 500), precision=10)
+        restored = HyperLogLog.from_bytes(original.to_bytes())
+        self.assertEqual((restored.precision, restored.registers), (10, original.registers))
+
+    def test_invalid_precision_and_mismatched_merge(self):
+        with self.assertRaises(ValueError):
+            HyperLogLog(3)
+        with self.assertRaises(ValueError):
+            HyperLogLog(12, bytes(10))
+        with self.assertRaises(ValueError):
+            HyperLogLog(10).merge(HyperLogLog(12))
+
+
+class ReturningUsersTest(unittest.TestCase):
+
+    def test_overlap_estimate(self):
+        january, february = sketch(users(0, 10000)), sketch(users(7000, 17000))
+        estimate, error = estimate_overlap(january, february)
+        self.assertLess(abs(estimate - 3000), 4 * error)
+        self.assertEqual(estimate_overlap(sketch(users(0, 10)), HyperLogLog())[0], 0.0)
+
+    def test_months_and_shards_are_merged_before_estimating(self):
+        monthly = merge_sketches([
+            ("acme", 10, sketch(users(0, 600))),
+            ("acme", 10, sketch(users(400, 1000))),
+            ("acme", 11, sketch(users(500, 1500))),
+            ("other", 11, sketch(users(0, 100))),
+        ])
+        self.assertEqual(set(monthly), {("acme", 10), ("acme", 11), ("other", 11)})
+        returning = returning_users(monthly)
+        self.assertEqual(set(returning), {("acme", 11)})
+        self.assertAlmostEqual(returning["acme", 11][0], 500, delta=4 * returning["acme", 11][1])
+
+    def test_store_replaces_a_source_file(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with SketchStore(os.path.join(directory, "sketches.db")) as store:
+            store.replace_source("a.log", {("acme", 10): sketch(users(0, 100))})
+            store.replace_source("a.log", {("acme", 11): sketch(users(0, 100))})
+            store.replace_source("b.log", {("acme", 11): sketch(users(50, 150))})
+            merged = merge_sketches(store.iter_sketches())
+        self.assertEqual(set(merged), {("acme", 11)})
+        self.assertEqual(merged["acme", 11].registers, sketch(users(0, 150)).registers)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""Tests for view log ingestion."""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from view_ingest import _merge_shards, event_day, monthly_views  # noqa: E402
+
+
+def shard(path, views=None, error=None):
+    return {'path': path, 'error': error, 'views': views or {}, 'sketches': {},
+            'rows': sum((views or {}).values()), 'bad_rows': 0, 'bytes': 10}
+
+
+class MergeShardsTest(unittest.TestCase):
+
+    def test_file_with_a_failed_shard_is_left_out(self):
+        totals = _merge_shards([
+            shard("a.log", {("acme", "2026-01-02"): 5}),
+            shard("b.log", {("acme", "2026-01-02"): 7}),
+            shard("b.log", error="OSError: truncated"),
+            shard("b.log", {("acme", "2026-01-03"): 2}),
+        ])
+        self.assertEqual(totals['views'], {("acme", "2026-01-02"): 5})
+        self.assertEqual(set(totals['file_views']), {"a.log"})
+        self.assertEqual(totals['errors'], [("b.log", "OSError: truncated")])
+
+    def test_shards_of_one_file_are_summed(self):
+        totals = _merge_shards([shard("a.log", {("acme", "2026-01-02"): 5}),
+                                shard("a.log", {("acme", "2026-02-01"): 3, ("acme", "2026-01-02"): 1})])
+        self.assertEqual(totals['views'][("acme", "2026-01-02")], 6)
+        self.assertEqual(totals['file_views']["a.log"], monthly_views(totals['views']))
+        self.assertEqual(totals['rows'], 9)
+
+
+class EventDayTest(unittest.TestCase):
+
+    def test_iso_and_epoch_timestamps(self):
+        self.assertEqual(event_day("2026-02-03T10:00:00Z"), "2026-02-03")
+        self.assertEqual(event_day(0), "1970-01-01")
+        self.assertEqual(event_day("1767225600000"), "2026-01-01")
+
+    def test_invalid_dates_are_rejected(self):
+        known = {}
+        for timestamp in ("abcd-ef-gh", "2026-02-30", "2026-13-01", "", "soon", True):
+            self.assertIsNone(event_day(timestamp, known), timestamp)
+        self.assertIsNone(event_day("abcd-ef-ghXYZ", known))
+
+
+if __name__ == "__main__":
+    unittest.main()
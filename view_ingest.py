@@ -0,0 +1,525 @@
+#!/usr/bin/env python3
+"""
+View Ingestion
+Streams raw access logs into the report's ``views`` metric and, from
+per-month user sketches, its ``returning_users`` metric.
+
+Logs are CSV files with a header row or JSONL files, optionally gzipped,
+with one view per row. Each row needs a tenant and a timestamp: an ISO 8601
+string whose date is taken as written, or epoch seconds (or milliseconds)
+read as UTC. Rows are counted per tenant and day by a generator pipeline
+(lines -> records -> (tenant, day) keys), so memory is bounded by the number
+of tenant-days, not by the size of the logs.
+
+With a user field, each shard also builds a HyperLogLog sketch of the users
+of every tenant and month (see user_sketches.py). The sketches of a file's
+shards are merged and stored per file, so later runs can merge them with
+the sketches of newer logs.
+
+Uncompressed files are cut into byte-range shards that start and end on
+line boundaries, and shards are aggregated in parallel worker processes.
+CSV fields must therefore not contain line breaks. Gzipped files are one
+shard each.
+"""
+
+import argparse
+import csv
+import glob
+import gzip
+import io
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from atomic_file import write_file_atomic
+from generate_report import load_json_config
+from metrics_history import (HISTORY_DB, MetricsHistory, apply_metric_cards,
+                             derive_metric_cards, format_month)
+from user_sketches import (DEFAULT_PRECISION, SKETCH_DB, HyperLogLog, SketchStore,
+                           merge_sketches, returning_users)
+
+
+LOG_SUFFIXES = (".csv", ".jsonl", ".ndjson", ".csv.gz", ".jsonl.gz", ".ndjson.gz")
+DEFAULT_SHARD_SIZE = 64 * 1024 * 1024
+# Epoch timestamps above this are taken to be milliseconds
+EPOCH_MILLISECONDS_THRESHOLD = 1e11
+
+
+def log_format(path: str) -> str:
+    """Return 'csv' or 'jsonl' from a log file's name."""
+    name = path.lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    return "csv" if name.endswith(".csv") else "jsonl"
+
+
+def expand_log_inputs(inputs: List[str]) -> List[str]:
+    """Expand directories and glob patterns into a sorted list of log files."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(os.path.join(item, name) for name in sorted(os.listdir(item))
+                         if name.lower().endswith(LOG_SUFFIXES)
+                         and os.path.isfile(os.path.join(item, name)))
+        elif glob.has_magic(item):
+            paths.extend(path for path in sorted(glob.glob(item, recursive=True))
+                         if os.path.isfile(path))
+        else:
+            paths.append(item)
+    return list(dict.fromkeys(paths))
+
+
+def plan_shards(paths: List[str], shard_size: int = DEFAULT_SHARD_SIZE) -> List[Tuple[str, int, int]]:
+    """Split log files into (path, start, end) byte ranges of about ``shard_size``.
+
+    A range owns every line that starts inside it; ``end`` of -1 means the
+    whole file, which is how gzipped files are read.
+    """
+    shards = []
+    for path in paths:
+        size = os.path.getsize(path)
+        if path.lower().endswith(".gz") or size <= shard_size:
+            shards.append((path, 0, -1))
+            continue
+        shards.extend((path, start, min(start + shard_size, size))
+                      for start in range(0, size, shard_size))
+    return shards
+
+
+def iter_shard_lines(path: str, start: int, end: int) -> Iterator[bytes]:
+    """Yield the lines starting in a shard's byte range."""
+    if end < 0:
+        opener = gzip.open if path.lower().endswith(".gz") else open
+        with opener(path, 'rb') as f:
+            yield from f
+        return
+    with open(path, 'rb') as f:
+        position = start
+        if start > 0:
+            # The line running into this shard belongs to the previous one
+            f.seek(start - 1)
+            position += len(f.readline()) - 1
+        while position < end:
+            line = f.readline()
+            if not line:
+                break
+            position += len(line)
+            yield line
+
+
+def iter_records(lines: Iterable[bytes], fmt: str, header: Optional[List[str]],
+                 fields: Tuple[str, ...], skip_header: bool) -> Iterator[Optional[tuple]]:
+    """Parse log lines into tuples of the values of ``fields``.
+
+    Missing values are None, and lines that cannot be parsed at all are
+    yielded as None.
+    """
+    if fmt == "csv":
+        indexes = [header.index(field) if field in header else len(header) for field in fields]
+        rows = csv.reader(line.decode('utf-8', 'replace') for line in lines)
+        if skip_header:
+            next(rows, None)
+        for row in rows:
+            if row:
+                size = len(row)
+                yield tuple(row[index] if index < size else None for index in indexes)
+        return
+    # JSONDecoder.decode skips json.loads' per-call encoding detection
+    decode = json.JSONDecoder().decode
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = decode(line.decode('utf-8', 'replace'))
+        except ValueError:
+            record = None
+        if record.__class__ is not dict:
+            yield None
+            continue
+        yield tuple(record.get(field) for field in fields)
+
+
+def event_day(timestamp, known_days: Optional[dict] = None) -> Optional[str]:
+    """Return the ``YYYY-MM-DD`` day of a timestamp, or None if it is not one.
+
+    ``known_days`` memoises days already checked, keyed by the timestamp's
+    first ten characters or by epoch day number.
+    """
+    if isinstance(timestamp, str):
+        if len(timestamp) >= 10 and timestamp[4] == "-" and timestamp[7] == "-":
+            prefix = timestamp[:10]
+            if known_days is not None and prefix in known_days:
+                return known_days[prefix]
+            try:
+                datetime.strptime(prefix, "%Y-%m-%d")
+                day = prefix
+            except ValueError:
+                day = None
+            if known_days is not None:
+                known_days[prefix] = day
+            return day
+        try:
+            timestamp = float(timestamp)
+        except ValueError:
+            return None
+    if isinstance(timestamp, (int, float)) and not isinstance(timestamp, bool):
+        if timestamp > EPOCH_MILLISECONDS_THRESHOLD:
+            timestamp /= 1000
+        try:
+            day_number = int(timestamp // 86400)
+        except (OverflowError, ValueError):
+            return None
+        if known_days is not None and day_number in known_days:
+            return known_days[day_number]
+        try:
+            day = datetime.fromtimestamp(day_number * 86400, timezone.utc).strftime("%Y-%m-%d")
+        except (OverflowError, OSError, ValueError):
+            return None
+        if known_days is not None:
+            known_days[day_number] = day
+        return day
+    return None
+
+
+def iter_view_keys(records: Iterable[Optional[tuple]], bad_rows: List[int]) -> Iterator[tuple]:
+    """Yield (tenant, day, *other fields) per valid (tenant, timestamp, ...)
+    record, counting the others in bad_rows[0]."""
+    known_days = {}
+    for record in records:
+        day = event_day(record[1], known_days) if record is not None and record[0] else None
+        if day is None:
+            bad_rows[0] += 1
+            continue
+        yield (str(record[0]), day) + record[2:]
+
+
+def count_views_and_users(keys: Iterable[tuple], precision: int):
+    """Count (tenant, day, user) keys per tenant and day, and sketch the
+    users of each tenant and month.
+
+    Returns (views Counter, {(tenant, month index): HyperLogLog}).
+    """
+    views = Counter()
+    sketches = {}
+    for tenant, day, user in keys:
+        views[tenant, day] += 1
+        if user is None or user == "":
+            continue
+        sketch = sketches.get((tenant, day[:7]))
+        if sketch is None:
+            sketch = sketches[tenant, day[:7]] = HyperLogLog(precision)
+        sketch.add(str(user))
+    return views, {(tenant, int(month[:4]) * 12 + int(month[5:7]) - 1): sketch
+                   for (tenant, month), sketch in sketches.items()}
+
+
+def read_csv_header(path: str) -> List[str]:
+    """Read the column names from a CSV log's first line."""
+    opener = gzip.open if path.lower().endswith(".gz") else open
+    with opener(path, 'rb') as f:
+        first_line = f.readline().decode('utf-8-sig')
+    return next(csv.reader(io.StringIO(first_line)), [])
+
+
+def aggregate_shard(job) -> dict:
+    """Count the views per (tenant, day) in one shard, and sketch the
+    users per (tenant, month) when there is a user field.
+
+    Returns a result dict with the counts, the serialized sketches, the rows
+    read, the rows skipped and the bytes covered, or the error.
+    """
+    (path, start, end), fmt, header, fields, precision = job
+    result = {'path': path, 'error': None, 'views': {}, 'sketches': {}, 'rows': 0, 'bad_rows': 0,
+              'bytes': (os.path.getsize(path) if end < 0 else end - start)}
+    bad_rows = [0]
+    try:
+        records = iter_records(iter_shard_lines(path, start, end), fmt, header,
+                               fields, skip_header=(fmt == "csv" and start == 0))
+        keys = iter_view_keys(records, bad_rows)
+        if len(fields) > 2:
+            views, sketches = count_views_and_users(keys, precision)
+            result['sketches'] = {key: sketch.to_bytes() for key, sketch in sketches.items()}
+        else:
+            views = Counter(keys)
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+        return result
+    result['views'] = dict(views)
+    result['bad_rows'] = bad_rows[0]
+    result['rows'] = sum(views.values()) + bad_rows[0]
+    return result
+
+
+def aggregate_views(paths: List[str], workers: Optional[int] = None,
+                    shard_size: int = DEFAULT_SHARD_SIZE, tenant_field: str = "tenant",
+                    time_field: str = "timestamp", user_field: Optional[str] = None,
+                    precision: int = DEFAULT_PRECISION) -> dict:
+    """Count views per (tenant, day) across log files, sharded over a process pool.
+
+    Returns {'views': Counter, 'file_views': {path: {(tenant, month):
+    views}}, 'sketches': {path: {(tenant, month): HyperLogLog}}, 'rows',
+    'bad_rows', 'bytes', 'shards', 'elapsed', 'errors': [(path, error)]}.
+    Sketches are only built with ``user_field``. Files with a failed shard
+    are left out of the views, per-file totals and sketches.
+    """
+    workers = workers or os.cpu_count() or 1
+    headers = {path: read_csv_header(path) for path in paths if log_format(path) == "csv"}
+    fields = (tenant_field, time_field) + ((user_field,) if user_field else ())
+    jobs = [(shard, log_format(shard[0]), headers.get(shard[0]), fields, precision)
+            for shard in plan_shards(paths, shard_size)]
+
+    start = time.perf_counter()
+    if workers == 1 or len(jobs) <= 1:
+        totals = _merge_shards(map(aggregate_shard, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            totals = _merge_shards(executor.map(aggregate_shard, jobs))
+    totals['elapsed'] = time.perf_counter() - start
+    totals['shards'] = len(jobs)
+    return totals
+
+
+def _merge_shards(results: Iterable[dict]) -> dict:
+    """Merge shard results. A file with a failed shard is left out of the
+    views and sketches entirely, so its other shards cannot pass for a
+    complete, smaller total."""
+    totals = {'views': Counter(), 'file_views': {}, 'sketches': {}, 'rows': 0, 'bad_rows': 0,
+              'bytes': 0, 'errors': []}
+    file_daily = {}
+    for result in results:
+        if result['error']:
+            totals['errors'].append((result['path'], result['error']))
+            continue
+        file_daily.setdefault(result['path'], Counter()).update(result['views'])
+        file_sketches = totals['sketches'].setdefault(result['path'], {})
+        for key, data in result['sketches'].items():
+            sketch = HyperLogLog.from_bytes(data)
+            if key in file_sketches:
+                file_sketches[key].merge(sketch)
+            else:
+                file_sketches[key] = sketch
+        for key in ('rows', 'bad_rows', 'bytes'):
+            totals[key] += result[key]
+    for path, _ in totals['errors']:
+        file_daily.pop(path, None)
+        totals['sketches'].pop(path, None)
+    for path, daily in file_daily.items():
+        totals['views'].update(daily)
+        totals['file_views'][path] = Counter(monthly_views(daily))
+    return totals
+
+
+def monthly_views(daily_views: Dict[Tuple[str, str], int]) -> Dict[Tuple[str, int], int]:
+    """Sum daily view counts into {(tenant, month index): views}."""
+    months = Counter()
+    for (tenant, day), views in daily_views.items():
+        months[tenant, int(day[:4]) * 12 + int(day[5:7]) - 1] += views
+    return months
+
+
+def metric_cards(metric: str, months: Dict[Tuple[str, int], int], history_db: Optional[str] = None,
+                 file_totals: Optional[Dict[str, Dict[Tuple[str, int], int]]] = None):
+    """Derive one metric's cards from its monthly totals.
+
+    With ``history_db`` the totals are recorded in the metrics history first
+    and the cards come from the whole history, so earlier months ingested
+    by previous runs count as the previous month. With ``file_totals``
+    ({path: monthly totals}) they are recorded per log file instead, and a
+    month's value is the sum over every file ingested so far.
+    """
+    if history_db:
+        with MetricsHistory(history_db) as history:
+            if file_totals is None:
+                history.record((tenant, month, metric, value) for (tenant, month), value in months.items())
+            else:
+                for path, totals in file_totals.items():
+                    history.replace_source(os.path.abspath(path), metric, totals)
+            return derive_metric_cards(row for row in history.iter_month_pairs() if row[2] == metric)
+    return derive_metric_cards(
+        (tenant, month, metric, value, months.get((tenant, month - 1)))
+        for (tenant, month), value in months.items())
+
+
+def update_config_file(config_path: str, cards) -> Optional[Dict[str, str]]:
+    """Write metric cards into a config file, returning {metric: new value} or None."""
+    config = load_json_config(config_path)
+    updated, applied = apply_metric_cards(config, cards, Path(config_path).stem)
+    if not applied:
+        return None
+    write_file_atomic(config_path, json.dumps(updated, indent=4, ensure_ascii=False).encode('utf-8'))
+    return {metric: card['value'] for metric, card in applied.items()}
+
+
+def estimate_returning_users(file_sketches: Dict[str, Dict[Tuple[str, int], HyperLogLog]],
+                             sketch_db: str) -> Dict[Tuple[str, int], Tuple[float, float]]:
+    """Store this run's sketches per file and estimate returning users from
+    every stored sketch, as {(tenant, month): (estimate, standard error)}."""
+    with SketchStore(sketch_db) as store:
+        for path, sketches in file_sketches.items():
+            store.replace_source(os.path.abspath(path), sketches)
+        return returning_users(merge_sketches(store.iter_sketches()))
+
+
+def write_daily_csv(path: str, daily_views: Dict[Tuple[str, str], int]) -> None:
+    """Write tenant,day,views rows, sorted by tenant and day."""
+    text = io.StringIO()
+    writer = csv.writer(text, lineterminator="\n")
+    writer.writerow(("tenant", "day", "views"))
+    writer.writerows((tenant, day, views) for (tenant, day), views in sorted(daily_views.items()))
+    write_file_atomic(path, text.getvalue().encode('utf-8'))
+
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Aggregate raw view logs (CSV/JSONL) per tenant and day into report configs"
+    )
+    parser.add_argument(
+        "logs",
+        nargs="+",
+        help="Log files, directories or glob patterns (.csv, .jsonl, optionally .gz)"
+    )
+    parser.add_argument(
+        "--config",
+        action="append",
+        default=[],
+        help="Report config to update with its tenant's views for its month (repeatable)"
+    )
+    parser.add_argument(
+        "--config-dir",
+        help="Update every *.json report config in this directory"
+    )
+    parser.add_argument(
+        "--history",
+        nargs="?",
+        const=str(HISTORY_DB),
+        metavar="DB",
+        help=f"Also record monthly totals in a metrics history database (default: {HISTORY_DB.name})"
+    )
+    parser.add_argument(
+        "--daily-csv",
+        metavar="FILE",
+        help="Write the per-tenant, per-day view counts to a CSV file"
+    )
+    parser.add_argument(
+        "--tenant-field",
+        default="tenant",
+        help="Column or key holding the tenant (default: tenant)"
+    )
+    parser.add_argument(
+        "--time-field",
+        default="timestamp",
+        help="Column or key holding the event time (default: timestamp)"
+    )
+    parser.add_argument(
+        "--user-field",
+        help="Column or key holding the user ID; estimates returning users from "
+             "per-month HyperLogLog sketches"
+    )
+    parser.add_argument(
+        "--sketch-db",
+        default=str(SKETCH_DB),
+        help=f"Database the user sketches are kept in for later runs (default: {SKETCH_DB.name})"
+    )
+    parser.add_argument(
+        "--sketch-precision",
+        type=int,
+        default=DEFAULT_PRECISION,
+        help=f"Sketch precision p: 2**p one-byte registers, standard error 1.04/sqrt(2**p) "
+             f"(default: {DEFAULT_PRECISION}, 4 KB and 1.6%%)"
+    )
+    parser.add_argument(
+        "-j", "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes (default: CPU count)"
+    )
+    parser.add_argument(
+        "--shard-size",
+        type=int,
+        default=DEFAULT_SHARD_SIZE // (1024 * 1024),
+        help=f"Shard size in MB for splitting large uncompressed logs (default: {DEFAULT_SHARD_SIZE // (1024 * 1024)})"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Main function for view ingestion."""
+    args = parse_args(argv)
+    paths = expand_log_inputs(args.logs)
+    missing = [path for path in paths if not os.path.isfile(path)]
+    if missing or not paths:
+        print(f"❌ Error: no log files found: {', '.join(missing or args.logs)}")
+        return 1
+    if not 4 <= args.sketch_precision <= 18:
+        print("❌ Error: --sketch-precision must be between 4 and 18.")
+        return 1
+    if args.shard_size <= 0:
+        print("❌ Error: --shard-size must be a positive number of MB.")
+        return 1
+    config_paths = list(args.config)
+    if args.config_dir:
+        config_paths.extend(str(path) for path in sorted(Path(args.config_dir).glob("*.json")))
+
+    try:
+        totals = aggregate_views(paths, args.workers, args.shard_size * 1024 * 1024,
+                                 args.tenant_field, args.time_field, args.user_field,
+                                 args.sketch_precision)
+        elapsed = totals['elapsed']
+        rate = totals['rows'] / elapsed if elapsed > 0 else float(totals['rows'])
+        print(f"📥 Read {totals['rows']:,} row(s) from {len(paths)} file(s) in {totals['shards']} shard(s) "
+              f"({elapsed:.2f}s, {rate:,.0f} rows/s, {totals['bytes'] / 1e6 / max(elapsed, 1e-9):.1f} MB/s)")
+        if totals['bad_rows']:
+            print(f"⚠️  Skipped {totals['bad_rows']:,} row(s) without a tenant or a valid timestamp")
+        if totals['errors']:
+            failed = sorted({path for path, _ in totals['errors']})
+            print(f"❌ {len(totals['errors'])} shard(s) failed; left out {len(failed)} file(s) entirely:")
+            for path, error in totals['errors']:
+                print(f"   - {path}: {error}")
+
+        daily = totals['views']
+        months = monthly_views(daily)
+        tenants = sorted({tenant for tenant, _ in months})
+        print(f"👁️  {sum(daily.values()):,} view(s) for {len(tenants)} tenant(s) over {len(daily):,} tenant-day(s)")
+        for (tenant, month), views in sorted(months.items()):
+            print(f"   {tenant} {format_month(month)}: {views:,}")
+
+        if args.daily_csv:
+            write_daily_csv(args.daily_csv, daily)
+            print(f"🗒️  Daily views: {args.daily_csv}")
+        cards = metric_cards('views', months, args.history, totals['file_views'])
+        if args.user_field:
+            returning = estimate_returning_users(totals['sketches'], args.sketch_db)
+            print(f"👥 Returning users, estimated from user sketches in {args.sketch_db}:")
+            for (tenant, month), (estimate, error) in sorted(returning.items()):
+                if (tenant, month) in months:
+                    print(f"   {tenant} {format_month(month)}: {estimate:,.0f} ± {error:,.0f}")
+            returning_cards = metric_cards(
+                'returning_users', {key: round(estimate) for key, (estimate, _) in returning.items()},
+                args.history)
+            for key, metrics in returning_cards.items():
+                cards.setdefault(key, {}).update(metrics)
+        if args.history:
+            print(f"📈 Recorded the totals of {len(totals['file_views'])} log file(s) in {args.history}")
+        for config_path in config_paths:
+            values = update_config_file(config_path, cards)
+            if values is None:
+                print(f"⚠️  No metrics for the tenant and month of {config_path}")
+            else:
+                print(f"✅ Updated {config_path}: " + ", ".join(
+                    f"{metric} {value}" for metric, value in values.items()))
+
+        return 1 if totals['errors'] else 0
+
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    exit(main())